@@ -22,6 +22,10 @@ class YouTubeClassifier {
       }
       const response = await fetch(modelUrl);
       this.model = await response.json();
+      if (this.model.svm.coef_csr) {
+        // Modèle élagué : coefficients exportés au format CSR
+        this.model.svm.coef = this.denseFromCsr(this.model.svm.coef_csr);
+      }
       this.ready = true;
       console.log('[BrainFilter] Modèle chargé:', this.model.metadata);
     } catch (error) {
@@ -29,6 +33,22 @@ class YouTubeClassifier {
     }
   }
 
+  /**
+   * Reconstruit une matrice dense à partir d'une matrice CSR exportée
+   */
+  denseFromCsr(csr) {
+    const [nRows, nCols] = csr.shape;
+    const dense = [];
+    for (let row = 0; row < nRows; row++) {
+      const values = new Array(nCols).fill(0);
+      for (let k = csr.indptr[row]; k < csr.indptr[row + 1]; k++) {
+        values[csr.indices[k]] = csr.data[k];
+      }
+      dense.push(values);
+    }
+    return dense;
+  }
+
   /**
    * Normalise un texte (lowercase, suppression accents)
    */
@@ -55,7 +75,8 @@ class YouTubeClassifier {
    */
   tokenize(text) {
     const normalized = this.normalizeText(text);
-    const words = normalized.match(/\b[\w]+\b/g) || [];
+    // token_pattern de sklearn : mots d'au moins 2 caractères
+    const words = normalized.match(/\b\w\w+\b/g) || [];
 
     // Extraire unigrams et bigrams
     const unigrams = words;
@@ -65,32 +86,96 @@ class YouTubeClassifier {
   }
 
   /**
-   * Convertit un texte en vecteur TF-IDF
+   * MurmurHash3 x86 32 bits signé, comme sklearn.utils.murmurhash3_32
+   */
+  murmurhash3(bytes) {
+    const c1 = 0xcc9e2d51;
+    const c2 = 0x1b873593;
+    const nBlocks = bytes.length >> 2;
+    let h = 0;
+    let k;
+    for (let i = 0; i < nBlocks; i++) {
+      const j = i * 4;
+      k = bytes[j] | (bytes[j + 1] << 8) | (bytes[j + 2] << 16) | (bytes[j + 3] << 24);
+      k = Math.imul(k, c1);
+      k = (k << 15) | (k >>> 17);
+      h ^= Math.imul(k, c2);
+      h = (h << 13) | (h >>> 19);
+      h = (Math.imul(h, 5) + 0xe6546b64) | 0;
+    }
+
+    const tail = nBlocks * 4;
+    const rest = bytes.length & 3;
+    if (rest) {
+      k = 0;
+      for (let i = rest - 1; i >= 0; i--) {
+        k = (k << 8) | bytes[tail + i];
+      }
+      k = Math.imul(k, c1);
+      k = (k << 15) | (k >>> 17);
+      h ^= Math.imul(k, c2);
+    }
+
+    h ^= bytes.length;
+    h ^= h >>> 16;
+    h = Math.imul(h, 0x85ebca6b);
+    h ^= h >>> 13;
+    h = Math.imul(h, 0xc2b2ae35);
+    h ^= h >>> 16;
+    return h | 0;
+  }
+
+  /**
+   * Colonne d'un terme dans un export haché (HashingVectorizer de sklearn)
+   */
+  hashBucket(term, nFeatures) {
+    if (!this.encoder) {
+      this.encoder = new TextEncoder();
+    }
+    return Math.abs(this.murmurhash3(this.encoder.encode(term))) % nFeatures;
+  }
+
+  /**
+   * Convertit un texte en vecteur TF-IDF (comptes x IDF, normalisé L2 comme sklearn)
    */
   textToTfidf(text) {
     const tokens = this.tokenize(text);
     const vocab = this.model.tfidf.vocabulary;
     const idf = this.model.tfidf.idf;
+    // Export haché (train_incremental.py) : vocabulaire indexé par colonne hachée
+    const hashing = this.model.tfidf.hashing;
 
     // Compter les occurrences de chaque token
     const termFreq = {};
+    const missingFreq = {};
     for (const token of tokens) {
-      if (vocab.hasOwnProperty(token)) {
-        termFreq[token] = (termFreq[token] || 0) + 1;
+      const key = hashing ? String(this.hashBucket(token, hashing.n_features)) : token;
+      if (vocab.hasOwnProperty(key)) {
+        termFreq[key] = (termFreq[key] || 0) + 1;
+      } else if (hashing) {
+        missingFreq[key] = (missingFreq[key] || 0) + 1;
       }
     }
 
-    // Normaliser par la longueur du document (TF)
-    const docLength = tokens.length || 1;
-    for (const token in termFreq) {
-      termFreq[token] /= docLength;
-    }
-
     // Créer le vecteur TF-IDF
     const vector = new Array(this.model.metadata.n_features).fill(0);
+    let norm = 0;
     for (const token in termFreq) {
       const idx = vocab[token];
       vector[idx] = termFreq[token] * idf[idx];
+      norm += vector[idx] * vector[idx];
+    }
+    // Colonnes hachées absentes de l'export : comptent dans la norme (IDF par défaut)
+    for (const key in missingFreq) {
+      norm += (missingFreq[key] * hashing.default_idf) ** 2;
+    }
+
+    // Normalisation L2 : les scores (et donc la calibration) sont ceux de Python
+    norm = Math.sqrt(norm);
+    if (norm > 0) {
+      for (const token in termFreq) {
+        vector[vocab[token]] /= norm;
+      }
     }
 
     return vector;
@@ -126,12 +211,23 @@ class YouTubeClassifier {
     const intercept = this.model.svm.intercept;
     const classes = this.model.svm.classes;
 
+    // SVC one-vs-one (export_model_to_json.py) : un poids par paire, vote
+    if (this.model.svm.decision === 'ovo') {
+      return this.predictOvo(vector, coef, intercept, classes);
+    }
+
     // Calculer le score de décision pour chaque classe
     const scores = [];
 
-    for (let classIdx = 0; classIdx < classes.length; classIdx++) {
-      const score = this.dotProduct(coef[classIdx], vector) + intercept[classIdx];
-      scores.push(score);
+    if (coef.length === 1 && classes.length === 2) {
+      // Modèle binaire : une seule ligne de poids, positive pour classes[1]
+      const score = this.dotProduct(coef[0], vector) + intercept[0];
+      scores.push(-score, score);
+    } else {
+      for (let classIdx = 0; classIdx < classes.length; classIdx++) {
+        const score = this.dotProduct(coef[classIdx], vector) + intercept[classIdx];
+        scores.push(score);
+      }
     }
 
     // Trouver la classe avec le score maximal
@@ -144,11 +240,81 @@ class YouTubeClassifier {
       }
     }
 
-    return {
+    return this.withProbabilities({
       category: classes[maxIdx],
       score: maxScore,
       allScores: scores.map((s, i) => ({ category: classes[i], score: s }))
-    };
+    }, scores);
+  }
+
+  /**
+   * Probabilités calibrées à partir des scores par classe (paramètres de
+   * model.json, voir ml/models/calibration.py)
+   */
+  calibrate(scores) {
+    const calibration = this.model.calibration;
+    let proba;
+    if (calibration.method === 'temperature') {
+      const z = scores.map(s => s / calibration.temperature);
+      const maxZ = Math.max(...z);
+      proba = z.map(v => Math.exp(v - maxZ));
+    } else {
+      proba = scores.map((s, i) => 1 / (1 + Math.exp(-(calibration.a[i] * s + calibration.b[i]))));
+    }
+    const total = proba.reduce((a, b) => a + b, 0);
+    return proba.map(p => p / total);
+  }
+
+  /**
+   * Ajoute confidence et probabilities à une prédiction si le modèle est calibré
+   */
+  withProbabilities(prediction, scores) {
+    if (!this.model.calibration) {
+      return prediction;
+    }
+    const proba = this.calibrate(scores);
+    const classes = this.model.svm.classes;
+    prediction.confidence = proba[classes.indexOf(prediction.category)];
+    prediction.probabilities = proba.map((p, i) => ({ category: classes[i], probability: p }));
+    return prediction;
+  }
+
+  /**
+   * Prédiction par vote one-vs-one (comme libsvm)
+   */
+  predictOvo(vector, coef, intercept, classes) {
+    const pairs = this.model.svm.pairs;
+    const votes = new Array(classes.length).fill(0);
+    const confidences = new Array(classes.length).fill(0);
+
+    for (let p = 0; p < pairs.length; p++) {
+      const [i, j] = pairs[p];
+      const score = this.dotProduct(coef[p], vector) + intercept[p];
+      votes[score > 0 ? i : j]++;
+      confidences[i] += score;
+      confidences[j] -= score;
+    }
+
+    // Égalité : la classe de plus petit indice l'emporte
+    let maxIdx = 0;
+    for (let i = 1; i < votes.length; i++) {
+      if (votes[i] > votes[maxIdx]) {
+        maxIdx = i;
+      }
+    }
+
+    // Scores par classe pour la calibration : votes + confiance bornée
+    // (SVC.decision_function de sklearn avec decision_function_shape='ovr')
+    // En binaire, sklearn renvoie le score de la paire : [score, -score]
+    const classScores = classes.length === 2
+      ? [confidences[0], confidences[1]]
+      : votes.map((v, i) => v + confidences[i] / (3 * (Math.abs(confidences[i]) + 1)));
+
+    return this.withProbabilities({
+      category: classes[maxIdx],
+      score: votes[maxIdx],
+      allScores: votes.map((v, i) => ({ category: classes[i], score: v }))
+    }, classScores);
   }
 
   /**
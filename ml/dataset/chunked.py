@@ -0,0 +1,94 @@
+"""
+Lecture par morceaux et split train/val déterministe pour les gros corpus.
+
+Le dataset n'est jamais chargé en entier : les titres sont lus par
+morceaux de taille fixe (CSV et JSONL via pandas, Parquet via pyarrow)
+et chaque ligne est affectée au train ou à la validation d'après un hash
+de son titre. Le split ne dépend donc ni de l'ordre des lignes ni de la
+taille des morceaux, et un titre dupliqué tombe toujours du même côté.
+"""
+from pathlib import Path
+
+import pandas as pd
+
+# Résolution du split (fraction de validation arrondie au 1/10000)
+SPLIT_BUCKETS = 10_000
+
+
+def iter_chunks(data_path, chunk_size=100_000, columns=('title', 'category')):
+    """
+    Itère sur un CSV, un Parquet ou un JSONL par DataFrames d'au plus chunk_size lignes.
+
+    Args:
+        data_path: Fichier .csv, .parquet ou .jsonl (un objet JSON par ligne)
+        chunk_size: Nombre de lignes par morceau
+        columns: Colonnes à lire
+
+    Yields:
+        DataFrame (colonnes `columns`, valeurs str)
+    """
+    data_path = Path(data_path)
+    columns = list(columns)
+
+    if data_path.suffix == '.jsonl':
+        reader = pd.read_json(data_path, lines=True, chunksize=chunk_size, dtype=False)
+        for chunk in reader:
+            yield chunk[columns].astype(str)
+        return
+
+    if data_path.suffix == '.parquet':
+        # Dépendance optionnelle, seulement pour l'entrée Parquet
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(data_path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas().astype(str)
+        return
+
+    reader = pd.read_csv(data_path, chunksize=chunk_size, usecols=columns,
+                         dtype=str, keep_default_na=False)
+    for chunk in reader:
+        yield chunk
+
+
+def split_mask(titles, val_fraction=0.2, seed=42):
+    """
+    Masque booléen des lignes de validation, déterministe par titre.
+
+    Args:
+        titles: Séquence de titres
+        val_fraction: Part approximative de la validation
+        seed: Change le split sans changer sa taille
+
+    Returns:
+        Array bool (True = validation)
+    """
+    hash_key = f"{seed:016d}"[-16:]
+    hashes = pd.util.hash_pandas_object(pd.Series(titles, dtype=object), index=False,
+                                        hash_key=hash_key).values
+    return hashes % SPLIT_BUCKETS < int(round(val_fraction * SPLIT_BUCKETS))
+
+
+def iter_split(data_path, subset, chunk_size=100_000, val_fraction=0.2, seed=42):
+    """
+    Itère sur les morceaux d'un seul côté du split.
+
+    Args:
+        data_path: Fichier .csv ou .parquet
+        subset: 'train' ou 'val'
+        chunk_size: Nombre de lignes lues par morceau (avant filtrage)
+        val_fraction: Part de la validation
+        seed: Graine du split
+
+    Yields:
+        Tuple (titres, catégories) en arrays
+    """
+    if subset not in ('train', 'val'):
+        raise ValueError(f"subset doit valoir 'train' ou 'val', pas {subset!r}")
+
+    for chunk in iter_chunks(data_path, chunk_size):
+        titles = chunk['title'].values
+        mask = split_mask(titles, val_fraction, seed)
+        if subset == 'train':
+            mask = ~mask
+        if mask.any():
+            yield titles[mask], chunk['category'].values[mask]
@@ -1,10 +1,18 @@
 """
 Générateur de dataset de titres YouTube pour l'entraînement du classificateur.
 """
+import argparse
+import csv
+import itertools
+import math
 import random
-import pandas as pd
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
+
 
 # Templates de titres par catégorie
 TITLE_TEMPLATES = {
@@ -230,44 +238,154 @@ VOCABULARY = {
 }
 
 
-def generate_title(category):
-    """Génère un titre aléatoire pour une catégorie donnée."""
-    template = random.choice(TITLE_TEMPLATES[category])
+def _compile_templates():
+    """
+    Précompile les templates : pour chacun, une chaîne de format et la liste
+    des placeholders à tirer, dans l'ordre du vocabulaire (celui des tirages
+    aléatoires de la version par remplacements successifs).
+
+    Returns:
+        Dict {catégorie: [(format_string, [clés]), ...]}
+    """
+    compiled = {}
+    for category, templates in TITLE_TEMPLATES.items():
+        vocab = VOCABULARY[category]
+        compiled[category] = []
+        for template in templates:
+            keys = [key for key in vocab if "{" + key + "}" in template]
+            # Les accolades hors placeholders connus restent littérales
+            format_string = template.replace("{", "{{").replace("}", "}}")
+            for key in keys:
+                format_string = format_string.replace("{{" + key + "}}", "{" + key + "}")
+            compiled[category].append((format_string, keys))
+    return compiled
+
+
+COMPILED_TEMPLATES = _compile_templates()
+
+
+def generate_title(category, rng=random):
+    """
+    Génère un titre aléatoire pour une catégorie donnée.
+
+    Args:
+        category: Catégorie du titre
+        rng: Source d'aléa (module random par défaut, ou random.Random)
+    """
+    format_string, keys = rng.choice(COMPILED_TEMPLATES[category])
     vocab = VOCABULARY[category]
 
     # Remplacer les placeholders par des valeurs aléatoires
-    title = template
-    for key, values in vocab.items():
-        placeholder = "{" + key + "}"
-        if placeholder in title:
-            title = title.replace(placeholder, random.choice(values))
+    return format_string.format(**{key: rng.choice(vocab[key]) for key in keys})
+
 
-    return title
+def iter_titles(samples_per_category, seed=42):
+    """
+    Générateur des titres, dans l'ordre de génération (catégorie par catégorie).
+
+    Les tirages aléatoires sont exactement ceux de generate_dataset pour un
+    même seed : seul l'ordre final (mélange) peut différer.
+
+    Args:
+        samples_per_category: Nombre d'échantillons par catégorie (int), ou
+                              dict {catégorie: nombre}
+        seed: Seed pour la reproductibilité
+
+    Yields:
+        Tuples (title, category)
+    """
+    if isinstance(samples_per_category, int):
+        samples_per_category = {category: samples_per_category for category in TITLE_TEMPLATES}
+
+    random.seed(seed)
+
+    for category in TITLE_TEMPLATES:
+        for _ in range(samples_per_category.get(category, 0)):
+            yield generate_title(category), category
+
+
+def split_total(total_samples):
+    """Répartit un nombre total de titres entre les catégories (équilibré)."""
+    categories = list(TITLE_TEMPLATES.keys())
+    base, remainder = divmod(total_samples, len(categories))
+    return {category: base + (i < remainder) for i, category in enumerate(categories)}
+
+
+def _split_work(samples_per_category, n_workers):
+    """
+    Découpe le plan de génération (catégorie par catégorie) en n_workers
+    tranches contiguës de tailles égales (à un près).
+
+    Returns:
+        Liste (une par worker) de listes de segments (catégorie, nombre)
+    """
+    total = sum(samples_per_category.values())
+    bounds = [total * w // n_workers for w in range(n_workers + 1)]
+
+    slices = []
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        segments = []
+        offset = 0
+        for category, n in samples_per_category.items():
+            lo, hi = max(start, offset), min(stop, offset + n)
+            if lo < hi:
+                segments.append((category, hi - lo))
+            offset += n
+        slices.append(segments)
+    return slices
+
+
+def _worker_seeds(seed, n_workers):
+    """Seeds indépendants et reproductibles dérivés du seed maître."""
+    return [int(child.generate_state(1)[0])
+            for child in np.random.SeedSequence(seed).spawn(n_workers)]
+
+
+def _generate_slice(segments, worker_seed):
+    """Génère une tranche du dataset avec un flux aléatoire propre au worker."""
+    rng = random.Random(worker_seed)
+    return [
+        (generate_title(category, rng), category)
+        for category, n in segments
+        for _ in range(n)
+    ]
 
 
-def generate_dataset(samples_per_category=200, seed=42):
+def generate_dataset(samples_per_category=200, seed=42, n_workers=1):
     """
     Génère un dataset complet de titres YouTube.
 
+    Avec n_workers > 1, la génération est répartie sur un pool de processus :
+    chaque worker reçoit une tranche du plan et un flux aléatoire dérivé du
+    seed (SeedSequence.spawn). Le résultat est identique d'une exécution à
+    l'autre pour un même couple (seed, n_workers), mais diffère du mode
+    séquentiel, qui utilise le module random global.
+
     Args:
         samples_per_category: Nombre d'échantillons par catégorie
         seed: Seed pour la reproductibilité
+        n_workers: Nombre de processus de génération
 
     Returns:
         DataFrame avec colonnes 'title' et 'category'
     """
-    random.seed(seed)
+    if n_workers > 1:
+        counts = {category: samples_per_category for category in TITLE_TEMPLATES}
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            # map conserve l'ordre des tranches, quel que soit l'ordonnancement
+            slices = executor.map(
+                _generate_slice,
+                _split_work(counts, n_workers),
+                _worker_seeds(seed, n_workers)
+            )
+            rows = [row for rows in slices for row in rows]
+    else:
+        rows = iter_titles(samples_per_category, seed)
 
-    data = []
-    categories = list(TITLE_TEMPLATES.keys())
-
-    for category in categories:
-        for _ in range(samples_per_category):
-            title = generate_title(category)
-            data.append({
-                'title': title,
-                'category': category
-            })
+    data = [
+        {'title': title, 'category': category}
+        for title, category in rows
+    ]
 
     df = pd.DataFrame(data)
 
@@ -277,19 +395,171 @@ def generate_dataset(samples_per_category=200, seed=42):
     return df
 
 
+def _partition(rows, directory, lo, hi, max_open_files):
+    """
+    Répartit des lignes (chunk, titre, catégorie), chunk dans [lo, hi), dans
+    un fichier CSV par chunk, en gardant au plus max_open_files fichiers
+    ouverts : au-delà, les chunks sont d'abord regroupés en max_open_files
+    groupes, puis chaque groupe est relu et redécoupé (récursivement).
+    L'ordre des lignes d'un chunk est celui de rows.
+
+    Returns:
+        Liste des fichiers, dans l'ordre des chunks
+    """
+    n_files = hi - lo
+    if n_files <= max_open_files:
+        paths = [Path(directory) / f"chunk_{chunk:05d}.csv" for chunk in range(lo, hi)]
+        files = [open(path, 'w', newline='', encoding='utf-8') for path in paths]
+        try:
+            writers = [csv.writer(f) for f in files]
+            for writer in writers:
+                writer.writerow(['title', 'category'])
+            for chunk, title, category in rows:
+                writers[chunk - lo].writerow((title, category))
+        finally:
+            for f in files:
+                f.close()
+        return paths
+
+    step = math.ceil(n_files / max_open_files)
+    starts = list(range(lo, hi, step))
+    group_paths = [Path(directory) / f"group_{start:05d}_{min(start + step, hi):05d}.csv"
+                   for start in starts]
+    files = [open(path, 'w', newline='', encoding='utf-8') for path in group_paths]
+    try:
+        writers = [csv.writer(f) for f in files]
+        for row in rows:
+            writers[(row[0] - lo) // step].writerow(row)
+    finally:
+        for f in files:
+            f.close()
+
+    paths = []
+    for start, group_path in zip(starts, group_paths):
+        with open(group_path, newline='', encoding='utf-8') as f:
+            group_rows = ((int(chunk), title, category) for chunk, title, category in csv.reader(f))
+            paths += _partition(group_rows, directory, start, min(start + step, hi), max_open_files)
+        group_path.unlink()
+    return paths
+
+
+def generate_dataset_streaming(output_path, total_samples, seed=42, chunk_size=100_000,
+                               max_open_files=256):
+    """
+    Génère un très grand dataset directement sur disque, à mémoire bornée.
+
+    Mélange externe en deux passes :
+    1. Les titres sont générés (mêmes tirages que generate_dataset) et
+       répartis aléatoirement (RNG numpy dédiée, seedée) dans des fichiers
+       temporaires d'environ chunk_size lignes. Au-delà de max_open_files
+       chunks, la répartition se fait en plusieurs niveaux (_partition) ;
+       le résultat est le même qu'en un seul niveau.
+    2. Chaque fichier est chargé, mélangé (random_state=seed + index) puis
+       ajouté à la sortie.
+
+    Avec un seul chunk (total_samples <= chunk_size) et un total multiple du
+    nombre de catégories, la sortie est identique à celle de generate_dataset.
+
+    Args:
+        output_path: Fichier de sortie (.csv ou .parquet)
+        total_samples: Nombre total de titres (réparti entre catégories)
+        seed: Seed pour la reproductibilité
+        chunk_size: Nombre de lignes visé par chunk (borne la mémoire)
+        max_open_files: Nombre maximum de fichiers temporaires ouverts à la fois
+
+    Returns:
+        Dict {catégorie: nombre de titres}
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    parquet = output_path.suffix == '.parquet'
+    if parquet:
+        # Dépendance optionnelle, seulement pour la sortie Parquet
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+    counts = split_total(total_samples)
+    n_chunks = max(1, math.ceil(total_samples / chunk_size))
+    rng = np.random.default_rng(seed)
+
+    def assigned_rows():
+        titles = iter_titles(counts, seed)
+        while True:
+            batch = list(itertools.islice(titles, 10_000))
+            if not batch:
+                break
+            for (title, category), chunk in zip(batch, rng.integers(n_chunks, size=len(batch))):
+                yield int(chunk), title, category
+
+    with tempfile.TemporaryDirectory(dir=output_path.parent) as tmp_dir:
+        # Passe 1 : génération et répartition aléatoire dans les chunks
+        chunk_paths = _partition(assigned_rows(), tmp_dir, 0, n_chunks, max_open_files)
+
+        # Passe 2 : mélange de chaque chunk et écriture de la sortie
+        parquet_writer = None
+        try:
+            for i, chunk_path in enumerate(chunk_paths):
+                df = pd.read_csv(chunk_path, dtype=str, keep_default_na=False)
+                df = df.sample(frac=1, random_state=seed + i).reset_index(drop=True)
+
+                if parquet:
+                    table = pa.Table.from_pandas(df, preserve_index=False)
+                    if parquet_writer is None:
+                        parquet_writer = pq.ParquetWriter(output_path, table.schema)
+                    parquet_writer.write_table(table)
+                else:
+                    df.to_csv(output_path, index=False, mode='w' if i == 0 else 'a', header=i == 0)
+                chunk_path.unlink()
+        finally:
+            if parquet_writer is not None:
+                parquet_writer.close()
+
+    return counts
+
+
+def parse_args():
+    """Options de ligne de commande."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--total', type=int, default=None,
+                        help="Mode streaming : nombre total de titres à générer sur disque")
+    parser.add_argument('--chunk-size', type=int, default=100_000,
+                        help="Mode streaming : nombre de lignes par chunk")
+    parser.add_argument('--output', type=Path, default=None,
+                        help="Fichier de sortie (.csv ou .parquet)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--n-workers', type=int, default=1,
+                        help="Processus de génération (reproductible pour un couple seed/n-workers)")
+    args = parser.parse_args()
+    if args.total is not None and args.n_workers > 1:
+        parser.error("--n-workers n'est pas supporté en mode streaming (--total)")
+    return args
+
+
 def main():
     """Génère et sauvegarde le dataset."""
-    print("Génération du dataset...")
-
-    # Générer le dataset
-    df = generate_dataset(samples_per_category=200)
+    args = parse_args()
 
     # Créer le dossier data/raw s'il n'existe pas
     output_dir = Path(__file__).parent.parent.parent / "data" / "raw"
-    output_dir.mkdir(parents=True, exist_ok=True)
+    output_path = args.output or output_dir / "youtube_titles.csv"
+
+    if args.total is not None:
+        print(f"Génération du dataset en streaming ({args.total} titres)...")
+        counts = generate_dataset_streaming(
+            output_path, args.total, seed=args.seed, chunk_size=args.chunk_size
+        )
+        print(f"\n✓ Dataset généré : {output_path}")
+        print(f"  - Total : {sum(counts.values())} titres")
+        print(f"  - Catégories : {len(counts)}")
+        return
+
+    print("Génération du dataset...")
+
+    # Générer le dataset
+    df = generate_dataset(samples_per_category=200, seed=args.seed, n_workers=args.n_workers)
 
     # Sauvegarder
-    output_path = output_dir / "youtube_titles.csv"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
     df.to_csv(output_path, index=False)
 
     print(f"\n✓ Dataset généré : {output_path}")
@@ -2,47 +2,114 @@
 Script de benchmark pour comparer différentes méthodes de classification.
 Mesure à la fois la performance (accuracy, F1) et le temps d'inférence.
 """
+import io
+import json
+import os
+import pickle
 import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext, redirect_stdout
+from multiprocessing import Manager
+from pathlib import Path
+
 import numpy as np
 import pandas as pd
-from pathlib import Path
+from threadpoolctl import threadpool_limits
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, f1_score, classification_report, confusion_matrix
 import matplotlib.pyplot as plt
 import seaborn as sns
+from sklearn.base import clone
+from sklearn.pipeline import Pipeline
+from sklearn.svm import SVC
+
+from dataset.chunked import iter_chunks, split_mask
+from evaluation.embedding_cache import CachedEmbedding
+from models.export_model_to_json import build_ovo_model_data
+from models.export_simple_model import build_model_data
+
+# Tailles de batch de la mesure de latence (None = tout le jeu de validation)
+LATENCY_BATCH_SIZES = (1, 8, 64, None)
+
+# Colonne de latence utilisée pour la recommandation, si elle a été mesurée :
+# latence p95 pour un seul titre (ce que paie l'extension par vignette)
+RECOMMENDATION_LATENCY_COLUMN = 'latency_p95_ms_b1'
+
+# Threads BLAS/OpenMP par modèle mesuré, en séquentiel comme en parallèle
+BLAS_THREADS = 1
 
 
 class ModelBenchmark:
     """Classe pour benchmarker un modèle de classification."""
 
-    def __init__(self, model, name):
+    def __init__(self, model, name, include_embedding_time=False,
+                 latency=False, latency_trials=50, latency_warmup=5,
+                 profile_memory=False):
         """
         Args:
             model: Modèle sklearn-compatible avec fit() et predict()
             name: Nom du modèle pour l'affichage
+            include_embedding_time: Pour un pipeline dont l'embedding est en
+                                    cache (CachedEmbedding), ajoute aux temps
+                                    mesurés le temps de calcul initial des
+                                    features. Par défaut seul le reste du
+                                    pipeline est chronométré.
+            latency: Active la mesure de latence détaillée (measure_latency)
+            latency_trials: Nombre de mesures par taille de batch
+            latency_warmup: Nombre d'appels de chauffe (non mesurés)
+            profile_memory: Active le profilage mémoire (measure_memory)
         """
         self.model = model
         self.name = name
+        self.include_embedding_time = include_embedding_time
+        self.latency = latency
+        self.latency_trials = latency_trials
+        self.latency_warmup = latency_warmup
+        self.profile_memory = profile_memory
         self.metrics = {}
+        # Mesures brutes (latences de chaque appel), pour l'historique
+        self.samples = {}
+
+    def _split_cached_embedding(self):
+        """Renvoie (embedding en cache, reste du pipeline) ou (None, modèle)."""
+        if isinstance(self.model, Pipeline) and isinstance(self.model.steps[0][1], CachedEmbedding):
+            return self.model.steps[0][1], self.model[1:]
+        return None, self.model
 
     def train(self, X_train, y_train):
         """Entraîne le modèle et mesure le temps d'entraînement."""
         print(f"\n[{self.name}] Entraînement...")
+        embedding, head = self._split_cached_embedding()
+        if embedding is not None:
+            # Features calculées une seule fois pour tous les pipelines
+            X_train = embedding.fit(X_train, y_train).transform(X_train)
+
         start = time.time()
-        self.model.fit(X_train, y_train)
+        head.fit(X_train, y_train)
         train_time = time.time() - start
+
+        if embedding is not None and self.include_embedding_time:
+            train_time += embedding.fit_time_ + embedding.transform_time_
         self.metrics['train_time'] = train_time
         print(f"  ✓ Temps d'entraînement: {train_time:.3f}s")
 
     def evaluate(self, X_val, y_val):
         """Évalue le modèle et mesure le temps d'inférence."""
         print(f"[{self.name}] Évaluation...")
+        embedding, head = self._split_cached_embedding()
+        X_input = X_val
+        if embedding is not None:
+            X_input = embedding.transform(X_val)
 
         # Mesurer le temps d'inférence total
         start = time.time()
-        y_pred = self.model.predict(X_val)
+        y_pred = head.predict(X_input)
         inference_time = time.time() - start
 
+        if embedding is not None and self.include_embedding_time:
+            inference_time += embedding.transform_time_
+
         # Calculer le temps moyen par échantillon
         avg_inference_time = inference_time / len(X_val)
 
@@ -68,8 +135,170 @@ class ModelBenchmark:
         print(f"  ✓ Temps moyen par sample: {avg_inference_time*1000:.2f}ms")
         print(f"  ✓ Temps pour 1000 samples: {self.metrics['inference_time_per_1000']:.2f}ms")
 
+        self._measure_ann_recall(head, X_input)
+        self._record_embedding_size()
+        self._record_cascade_stages(head, X_input, y_val)
         return y_pred
 
+    def _record_cascade_stages(self, head, X_input, y_val):
+        """
+        Pour un classificateur en cascade (CascadeClassifier), ajoute par
+        étage la part des titres résolus, leur accuracy et leur latence
+        moyenne (temps cumulé des étages traversés, par titre), et la part
+        résolue par les règles de titre exact et de mot-clé.
+        """
+        if not hasattr(head, 'predict_stages'):
+            return
+        y_pred, stages, stage_times = head.predict_stages(X_input)
+        y_val = np.asarray(y_val)
+        cumulative_ms = 0.0
+        for k, stage in enumerate(head.stage_names_):
+            reached = np.sum(stages >= k)
+            resolved = stages == k
+            if reached:
+                cumulative_ms += stage_times[k] / reached * 1000
+            fraction = resolved.mean()
+            accuracy = np.mean(y_pred[resolved] == y_val[resolved]) if resolved.any() else np.nan
+            self.metrics.update({
+                f'cascade_{stage}_fraction': fraction,
+                f'cascade_{stage}_accuracy': accuracy,
+                f'cascade_{stage}_latency_ms': cumulative_ms,
+            })
+            print(f"  ✓ Étage {stage}: {fraction * 100:.1f}% des titres, "
+                  f"accuracy {accuracy:.4f}, {cumulative_ms:.4f}ms/titre")
+            if stage == 'rules':
+                # Part résolue par un titre exact / par un mot-clé
+                exact = head.rules_.predict_confidence(X_input)[2] & resolved
+                self.metrics['cascade_rules_exact_fraction'] = exact.mean()
+                self.metrics['cascade_rules_keyword_fraction'] = (resolved & ~exact).mean()
+                print(f"    dont titres exacts {exact.mean() * 100:.1f}%, "
+                      f"mots-clés {(resolved & ~exact).mean() * 100:.1f}%")
+
+    def _record_embedding_size(self):
+        """Dimension et octets par titre d'un embedding réduit/quantifié (ReducedEmbedding)."""
+        model = self._inference_model()
+        if not isinstance(model, Pipeline):
+            return
+        embedding = model.steps[0][1]
+        if hasattr(embedding, 'bytes_per_vector_'):
+            self.metrics['embedding_dim'] = embedding.n_features_out_
+            self.metrics['embedding_bytes'] = embedding.bytes_per_vector_
+            print(f"  ✓ Embedding: {embedding.n_features_out_} dimensions, "
+                  f"{embedding.bytes_per_vector_} octets par titre")
+
+    def _measure_ann_recall(self, head, X_input):
+        """
+        Pour un classificateur KNN approché (ANNKNeighborsClassifier),
+        ajoute le rappel des voisins par rapport à la recherche exacte.
+        """
+        classifier = head.steps[-1][1] if isinstance(head, Pipeline) else head
+        if not hasattr(classifier, 'recall'):
+            return
+        features = X_input
+        if isinstance(head, Pipeline) and len(head.steps) > 1:
+            features = head[:-1].transform(X_input)
+        self.metrics['ann_recall'] = classifier.recall(features)
+        print(f"  ✓ Rappel ANN (vs KNN exact): {self.metrics['ann_recall']:.4f}")
+
+    def _inference_model(self):
+        """
+        Modèle tel qu'il serait servi : un embedding en cache est remplacé
+        par l'embedding entraîné sous-jacent, pour chronométrer le vrai coût.
+        """
+        embedding, head = self._split_cached_embedding()
+        if embedding is None:
+            return self.model
+        return Pipeline([('embedding', embedding.embedding_)] + head.steps)
+
+    def measure_latency(self, X_val, batch_sizes=LATENCY_BATCH_SIZES):
+        """
+        Mesure la latence de bout en bout (embedding + classificateur).
+
+        Pour chaque taille de batch : appels de chauffe, puis
+        `latency_trials` appels chronométrés avec perf_counter_ns sur des
+        batches successifs de X_val. Ajoute aux métriques les percentiles
+        p50/p95/p99 (ms par appel) et le débit médian (titres/s).
+
+        Args:
+            X_val: Titres utilisés pour les mesures
+            batch_sizes: Tailles de batch (None = tout X_val)
+        """
+        print(f"[{self.name}] Mesure de latence...")
+        model = self._inference_model()
+        X_val = np.asarray(X_val)
+        n_samples = len(X_val)
+
+        for batch_size in batch_sizes:
+            size = n_samples if batch_size is None else min(batch_size, n_samples)
+            suffix = 'full' if batch_size is None else batch_size
+
+            def batch(i):
+                # Batches successifs (avec rebouclage) pour varier les titres
+                indices = (np.arange(size) + i * size) % n_samples
+                return X_val[indices]
+
+            for i in range(self.latency_warmup):
+                model.predict(batch(i))
+
+            timings_ns = np.empty(self.latency_trials, dtype=np.int64)
+            for i in range(self.latency_trials):
+                X_batch = batch(i)
+                start = time.perf_counter_ns()
+                model.predict(X_batch)
+                timings_ns[i] = time.perf_counter_ns() - start
+
+            timings_ms = timings_ns / 1e6
+            self.samples[f'latency_ms_b{suffix}'] = timings_ms
+            p50, p95, p99 = np.percentile(timings_ms, [50, 95, 99])
+            throughput = size / (p50 / 1000)
+
+            self.metrics.update({
+                f'latency_p50_ms_b{suffix}': p50,
+                f'latency_p95_ms_b{suffix}': p95,
+                f'latency_p99_ms_b{suffix}': p99,
+                f'throughput_b{suffix}': throughput,
+            })
+            print(f"  ✓ Batch {suffix}: p50={p50:.3f}ms p95={p95:.3f}ms "
+                  f"p99={p99:.3f}ms ({throughput:.0f} titres/s)")
+
+    def measure_memory(self, X_train, y_train, X_val):
+        """
+        Mesure l'empreinte mémoire du modèle servi (voir _inference_model).
+
+        - Pic d'allocation (tracemalloc) pendant fit et pendant predict,
+          mesuré sur une copie non entraînée du modèle pour ne pas fausser
+          les temps déjà mesurés
+        - Taille du pipeline picklé
+        - Taille de l'export JSON de l'extension (TF-IDF + modèle linéaire
+          uniquement, NaN sinon)
+        """
+        print(f"[{self.name}] Profilage mémoire...")
+        model = clone(self._inference_model())
+
+        tracemalloc.start()
+        model.fit(X_train, y_train)
+        _, peak_fit = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        model.predict(X_val)
+        _, peak_predict = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        model_size = len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+        json_size = _json_export_size(model)
+
+        self.metrics.update({
+            'peak_mem_fit_mb': peak_fit / 1024**2,
+            'peak_mem_predict_mb': (peak_predict - current) / 1024**2,
+            'model_size_kb': model_size / 1024,
+            'json_export_size_kb': json_size / 1024,
+        })
+        print(f"  ✓ Pic mémoire fit: {self.metrics['peak_mem_fit_mb']:.2f}MB")
+        print(f"  ✓ Pic mémoire predict: {self.metrics['peak_mem_predict_mb']:.2f}MB")
+        print(f"  ✓ Taille picklée: {self.metrics['model_size_kb']:.1f}KB")
+        if not np.isnan(json_size):
+            print(f"  ✓ Taille export JSON: {self.metrics['json_export_size_kb']:.1f}KB")
+
     def get_classification_report(self, y_val, y_pred):
         """Génère un rapport de classification détaillé."""
         return classification_report(y_val, y_pred)
@@ -92,19 +321,42 @@ class ModelBenchmark:
 class BenchmarkRunner:
     """Gère l'exécution de benchmarks pour plusieurs modèles."""
 
-    def __init__(self, output_dir):
+    def __init__(self, output_dir, n_jobs=1, memory_budget_mb=None, history=None, run_info=None,
+                 **benchmark_options):
         """
         Args:
             output_dir: Dossier pour sauvegarder les résultats
+            n_jobs: Nombre de processus pour entraîner/évaluer les modèles en
+                    parallèle (1 = séquentiel, -1 = tous les cœurs)
+            memory_budget_mb: Budget mémoire pour la recommandation (taille du
+                              modèle + pic mémoire en prédiction), nécessite
+                              profile_memory
+            history: BenchmarkHistory (evaluation/history.py) où ajouter
+                     l'exécution, ou None
+            run_info: Identification de l'exécution pour l'historique
+                      (dataset_hash, split, options)
+            **benchmark_options: Options transmises à chaque ModelBenchmark
+                                 (include_embedding_time, latency, ...)
         """
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.n_jobs = n_jobs
+        self.memory_budget_mb = memory_budget_mb
+        self.history = history
+        self.run_info = run_info or {}
+        self.benchmark_options = benchmark_options
         self.results = []
+        self.samples = {}
 
     def run(self, models, X_train, X_val, y_train, y_val):
         """
         Exécute le benchmark sur tous les modèles.
 
+        En mode parallèle, les résultats (logs, matrices de confusion, CSV)
+        sont traités dans l'ordre de `models`, comme en séquentiel. Dans les
+        deux modes, les bibliothèques BLAS/OpenMP sont limitées à un thread
+        par modèle.
+
         Args:
             models: Liste de tuples (model, name)
             X_train, X_val: Features d'entraînement et validation
@@ -114,17 +366,52 @@ class BenchmarkRunner:
         print("BENCHMARK DE CLASSIFICATION")
         print("="*70)
 
-        for model, name in models:
-            benchmark = ModelBenchmark(model, name)
+        n_jobs = _effective_n_jobs(self.n_jobs, len(models))
+        if n_jobs == 1:
+            outcomes = (
+                _benchmark_model(model, name, X_train, X_val, y_train, y_val,
+                                 self.benchmark_options)
+                for model, name in models
+            )
+            # Même limite BLAS/OpenMP que les workers parallèles (_init_worker) :
+            # temps et latences comparables quel que soit n_jobs
+            with threadpool_limits(limits=BLAS_THREADS):
+                self._collect(outcomes, y_val)
+        else:
+            # Le cache mémoire des CachedEmbedding n'est pas partagé entre
+            # processus : utiliser un cache disque (cache_dir) en parallèle
+            print(f"Exécution parallèle sur {n_jobs} processus")
+            with Manager() as manager:
+                cpu_queue = manager.Queue()
+                for cpu in _available_cpus():
+                    cpu_queue.put(cpu)
+
+                with ProcessPoolExecutor(
+                    max_workers=n_jobs,
+                    initializer=_init_worker,
+                    initargs=(cpu_queue,)
+                ) as executor:
+                    futures = [
+                        executor.submit(
+                            _benchmark_model, model, name,
+                            X_train, X_val, y_train, y_val,
+                            self.benchmark_options, True
+                        )
+                        for model, name in models
+                    ]
+                    self._collect((future.result() for future in futures), y_val)
 
-            # Entraînement
-            benchmark.train(X_train, y_train)
+        # Créer un rapport comparatif
+        self._create_comparison_report()
 
-            # Évaluation
-            y_pred = benchmark.evaluate(X_val, y_val)
+    def _collect(self, outcomes, y_val):
+        """Affiche et stocke les résultats de chaque modèle, dans l'ordre."""
+        for benchmark, y_pred, log in outcomes:
+            if log:
+                print(log, end='')
 
             # Rapport détaillé
-            print(f"\n[{name}] Rapport de classification:")
+            print(f"\n[{benchmark.name}] Rapport de classification:")
             print(benchmark.get_classification_report(y_val, y_pred))
 
             # Matrice de confusion
@@ -132,12 +419,10 @@ class BenchmarkRunner:
 
             # Stocker les résultats
             self.results.append({
-                'model': name,
+                'model': benchmark.name,
                 **benchmark.metrics
             })
-
-        # Créer un rapport comparatif
-        self._create_comparison_report()
+            self.samples[benchmark.name] = {**benchmark.samples, 'y_true': y_val, 'y_pred': y_pred}
 
     def _create_comparison_report(self):
         """Crée un rapport comparatif de tous les modèles."""
@@ -156,6 +441,14 @@ class BenchmarkRunner:
         df.to_csv(csv_path, index=False)
         print(f"\n✓ Résultats sauvegardés: {csv_path}")
 
+        if self.history is not None:
+            # Réglage des threads enregistré avec les options : les temps ne
+            # sont comparables qu'entre exécutions au même réglage
+            run_info = dict(self.run_info)
+            run_info['options'] = {**(run_info.get('options') or {}), 'blas_threads': BLAS_THREADS}
+            run_id = self.history.record(self.results, self.samples, **run_info)
+            print(f"✓ Exécution #{run_id} ajoutée à l'historique: {self.history.path}")
+
         # Créer un graphique comparatif
         self._plot_comparison(df)
 
@@ -164,29 +457,37 @@ class BenchmarkRunner:
 
     def _plot_comparison(self, df):
         """Crée un graphique comparatif des modèles."""
-        fig, axes = plt.subplots(2, 2, figsize=(14, 10))
-
-        # Accuracy
-        axes[0, 0].barh(df['model'], df['accuracy'])
-        axes[0, 0].set_xlabel('Accuracy')
-        axes[0, 0].set_title('Accuracy par modèle')
-        axes[0, 0].set_xlim([0, 1])
-
-        # F1 Score (weighted)
-        axes[0, 1].barh(df['model'], df['f1_weighted'])
-        axes[0, 1].set_xlabel('F1 Score (weighted)')
-        axes[0, 1].set_title('F1 Score par modèle')
-        axes[0, 1].set_xlim([0, 1])
-
-        # Temps d'entraînement
-        axes[1, 0].barh(df['model'], df['train_time'])
-        axes[1, 0].set_xlabel('Temps (secondes)')
-        axes[1, 0].set_title('Temps d\'entraînement')
-
-        # Temps d'inférence (pour 1000 samples)
-        axes[1, 1].barh(df['model'], df['inference_time_per_1000'])
-        axes[1, 1].set_xlabel('Temps (ms)')
-        axes[1, 1].set_title('Temps d\'inférence (1000 samples)')
+        # (colonne, label de l'axe, titre, bornes de l'axe)
+        panels = [
+            ('accuracy', 'Accuracy', 'Accuracy par modèle', [0, 1]),
+            ('f1_weighted', 'F1 Score (weighted)', 'F1 Score par modèle', [0, 1]),
+            ('train_time', 'Temps (secondes)', 'Temps d\'entraînement', None),
+            ('inference_time_per_1000', 'Temps (ms)', 'Temps d\'inférence (1000 samples)', None),
+        ]
+        if RECOMMENDATION_LATENCY_COLUMN in df.columns:
+            panels += [
+                ('latency_p95_ms_b1', 'Temps (ms)', 'Latence p95 (1 titre)', None),
+                ('throughput_bfull', 'Titres / seconde', 'Débit (batch complet)', None),
+            ]
+        if 'cascade_rules_fraction' in df.columns:
+            panels.append(('cascade_rules_fraction', 'Part des titres', 'Cascade : titres résolus par les règles', [0, 1]))
+        if 'embedding_bytes' in df.columns:
+            panels.append(('embedding_bytes', 'Octets / titre', 'Taille des embeddings réduits', None))
+        if 'peak_mem_predict_mb' in df.columns:
+            panels += [
+                ('peak_mem_predict_mb', 'Mémoire (MB)', 'Pic mémoire (predict)', None),
+                ('model_size_kb', 'Taille (KB)', 'Taille du modèle picklé', None),
+            ]
+
+        n_rows = (len(panels) + 1) // 2
+        fig, axes = plt.subplots(n_rows, 2, figsize=(14, 5 * n_rows))
+
+        for ax, (column, xlabel, title, xlim) in zip(axes.flat, panels):
+            ax.barh(df['model'], df[column])
+            ax.set_xlabel(xlabel)
+            ax.set_title(title)
+            if xlim is not None:
+                ax.set_xlim(xlim)
 
         plt.tight_layout()
         output_path = self.output_dir / 'model_comparison.png'
@@ -195,38 +496,66 @@ class BenchmarkRunner:
         print(f"✓ Graphique comparatif sauvegardé: {output_path}")
 
     def _recommend_model(self, df):
-        """Recommande le meilleur modèle en fonction des métriques."""
+        """
+        Recommande le meilleur modèle en fonction des métriques.
+
+        La vitesse est jugée sur la latence p95 d'un titre seul si elle a été
+        mesurée (mode latence), sinon sur le temps d'inférence moyen.
+        Avec un budget mémoire, seuls les modèles qui le respectent peuvent
+        être recommandés.
+        """
         print("\n" + "="*70)
         print("RECOMMANDATION")
         print("="*70)
 
+        all_models = df
+        over_budget = set()
+        if self.memory_budget_mb is not None and 'peak_mem_predict_mb' in df.columns:
+            footprint = df['model_size_kb'] / 1024 + df['peak_mem_predict_mb']
+            over_budget = set(df.loc[footprint > self.memory_budget_mb, 'model'])
+            print(f"\nBudget mémoire: {self.memory_budget_mb:.1f}MB "
+                  f"({len(over_budget)} modèle(s) hors budget)")
+            if len(over_budget) == len(df):
+                print("   ⚠ Aucun modèle ne respecte le budget, il est ignoré")
+                over_budget = set()
+            df = df[~df['model'].isin(over_budget)]
+
+        if RECOMMENDATION_LATENCY_COLUMN in df.columns:
+            speed_column = RECOMMENDATION_LATENCY_COLUMN
+            speed_label = "Latence p95 (1 titre)"
+        else:
+            speed_column = 'inference_time_per_1000'
+            speed_label = "Temps inférence (1000 samples)"
+
         # Le meilleur modèle par F1 score
         best_f1 = df.iloc[0]
         print(f"\n🏆 Meilleur F1 Score: {best_f1['model']}")
         print(f"   - F1 (weighted): {best_f1['f1_weighted']:.4f}")
         print(f"   - Accuracy: {best_f1['accuracy']:.4f}")
-        print(f"   - Temps inférence (1000 samples): {best_f1['inference_time_per_1000']:.2f}ms")
+        print(f"   - {speed_label}: {best_f1[speed_column]:.2f}ms")
 
         # Le modèle le plus rapide avec performance acceptable
         # On considère "acceptable" comme étant au moins 95% du meilleur F1
         threshold = best_f1['f1_weighted'] * 0.95
         acceptable_models = df[df['f1_weighted'] >= threshold]
-        fastest = acceptable_models.sort_values('inference_time_per_1000').iloc[0]
+        fastest = acceptable_models.sort_values(speed_column).iloc[0]
 
         if fastest['model'] != best_f1['model']:
             print(f"\n⚡ Modèle le plus rapide (performance acceptable):")
             print(f"   Modèle: {fastest['model']}")
             print(f"   - F1 (weighted): {fastest['f1_weighted']:.4f} ({(fastest['f1_weighted']/best_f1['f1_weighted']*100):.1f}% du meilleur)")
-            print(f"   - Temps inférence (1000 samples): {fastest['inference_time_per_1000']:.2f}ms")
-            print(f"   - Gain de vitesse: {(best_f1['inference_time_per_1000']/fastest['inference_time_per_1000']):.1f}x")
+            print(f"   - {speed_label}: {fastest[speed_column]:.2f}ms")
+            print(f"   - Gain de vitesse: {(best_f1[speed_column]/fastest[speed_column]):.1f}x")
 
         # Analyse du rapport performance/vitesse
         print(f"\n💡 Analyse:")
-        for _, row in df.iterrows():
+        for _, row in all_models.iterrows():
             perf_ratio = row['f1_weighted'] / best_f1['f1_weighted']
-            speed_ratio = fastest['inference_time_per_1000'] / row['inference_time_per_1000']
+            speed_ratio = fastest[speed_column] / row[speed_column]
 
-            if perf_ratio < 0.90:
+            if row['model'] in over_budget:
+                print(f"   - {row['model']}: Hors budget mémoire")
+            elif perf_ratio < 0.90:
                 print(f"   - {row['model']}: Performance insuffisante ({perf_ratio*100:.1f}% du meilleur)")
             elif speed_ratio < 0.5:
                 print(f"   - {row['model']}: Trop lent ({speed_ratio*100:.1f}% de la vitesse du plus rapide)")
@@ -234,25 +563,125 @@ class BenchmarkRunner:
                 print(f"   - {row['model']}: Bon équilibre performance/vitesse ✓")
 
 
-def load_data(data_path):
+def _benchmark_model(model, name, X_train, X_val, y_train, y_val,
+                     benchmark_options, capture_output=False):
+    """
+    Entraîne et évalue un modèle (exécuté dans un worker en mode parallèle).
+
+    Args:
+        benchmark_options: Options de ModelBenchmark
+        capture_output: Si True, les logs sont capturés et renvoyés au lieu
+                        d'être affichés (évite l'entrelacement entre workers)
+
+    Returns:
+        Tuple (benchmark, y_pred, log)
+    """
+    benchmark = ModelBenchmark(model, name, **benchmark_options)
+    buffer = io.StringIO()
+    with redirect_stdout(buffer) if capture_output else nullcontext():
+        benchmark.train(X_train, y_train)
+        y_pred = benchmark.evaluate(X_val, y_val)
+        if benchmark.latency:
+            benchmark.measure_latency(X_val)
+        if benchmark.profile_memory:
+            benchmark.measure_memory(X_train, y_train, X_val)
+    return benchmark, y_pred, buffer.getvalue()
+
+
+def _json_export_size(model):
+    """
+    Taille (octets) de l'export JSON de l'extension pour ce modèle, ou NaN
+    si le pipeline n'est pas exportable (TF-IDF + classificateur linéaire
+    one-vs-rest, ou SVC linéaire one-vs-one replié par paire).
+    """
+    if not isinstance(model, Pipeline):
+        return np.nan
+    vectorizer = getattr(model.steps[0][1], 'vectorizer', None)
+    classifier = model.steps[-1][1]
+    if not hasattr(vectorizer, 'idf_'):
+        return np.nan
+
+    categories = classifier.classes_.tolist()
+    if isinstance(classifier, SVC):
+        if classifier.kernel != 'linear':
+            return np.nan
+        model_data = build_ovo_model_data(vectorizer, classifier, categories)
+    else:
+        coef = getattr(classifier, 'coef_', None)
+        # Une ligne de poids par classe (une seule en binaire)
+        n_rows = 1 if len(categories) == 2 else len(categories)
+        if coef is None or coef.shape[0] != n_rows:
+            return np.nan
+        model_data = build_model_data(vectorizer, classifier, categories)
+    return len(json.dumps(model_data, ensure_ascii=False).encode('utf-8'))
+
+
+def _available_cpus():
+    """Liste des cœurs utilisables par ce processus."""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _effective_n_jobs(n_jobs, n_tasks):
+    """Convertit n_jobs (None, -1, n) en un nombre de processus concret."""
+    if n_jobs is None:
+        n_jobs = 1
+    elif n_jobs < 0:
+        n_jobs = max(1, len(_available_cpus()) + 1 + n_jobs)
+    return max(1, min(n_jobs, n_tasks))
+
+
+def _init_worker(cpu_queue):
+    """
+    Isole chaque worker pour que les mesures de temps restent comparables
+    au mode séquentiel : un cœur dédié et des bibliothèques BLAS/OpenMP
+    limitées à un thread.
+    """
+    if hasattr(os, 'sched_setaffinity') and not cpu_queue.empty():
+        try:
+            os.sched_setaffinity(0, {cpu_queue.get_nowait()})
+        except Exception:
+            pass
+    # La limite reste active pour toute la durée de vie du worker
+    threadpool_limits(limits=BLAS_THREADS)
+
+
+def load_data(data_path, split='stratified', chunk_size=100_000):
     """
     Charge le dataset et le divise en train/val.
 
     Args:
-        data_path: Chemin vers le fichier CSV
+        data_path: Chemin vers le fichier CSV (ou Parquet avec split='hash')
+        split: 'stratified' (train_test_split 80/20 en mémoire) ou 'hash'
+               (lecture par morceaux et split par hash du titre, le même
+               que models/train_out_of_core.py)
+        chunk_size: Taille des morceaux lus avec split='hash'
 
     Returns:
         X_train, X_val, y_train, y_val, label_names
     """
-    df = pd.read_csv(data_path)
-
-    # Split train/val (80/20)
-    train_df, val_df = train_test_split(
-        df,
-        test_size=0.2,
-        random_state=42,
-        stratify=df['category']
-    )
+    if split == 'hash':
+        train_parts, val_parts = [], []
+        for chunk in iter_chunks(data_path, chunk_size):
+            mask = split_mask(chunk['title'].values)
+            val_parts.append(chunk[mask])
+            train_parts.append(chunk[~mask])
+        train_df = pd.concat(train_parts, ignore_index=True)
+        val_df = pd.concat(val_parts, ignore_index=True)
+        df = pd.concat([train_df, val_df], ignore_index=True)
+    elif split == 'stratified':
+        df = pd.read_csv(data_path)
+
+        # Split train/val (80/20)
+        train_df, val_df = train_test_split(
+            df,
+            test_size=0.2,
+            random_state=42,
+            stratify=df['category']
+        )
+    else:
+        raise ValueError(f"Split inconnu: {split!r}")
 
     # Extraire les titres et les catégories
     X_train = train_df['title'].values
@@ -0,0 +1,145 @@
+"""
+Cache partagé des embeddings pour le benchmark.
+
+Dans la grille de `create_models()`, chaque embedding est combiné avec
+plusieurs classificateurs : sans cache, le même TF-IDF/BOW/Keywords est
+réentraîné et recalculé pour chaque pipeline sur les mêmes données.
+`CachedEmbedding` enveloppe un embedding et mémorise, par configuration et
+empreinte des données, l'embedding entraîné et les matrices de features.
+"""
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import joblib
+from sklearn.base import BaseEstimator, TransformerMixin, clone
+
+
+def fingerprint(X):
+    """Empreinte (hash) d'un ensemble de textes."""
+    return joblib.hash(list(map(str, X)))
+
+
+def config_key(embedding):
+    """Clé identifiant la configuration d'un embedding (indépendante de son état)."""
+    return joblib.hash(clone(embedding))
+
+
+class EmbeddingCache:
+    """
+    Cache LRU en mémoire, optionnellement adossé à un dossier sur disque.
+
+    Sur disque, les entrées sont des fichiers joblib rechargés en
+    memory-map : ils sont partagés entre processus (mode parallèle du
+    benchmark) et entre exécutions successives.
+    """
+
+    def __init__(self, max_entries=32, cache_dir=None):
+        """
+        Args:
+            max_entries: Nombre maximum d'entrées gardées en mémoire
+            cache_dir: Dossier de cache sur disque (None = mémoire seulement)
+        """
+        self.max_entries = max_entries
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        # Les entrées en mémoire ne sont pas envoyées aux workers
+        state = self.__dict__.copy()
+        state['_entries'] = OrderedDict()
+        return state
+
+    def _path(self, key):
+        return self.cache_dir / f"{key}.joblib"
+
+    def get(self, key):
+        """Renvoie l'entrée associée à key, ou None."""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+        if self.cache_dir is not None and self._path(key).exists():
+            value = joblib.load(self._path(key), mmap_mode='r')
+            self._store(key, value)
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        """Ajoute une entrée (et l'écrit sur disque si configuré)."""
+        if self.cache_dir is not None:
+            path = self._path(key)
+            tmp_path = path.with_suffix('.tmp')
+            joblib.dump(value, tmp_path)
+            tmp_path.replace(path)
+        self._store(key, value)
+
+    def _store(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Vide le cache en mémoire et sur disque."""
+        self._entries.clear()
+        if self.cache_dir is not None:
+            for path in self.cache_dir.glob('*.joblib'):
+                path.unlink()
+
+
+class CachedEmbedding(BaseEstimator, TransformerMixin):
+    """
+    Embedding dont l'entraînement et les transformations passent par un
+    `EmbeddingCache`.
+
+    Le temps de calcul réel (mesuré lors du premier calcul) est conservé
+    dans `fit_time_` et `transform_time_`, pour que le benchmark puisse
+    l'imputer à chaque pipeline de façon identique s'il le souhaite.
+    """
+
+    def __init__(self, embedding, cache):
+        """
+        Args:
+            embedding: Embedding à mettre en cache
+            cache: Instance d'EmbeddingCache partagée entre pipelines
+        """
+        self.embedding = embedding
+        self.cache = cache
+
+    def fit(self, X, y=None):
+        """Entraîne l'embedding, ou le récupère depuis le cache."""
+        self.config_key_ = config_key(self.embedding)
+        self.fit_key_ = f"{self.config_key_}-fit-{fingerprint(X)}"
+
+        entry = self.cache.get(self.fit_key_)
+        if entry is None:
+            start = time.perf_counter()
+            fitted = clone(self.embedding).fit(X, y)
+            entry = (fitted, time.perf_counter() - start)
+            self.cache.put(self.fit_key_, entry)
+
+        self.embedding_, self.fit_time_ = entry
+        return self
+
+    def transform(self, X):
+        """Transforme les textes, en réutilisant une matrice déjà calculée."""
+        key = f"{self.fit_key_}-transform-{fingerprint(X)}"
+
+        entry = self.cache.get(key)
+        if entry is None:
+            start = time.perf_counter()
+            features = self.embedding_.transform(X)
+            entry = (features, time.perf_counter() - start)
+            self.cache.put(key, entry)
+
+        features, self.transform_time_ = entry
+        return features
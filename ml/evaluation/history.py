@@ -0,0 +1,490 @@
+"""
+Historique des benchmarks et détection de régressions entre exécutions.
+
+Chaque exécution de BenchmarkRunner (avec un historique) est ajoutée à une
+base SQLite, sans jamais modifier les exécutions précédentes. Une exécution
+est identifiée par son commit git (et si l'arbre était modifié), le hash du
+dataset et son split, et la machine. Pour chaque modèle, la base garde les
+métriques du rapport, les mesures brutes de latence et les prédictions sur
+la validation.
+
+La commande compare confronte une exécution à une exécution de référence
+(par défaut : les 3 précédentes sur le même dataset et la même machine,
+qui donnent une bande de bruit entre exécutions) :
+
+    - latence / débit : test de Mann-Whitney unilatéral sur les mesures
+      brutes de chaque taille de batch (--latency)
+    - F1 macro : bootstrap apparié sur les prédictions (même validation)
+    - mémoire : pics tracemalloc et tailles du modèle (--profile-memory),
+      mesures déterministes comparées à une tolérance relative
+
+Une régression n'est signalée que si elle est significative (p < alpha)
+et dépasse la tolérance. Le code de sortie est 1 s'il y en a au moins une.
+
+Usage :
+    python ml/evaluation/history.py list
+    python ml/evaluation/history.py compare
+    python ml/evaluation/history.py compare --baseline 3f2a1bc --candidate 12
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy.stats import mannwhitneyu
+
+# Base par défaut, hors de data/evaluation_results (réécrit à chaque exécution)
+DEFAULT_HISTORY_PATH = Path(__file__).parent.parent.parent / "data" / "benchmark_history.sqlite"
+
+# Métriques mémoire comparées à une tolérance relative (plus petit = mieux)
+MEMORY_METRICS = ('peak_mem_fit_mb', 'peak_mem_predict_mb', 'model_size_kb', 'json_export_size_kb')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    git_commit TEXT,
+    git_dirty INTEGER,
+    dataset_hash TEXT,
+    split TEXT,
+    machine TEXT NOT NULL,
+    machine_info TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    options TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    model TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (run_id, model, metric)
+);
+CREATE TABLE IF NOT EXISTS samples (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    model TEXT NOT NULL,
+    name TEXT NOT NULL,
+    dtype TEXT NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (run_id, model, name)
+);
+CREATE INDEX IF NOT EXISTS runs_key ON runs (dataset_hash, split, machine);
+"""
+
+
+def git_revision(repo_dir=None):
+    """
+    Commit courant et état de l'arbre de travail.
+
+    Returns:
+        Tuple (hash du commit ou None hors d'un dépôt git, True si modifié)
+    """
+    repo_dir = repo_dir or Path(__file__).parent
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=repo_dir, check=True,
+                                capture_output=True, text=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                cwd=repo_dir, check=True, capture_output=True, text=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, bool(status.strip())
+
+
+def machine_info():
+    """
+    Description de la machine.
+
+    Returns:
+        Tuple (identifiant court, dict détaillé)
+    """
+    cpu_count = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    info = {
+        'hostname': platform.node(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': cpu_count,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+    }
+    return f"{info['hostname']}/{info['machine']}/{cpu_count}cpu", info
+
+
+class BenchmarkHistory:
+    """Base SQLite des exécutions de benchmark (ajout uniquement)."""
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH):
+        """
+        Args:
+            path: Fichier SQLite (créé s'il n'existe pas)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(_SCHEMA)
+
+    def _connect(self):
+        # timeout : plusieurs benchmarks peuvent écrire dans la même base
+        return sqlite3.connect(self.path, timeout=30)
+
+    def record(self, results, samples=None, dataset_hash=None, split=None, options=None):
+        """
+        Ajoute une exécution.
+
+        Args:
+            results: Liste de dicts {'model': nom, métrique: valeur, ...}
+                     (BenchmarkRunner.results)
+            samples: Dict {modèle: {nom: array}} des mesures brutes ;
+                     'y_true' et 'y_pred' sont les labels de la validation
+            dataset_hash: Hash du fichier de données
+            split: Méthode de split train/val
+            options: Options de l'exécution (sérialisées en JSON)
+
+        Returns:
+            Identifiant de l'exécution
+        """
+        samples = samples or {}
+        commit, dirty = git_revision()
+        machine, info = machine_info()
+
+        # Labels stockés en codes entiers, relatifs à la liste de l'exécution
+        labels = sorted({str(label) for model_samples in samples.values()
+                         for name in ('y_true', 'y_pred') if name in model_samples
+                         for label in model_samples[name]})
+
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "INSERT INTO runs (created_at, git_commit, git_dirty, dataset_hash, split, "
+                "machine, machine_info, labels, options) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), commit, None if dirty is None else int(dirty), dataset_hash, split,
+                 machine, json.dumps(info), json.dumps(labels),
+                 json.dumps(options or {}, default=str))
+            )
+            run_id = cursor.lastrowid
+
+            rows = []
+            for result in results:
+                for metric, value in result.items():
+                    if metric == 'model' or not isinstance(value, (int, float, np.number)):
+                        continue
+                    value = float(value)
+                    rows.append((run_id, result['model'], metric, None if np.isnan(value) else value))
+            connection.executemany("INSERT INTO results VALUES (?, ?, ?, ?)", rows)
+
+            rows = []
+            for model, model_samples in samples.items():
+                for name, values in model_samples.items():
+                    if name in ('y_true', 'y_pred'):
+                        values = np.searchsorted(labels, np.asarray(values).astype(str)).astype('<i4')
+                    else:
+                        values = np.asarray(values, dtype='<f8')
+                    rows.append((run_id, model, name, values.dtype.str, values.tobytes()))
+            connection.executemany("INSERT INTO samples VALUES (?, ?, ?, ?, ?)", rows)
+        return run_id
+
+    def runs(self):
+        """Toutes les exécutions, de la plus ancienne à la plus récente."""
+        with self._connect() as connection:
+            runs = pd.read_sql_query("SELECT * FROM runs ORDER BY run_id", connection)
+        runs['created_at'] = pd.to_datetime(runs['created_at'], unit='s')
+        return runs
+
+    def run(self, run_id):
+        """Une exécution (Series), KeyError si elle n'existe pas."""
+        runs = self.runs().set_index('run_id')
+        return runs.loc[int(run_id)]
+
+    def metrics(self, run_id):
+        """Métriques d'une exécution : DataFrame (modèle x métrique)."""
+        with self._connect() as connection:
+            rows = pd.read_sql_query("SELECT model, metric, value FROM results WHERE run_id = ?",
+                                     connection, params=(int(run_id),))
+        return rows.pivot(index='model', columns='metric', values='value')
+
+    def samples(self, run_id, model):
+        """Mesures brutes d'un modèle : {nom: array}, labels décodés pour y_true / y_pred."""
+        labels = np.asarray(json.loads(self.run(run_id)['labels']), dtype=object)
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT name, dtype, data FROM samples WHERE run_id = ? AND model = ?",
+                (int(run_id), model)
+            ).fetchall()
+        samples = {}
+        for name, dtype, data in rows:
+            values = np.frombuffer(data, dtype=dtype)
+            samples[name] = labels[values] if name in ('y_true', 'y_pred') else values
+        return samples
+
+    def resolve(self, reference, like=None):
+        """
+        Identifiant d'exécution à partir d'un numéro ou d'un préfixe de commit.
+
+        Un numéro s'écrit '#12' (comme dans `list`) ou se passe en int : une
+        chaîne de chiffres seule est un préfixe de commit (ex. '1234567').
+
+        Args:
+            reference: Numéro d'exécution ('#12' ou 12), préfixe de commit,
+                       ou None (dernière)
+            like: Exécution dont le dataset, le split et la machine doivent
+                  correspondre (pour une référence par commit ou par défaut)
+
+        Returns:
+            Identifiant, ou None si aucune exécution ne correspond
+        """
+        runs = self.runs()
+        if isinstance(reference, int) or str(reference).startswith('#'):
+            number = str(reference).lstrip('#')
+            if not number.isdigit():
+                return None
+            return int(number) if int(number) in set(runs['run_id']) else None
+        if like is not None:
+            runs = runs[(runs['dataset_hash'] == like['dataset_hash'])
+                        & (runs['split'] == like['split'])
+                        & (runs['machine'] == like['machine'])]
+        if reference is not None:
+            runs = runs[runs['git_commit'].fillna('').str.startswith(str(reference))]
+        return int(runs['run_id'].iloc[-1]) if len(runs) else None
+
+
+def _macro_f1(y_true, y_pred, n_labels, weights=None):
+    """F1 macro (comme sklearn) sur des labels entiers, avec des poids par titre."""
+    correct = y_true == y_pred
+    tp = np.bincount(y_true[correct], weights=None if weights is None else weights[correct],
+                     minlength=n_labels)
+    support = np.bincount(y_true, weights=weights, minlength=n_labels)
+    predicted = np.bincount(y_pred, weights=weights, minlength=n_labels)
+    denominator = support + predicted
+    present = denominator > 0
+    return np.mean(2 * tp[present] / denominator[present])
+
+
+def bootstrap_f1_regression(y_true, y_base, y_candidate, n_bootstrap=500, seed=42):
+    """
+    Bootstrap apparié (poids de Poisson) de la différence de F1 macro.
+
+    Returns:
+        Tuple (différence candidate - référence, p-valeur unilatérale :
+        part des rééchantillonnages où la candidate n'est pas moins bonne)
+    """
+    labels, codes = np.unique(np.concatenate([y_true, y_base, y_candidate]).astype(str),
+                              return_inverse=True)
+    y_true, y_base, y_candidate = np.split(codes, 3)
+    n_labels = len(labels)
+    difference = _macro_f1(y_true, y_candidate, n_labels) - _macro_f1(y_true, y_base, n_labels)
+
+    rng = np.random.default_rng(seed)
+    not_worse = 0
+    for _ in range(n_bootstrap):
+        weights = rng.poisson(1.0, size=len(y_true)).astype(np.float64)
+        delta = (_macro_f1(y_true, y_candidate, n_labels, weights)
+                 - _macro_f1(y_true, y_base, n_labels, weights))
+        not_worse += delta >= 0
+    return difference, (not_worse + 1) / (n_bootstrap + 1)
+
+
+def compare_runs(history, baseline_ids, candidate_id, alpha=0.01, latency_tolerance=0.10,
+                 f1_tolerance=0.005, memory_tolerance=0.10, n_bootstrap=500):
+    """
+    Compare une exécution à une ou plusieurs exécutions de référence, modèle par modèle.
+
+    Plusieurs références donnent une bande de bruit entre exécutions : les
+    latences de référence sont regroupées pour le test, et la hausse est
+    mesurée par rapport à la plus lente des médianes de référence (la plus
+    grande valeur pour la mémoire). Le F1 est comparé à la référence la
+    plus récente.
+
+    Args:
+        history: BenchmarkHistory
+        baseline_ids: Exécution(s) de référence, de la plus ancienne à la plus récente
+        candidate_id: Exécution candidate
+        alpha: Seuil de significativité des tests
+        latency_tolerance: Hausse relative de latence médiane tolérée
+        f1_tolerance: Baisse absolue de F1 macro tolérée
+        memory_tolerance: Hausse relative des métriques mémoire tolérée
+        n_bootstrap: Rééchantillonnages du bootstrap de F1
+
+    Returns:
+        DataFrame (model, metric, baseline, candidate, change, p_value, regression)
+    """
+    if np.ndim(baseline_ids) == 0:
+        baseline_ids = [baseline_ids]
+    base_metrics = [history.metrics(run_id) for run_id in baseline_ids]
+    candidate_metrics = history.metrics(candidate_id)
+    rows = []
+
+    models = candidate_metrics.index
+    for metrics in base_metrics:
+        models = models.intersection(metrics.index)
+
+    def base_values(model, metric):
+        values = [m.loc[model, metric] for m in base_metrics if metric in m.columns]
+        return [v for v in values if not pd.isna(v)]
+
+    for model in models:
+        base_samples = [history.samples(run_id, model) for run_id in baseline_ids]
+        candidate_samples = history.samples(candidate_id, model)
+
+        # Latence (et débit, calculé sur les mêmes mesures) par taille de batch
+        names = set(candidate_samples)
+        for samples in base_samples:
+            names &= set(samples)
+        for name in sorted(n for n in names if n.startswith('latency_ms_')):
+            candidate = candidate_samples[name]
+            p_value = mannwhitneyu(candidate, np.concatenate([b[name] for b in base_samples]),
+                                   alternative='greater').pvalue
+            reference = max(np.median(b[name]) for b in base_samples)
+            change = np.median(candidate) / reference - 1
+            regression = bool(p_value < alpha and change > latency_tolerance)
+            rows.append((model, name, reference, np.median(candidate), change, p_value, regression))
+
+            throughput = 'throughput_' + name[len('latency_ms_'):]
+            references = base_values(model, throughput)
+            if references and throughput in candidate_metrics.columns:
+                candidate_value = candidate_metrics.loc[model, throughput]
+                rows.append((model, throughput, min(references), candidate_value,
+                             candidate_value / min(references) - 1, p_value, regression))
+
+        # F1 macro : bootstrap apparié si la validation est la même
+        base_f1 = base_values(model, 'f1_macro')
+        if base_f1 and 'f1_macro' in candidate_metrics.columns:
+            base_value = base_f1[-1]
+            candidate_value = candidate_metrics.loc[model, 'f1_macro']
+            latest = base_samples[-1]
+            p_value = np.nan
+            same_validation = ('y_true' in latest and 'y_true' in candidate_samples
+                               and np.array_equal(latest['y_true'], candidate_samples['y_true']))
+            if same_validation:
+                _, p_value = bootstrap_f1_regression(latest['y_true'], latest['y_pred'],
+                                                     candidate_samples['y_pred'], n_bootstrap)
+                significant = p_value < alpha
+            else:
+                significant = True  # pas de test possible : tolérance seule
+            regression = bool(significant and base_value - candidate_value > f1_tolerance)
+            rows.append((model, 'f1_macro', base_value, candidate_value,
+                         candidate_value - base_value, p_value, regression))
+
+        # Mémoire : mesures déterministes, tolérance relative
+        for metric in MEMORY_METRICS:
+            references = base_values(model, metric)
+            if not references or metric not in candidate_metrics.columns:
+                continue
+            base_value = max(references)
+            candidate_value = candidate_metrics.loc[model, metric]
+            if pd.isna(candidate_value) or base_value <= 0:
+                continue
+            change = candidate_value / base_value - 1
+            rows.append((model, metric, base_value, candidate_value, change, np.nan,
+                         bool(change > memory_tolerance)))
+
+    return pd.DataFrame(rows, columns=['model', 'metric', 'baseline', 'candidate',
+                                       'change', 'p_value', 'regression'])
+
+
+def _describe(run):
+    commit = (run['git_commit'] or '?')[:10] + ('+' if run['git_dirty'] else '')
+    return f"#{run.name} ({commit}, {run['created_at']:%Y-%m-%d %H:%M}, {run['machine']})"
+
+
+def main():
+    """Liste les exécutions ou compare deux exécutions (code 1 si régression)."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--history', type=Path, default=DEFAULT_HISTORY_PATH,
+                        help="Base SQLite de l'historique")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('list', help="Liste les exécutions enregistrées")
+
+    compare = commands.add_parser('compare', help="Compare une exécution à une référence")
+    compare.add_argument('--candidate', default=None,
+                         help="Numéro d'exécution (#12) ou préfixe de commit (défaut : dernière exécution)")
+    compare.add_argument('--baseline', default=None,
+                         help="Numéro d'exécution (#12) ou préfixe de commit (défaut : les --baseline-runs "
+                              "exécutions précédentes sur le même dataset et la même machine)")
+    compare.add_argument('--baseline-runs', type=int, default=3,
+                         help="Nombre d'exécutions de référence par défaut (bande de bruit)")
+    compare.add_argument('--alpha', type=float, default=0.01, help="Seuil de significativité")
+    compare.add_argument('--latency-tolerance', type=float, default=0.10,
+                         help="Hausse relative de latence médiane tolérée")
+    compare.add_argument('--f1-tolerance', type=float, default=0.005,
+                         help="Baisse absolue de F1 macro tolérée")
+    compare.add_argument('--memory-tolerance', type=float, default=0.10,
+                         help="Hausse relative de mémoire / taille tolérée")
+    compare.add_argument('--bootstrap', type=int, default=500,
+                         help="Rééchantillonnages du bootstrap de F1")
+    args = parser.parse_args()
+
+    if not args.history.exists():
+        parser.error(f"Historique introuvable: {args.history}")
+    history = BenchmarkHistory(args.history)
+
+    if args.command == 'list':
+        runs = history.runs()
+        for _, run in runs.set_index('run_id', drop=False).iterrows():
+            n_models = len(history.metrics(run['run_id']))
+            print(f"  {_describe(run)}: {n_models} modèles, dataset {str(run['dataset_hash'])[:12]} "
+                  f"({run['split']})")
+        return
+
+    candidate_id = history.resolve(args.candidate)
+    if candidate_id is None:
+        parser.error(f"Exécution candidate introuvable: {args.candidate}")
+    candidate = history.run(candidate_id)
+
+    if args.baseline is None:
+        # Exécutions précédentes comparables
+        runs = history.runs()
+        earlier = runs[(runs['run_id'] < candidate_id)
+                       & (runs['dataset_hash'] == candidate['dataset_hash'])
+                       & (runs['split'] == candidate['split'])
+                       & (runs['machine'] == candidate['machine'])]
+        baseline_ids = [int(run_id) for run_id in earlier['run_id'].iloc[-args.baseline_runs:]]
+    else:
+        baseline_id = history.resolve(args.baseline, like=candidate)
+        baseline_ids = [] if baseline_id is None else [baseline_id]
+    if not baseline_ids:
+        parser.error("Aucune exécution de référence comparable (même dataset, split et machine)")
+    baseline = history.run(baseline_ids[-1])
+
+    print("="*70)
+    print("COMPARAISON DE BENCHMARKS")
+    print("="*70)
+    print()
+    for baseline_id in baseline_ids:
+        print(f"Référence : {_describe(history.run(baseline_id))}")
+    print(f"Candidate : {_describe(candidate)}")
+    if baseline['machine'] != candidate['machine']:
+        print("⚠ Machines différentes : latences et débits peu comparables")
+    if baseline['dataset_hash'] != candidate['dataset_hash']:
+        print("⚠ Datasets différents : F1 comparé à la tolérance seule")
+
+    report = compare_runs(history, baseline_ids, candidate_id, alpha=args.alpha,
+                          latency_tolerance=args.latency_tolerance, f1_tolerance=args.f1_tolerance,
+                          memory_tolerance=args.memory_tolerance, n_bootstrap=args.bootstrap)
+    if report.empty:
+        print("\n✗ Aucun modèle ni métrique en commun")
+        sys.exit(1)
+
+    regressions = report[report['regression']]
+    print(f"\n{report['model'].nunique()} modèles, {len(report)} comparaisons")
+    if regressions.empty:
+        print("✓ Aucune régression significative")
+        return
+
+    print(f"\n✗ {len(regressions)} régression(s):")
+    for _, row in regressions.iterrows():
+        change = (f"{row['change']:+.4f}" if row['metric'] == 'f1_macro'
+                  else f"{row['change'] * 100:+.1f}%")
+        p_value = '' if pd.isna(row['p_value']) else f", p={row['p_value']:.2g}"
+        print(f"  - {row['model']} / {row['metric']}: {row['baseline']:.4g} -> "
+              f"{row['candidate']:.4g} ({change}{p_value})")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Recherche d'hyperparamètres par successive halving (élimination par paliers).
+
+Au lieu d'entraîner chaque combinaison embedding + classificateur sur tout
+le train, chaque palier entraîne les candidats restants sur un
+sous-échantillon, les classe selon un objectif qui combine F1 et latence
+p95 d'un titre seul, et ne garde que le meilleur 1/eta, qui passe au
+palier suivant avec eta fois plus de données. Les survivants sont ensuite
+benchmarkés normalement (BenchmarkRunner).
+"""
+import io
+import math
+import time
+from contextlib import redirect_stdout
+
+import numpy as np
+import pandas as pd
+
+from evaluation.benchmark import ModelBenchmark
+
+
+def objective(f1, latency_p95_ms, latency_weight=0.05, reference_ms=1.0):
+    """
+    Objectif combiné : F1 macro pénalisé par la latence.
+
+    Chaque facteur 10 de latence p95 au-delà de reference_ms coûte
+    latency_weight points de F1 (latency_weight=0 : F1 seul).
+    """
+    slowdown = max(latency_p95_ms, reference_ms) / reference_ms
+    return f1 - latency_weight * math.log10(slowdown)
+
+
+def stratified_order(y, seed=42):
+    """
+    Ordre des indices tel que tout préfixe soit à peu près stratifié.
+
+    Les sous-échantillons des paliers sont des préfixes de cet ordre : ils
+    sont emboîtés (les données d'un palier contiennent celles du précédent).
+    """
+    y = np.asarray(y)
+    rng = np.random.default_rng(seed)
+    rank = np.empty(len(y))
+    for label in np.unique(y):
+        indices = np.flatnonzero(y == label)
+        # Rang fractionnaire dans la classe, après mélange
+        rank[rng.permutation(indices)] = (np.arange(len(indices)) + rng.random()) / len(indices)
+    return np.argsort(rank, kind='stable')
+
+
+class SuccessiveHalvingSearch:
+    """Successive halving sur une liste de pipelines candidats."""
+
+    def __init__(self, candidates, eta=3, min_samples=100, n_survivors=None,
+                 latency_weight=0.05, latency_trials=20, random_state=42):
+        """
+        Args:
+            candidates: Liste de tuples (pipeline, nom)
+            eta: Facteur de réduction : 1/eta des candidats est gardé à
+                 chaque palier, qui reçoit eta fois plus de données
+            min_samples: Taille du sous-échantillon du premier palier
+            n_survivors: Nombre de candidats à renvoyer (défaut : eta)
+            latency_weight: Poids de la latence dans l'objectif (voir objective)
+            latency_trials: Mesures de latence (1 titre) par candidat et palier
+            random_state: Graine des sous-échantillons
+        """
+        self.candidates = candidates
+        self.eta = eta
+        self.min_samples = min_samples
+        self.n_survivors = n_survivors if n_survivors is not None else eta
+        self.latency_weight = latency_weight
+        self.latency_trials = latency_trials
+        self.random_state = random_state
+        self.history = []
+
+    def _evaluate(self, model, name, X_train, y_train, X_val, y_val):
+        """Entraîne et évalue un candidat (logs de ModelBenchmark masqués)."""
+        benchmark = ModelBenchmark(model, name, latency=True,
+                                   latency_trials=self.latency_trials, latency_warmup=2)
+        with redirect_stdout(io.StringIO()):
+            benchmark.train(X_train, y_train)
+            benchmark.evaluate(X_val, y_val)
+            benchmark.measure_latency(X_val, batch_sizes=(1,))
+        return benchmark.metrics
+
+    def run(self, X_train, y_train, X_val, y_val):
+        """
+        Exécute la recherche.
+
+        Returns:
+            Liste de tuples (pipeline, nom) des survivants, du meilleur au
+            moins bon objectif (à réentraîner sur tout le train)
+        """
+        X_train = np.asarray(X_train)
+        y_train = np.asarray(y_train)
+        order = stratified_order(y_train, self.random_state)
+
+        # (indice d'origine, pipeline, nom) : les survivants sont évalués dans
+        # l'ordre de la grille, pour que les pipelines d'un même embedding se
+        # suivent et profitent du cache d'embeddings
+        survivors = [(i, model, name) for i, (model, name) in enumerate(self.candidates)]
+        n_samples = min(self.min_samples, len(X_train))
+        rung = 0
+        start = time.perf_counter()
+        n_fits = 0
+
+        while True:
+            subset = order[:n_samples]
+            print(f"\nPalier {rung}: {len(survivors)} candidats, {n_samples} titres d'entraînement")
+
+            scored = []
+            for index, model, name in survivors:
+                try:
+                    metrics = self._evaluate(model, name, X_train[subset], y_train[subset],
+                                             X_val, y_val)
+                except Exception as e:
+                    # Configuration invalide sur ce sous-échantillon (ex: trop peu de voisins)
+                    print(f"  ✗ {name}: {e}")
+                    continue
+                n_fits += 1
+                score = objective(metrics['f1_macro'], metrics['latency_p95_ms_b1'],
+                                  self.latency_weight)
+                scored.append((score, index, model, name))
+                self.history.append({
+                    'rung': rung,
+                    'n_samples': n_samples,
+                    'model': name,
+                    'f1_macro': metrics['f1_macro'],
+                    'latency_p95_ms_b1': metrics['latency_p95_ms_b1'],
+                    'objective': score,
+                })
+
+            scored.sort(key=lambda item: item[0], reverse=True)
+            for score, _, _, name in scored[:3]:
+                print(f"  ✓ {name}: objectif {score:.4f}")
+
+            if n_samples >= len(X_train) or len(scored) <= self.n_survivors:
+                survivors = [(model, name) for _, _, model, name in scored[:self.n_survivors]]
+                break
+
+            n_keep = max(self.n_survivors, len(scored) // self.eta)
+            survivors = sorted(item[1:] for item in scored[:n_keep])
+            n_samples = min(n_samples * self.eta, len(X_train))
+            rung += 1
+
+        elapsed = time.perf_counter() - start
+        print(f"\n✓ Recherche terminée en {elapsed:.1f}s ({n_fits} entraînements, "
+              f"dont {sum(h['n_samples'] == len(X_train) for h in self.history)} sur tout le train, "
+              f"contre {len(self.candidates)} en recherche exhaustive)")
+        return survivors
+
+    def history_frame(self):
+        """Historique des évaluations (un enregistrement par candidat et palier)."""
+        return pd.DataFrame(self.history)
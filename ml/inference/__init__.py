@@ -0,0 +1 @@
+# Inference module
\ No newline at end of file
@@ -0,0 +1,271 @@
+"""
+Classification en masse de fichiers de titres (CSV, Parquet ou JSONL).
+
+Le fichier d'entrée est lu par morceaux ; chaque morceau est classé par un
+worker d'un pool de processus (modèle chargé une fois par worker) et écrit
+dans son propre fichier de résultats `part-NNNNN` du dossier de travail.
+Un morceau déjà écrit est sauté : après une interruption, relancer la même
+commande reprend au premier morceau manquant. Les parts sont enfin
+concaténées, dans l'ordre, dans le fichier de sortie.
+
+Colonnes de sortie : row (numéro de ligne), title, category, confidence,
+puis un score par classe (score_<classe>).
+
+Usage :
+    python ml/inference/bulk.py titres.parquet resultats.csv --model extension/model.json
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from dataset.chunked import iter_chunks
+from inference.cache import file_hash
+from inference.engine import InferenceEngine
+
+# Modèle du worker courant (chargé par _init_worker)
+_predictor = None
+
+
+def load_predictor(model_path):
+    """Export léger (.json / .bin) via InferenceEngine, ou pipeline picklé (.pkl / .joblib)."""
+    model_path = Path(model_path)
+    if model_path.suffix in ('.pkl', '.joblib'):
+        import joblib
+        return joblib.load(model_path)
+    return InferenceEngine.load(model_path)
+
+
+def _softmax(scores):
+    scores = scores - scores.max(axis=1, keepdims=True)
+    exp = np.exp(scores)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def score_titles(predictor, titles):
+    """
+    Classe des titres et calcule scores et confiance.
+
+    La confiance est la probabilité de la classe prédite : predict_proba
+    si l'export contient une calibration ou si le pipeline l'expose, sinon
+    softmax des scores one-vs-rest, ou part des votes pour un modèle
+    one-vs-one. Un pipeline sans decision_function ni predict_proba reçoit
+    des scores one-hot (confiance 1).
+
+    Returns:
+        Tuple (classes, catégories, scores (n, n_classes), confiance)
+    """
+    if isinstance(predictor, InferenceEngine):
+        scores = predictor.class_scores(titles).astype(np.float64)
+        classes = predictor.classes
+        if predictor.calibration is not None:
+            proba = predictor.predict_proba(titles)
+            confidence = proba[np.arange(len(titles)), np.argmax(scores, axis=1)]
+        elif predictor.pairs is None:
+            confidence = _softmax(scores).max(axis=1)
+        else:
+            confidence = scores.max(axis=1) / (len(classes) - 1)
+        return classes, classes[np.argmax(scores, axis=1)], scores, confidence
+
+    classes = predictor.classes_
+    categories = predictor.predict(titles)
+    predicted_idx = np.searchsorted(classes, categories)
+    scores = None
+    if hasattr(predictor, 'decision_function'):
+        scores = np.asarray(predictor.decision_function(titles), dtype=np.float64)
+        if scores.ndim == 1:  # cas binaire, comme calibration.decision_scores
+            scores = np.column_stack([-scores, scores])
+    if hasattr(predictor, 'predict_proba'):
+        proba = predictor.predict_proba(titles)
+        confidence = proba[np.arange(len(titles)), predicted_idx]
+        if scores is None:
+            scores = proba
+    elif scores is not None:
+        confidence = _softmax(scores).max(axis=1)
+    else:
+        # Ni scores ni probabilités : scores one-hot de la classe prédite
+        scores = np.zeros((len(titles), len(classes)))
+        scores[np.arange(len(titles)), predicted_idx] = 1.0
+        confidence = np.ones(len(titles))
+    return classes, categories, np.asarray(scores, dtype=np.float64), confidence
+
+
+def _init_worker(model_path):
+    """Charge le modèle une fois par worker, BLAS limité à un thread."""
+    global _predictor
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(limits=1)
+    _predictor = load_predictor(model_path)
+
+
+def _part_path(work_dir, index, output_format):
+    return Path(work_dir) / f"part-{index:05d}.{output_format}"
+
+
+def _classify_chunk(index, first_row, titles, work_dir, output_format):
+    """
+    Classe un morceau et écrit sa part (écriture atomique).
+
+    Returns:
+        Tuple (index, nombre de titres)
+    """
+    classes, categories, scores, confidence = score_titles(_predictor, titles)
+
+    result = pd.DataFrame({
+        'row': np.arange(first_row, first_row + len(titles)),
+        'title': titles,
+        'category': categories,
+        'confidence': np.round(confidence, 6),
+    })
+    for i, label in enumerate(classes):
+        result[f'score_{label}'] = np.round(scores[:, i], 6)
+
+    path = _part_path(work_dir, index, output_format)
+    tmp_path = path.with_suffix('.tmp')
+    if output_format == 'jsonl':
+        result.to_json(tmp_path, orient='records', lines=True, force_ascii=False)
+    else:
+        result.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return index, len(titles)
+
+
+def _check_manifest(work_dir, manifest):
+    """Vérifie qu'une reprise utilise la même entrée, le même modèle et les mêmes morceaux."""
+    manifest_path = Path(work_dir) / 'manifest.json'
+    if manifest_path.exists():
+        previous = json.loads(manifest_path.read_text())
+        if previous != manifest:
+            raise ValueError(
+                f"Le dossier de travail {work_dir} correspond à un autre traitement "
+                f"({previous}) : le supprimer ou en choisir un autre"
+            )
+    else:
+        manifest_path.write_text(json.dumps(manifest, indent=2))
+
+
+def _merge_parts(work_dir, n_chunks, output_path, output_format):
+    """Concatène les parts dans l'ordre, sans les charger en mémoire."""
+    tmp_path = output_path.with_name(output_path.name + '.tmp')
+    with open(tmp_path, 'wb') as out:
+        for index in range(n_chunks):
+            with open(_part_path(work_dir, index, output_format), 'rb') as part:
+                if output_format == 'csv' and index > 0:
+                    part.readline()  # en-tête déjà écrit
+                shutil.copyfileobj(part, out)
+    os.replace(tmp_path, output_path)
+
+
+def classify_file(input_path, output_path, model_path, chunk_size=50_000, n_workers=None,
+                  work_dir=None):
+    """
+    Classe tous les titres d'un fichier.
+
+    Args:
+        input_path: Fichier .csv, .parquet ou .jsonl avec une colonne title
+        output_path: Fichier de résultats .csv ou .jsonl
+        model_path: Export (.json / .bin) ou pipeline picklé (.pkl)
+        chunk_size: Titres par morceau (une part de sortie par morceau)
+        n_workers: Processus de classification (None = tous les cœurs)
+        work_dir: Dossier des parts (défaut : <output>.parts)
+
+    Returns:
+        Nombre de titres classés pendant cet appel
+    """
+    input_path, output_path = Path(input_path), Path(output_path)
+    output_format = 'jsonl' if output_path.suffix == '.jsonl' else 'csv'
+    work_dir = Path(work_dir) if work_dir else output_path.with_name(output_path.name + '.parts')
+    work_dir.mkdir(parents=True, exist_ok=True)
+    n_workers = n_workers or os.cpu_count() or 1
+
+    _check_manifest(work_dir, {
+        'input': str(input_path.resolve()),
+        'model_hash': file_hash(model_path),
+        'chunk_size': chunk_size,
+        'output_format': output_format,
+    })
+
+    start = time.perf_counter()
+    n_done = 0
+    n_skipped = 0
+    n_chunks = 0
+    first_row = 0
+    pending = set()
+
+    def report(finished):
+        nonlocal n_done
+        for future in finished:
+            _, n_titles = future.result()
+            n_done += n_titles
+        elapsed = time.perf_counter() - start
+        print(f"  ✓ {n_done} titres classés ({n_done / elapsed:.0f} titres/s)"
+              f"{f', {n_skipped} morceaux déjà faits' if n_skipped else ''}")
+
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                             initargs=(str(model_path),)) as executor:
+        for index, chunk in enumerate(iter_chunks(input_path, chunk_size, columns=('title',))):
+            n_chunks += 1
+            titles = chunk['title'].values
+            if _part_path(work_dir, index, output_format).exists():
+                n_skipped += 1
+            else:
+                # Au plus 2 morceaux en attente par worker : mémoire bornée
+                if len(pending) >= 2 * n_workers:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    report(finished)
+                pending.add(executor.submit(_classify_chunk, index, first_row, titles,
+                                            work_dir, output_format))
+            first_row += len(titles)
+
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            report(finished)
+
+    _merge_parts(work_dir, n_chunks, output_path, output_format)
+    elapsed = time.perf_counter() - start
+    print(f"\n✓ {first_row} titres dans {output_path} ({n_done} classés en {elapsed:.1f}s, "
+          f"{n_done / elapsed:.0f} titres/s)")
+    return n_done
+
+
+def main():
+    """Classe un fichier de titres en masse."""
+    root = Path(__file__).parent.parent.parent
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', type=Path, help="Fichier .csv, .parquet ou .jsonl (colonne title)")
+    parser.add_argument('output', type=Path, help="Fichier de résultats .csv ou .jsonl")
+    parser.add_argument('--model', type=Path, default=root / "extension" / "model.json",
+                        help="Export (.json / .bin) ou pipeline picklé (.pkl)")
+    parser.add_argument('--chunk-size', type=int, default=50_000)
+    parser.add_argument('--n-workers', type=int, default=None,
+                        help="Processus de classification (défaut : tous les cœurs)")
+    parser.add_argument('--work-dir', type=Path, default=None,
+                        help="Dossier des résultats partiels (défaut : <output>.parts)")
+    parser.add_argument('--keep-parts', action='store_true',
+                        help="Conserve les résultats partiels après la fusion")
+    args = parser.parse_args()
+
+    print("="*70)
+    print("CLASSIFICATION EN MASSE")
+    print("="*70)
+    print(f"\nEntrée: {args.input}")
+    print(f"Modèle: {args.model}\n")
+
+    classify_file(args.input, args.output, args.model, chunk_size=args.chunk_size,
+                  n_workers=args.n_workers, work_dir=args.work_dir)
+
+    if not args.keep_parts:
+        shutil.rmtree(args.work_dir or args.output.with_name(args.output.name + '.parts'))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Cache LRU des prédictions, indexé par titre normalisé.
+
+Les mêmes titres reviennent sans cesse (recommandations, page d'accueil,
+re-rendus) : le cache évite de refaire tokenisation, vectorisation et
+produits scalaires. La clé est le titre normalisé comme dans
+TfidfEmbedding (minuscules, sans accents) : deux titres qui ne diffèrent
+que par la casse ou les accents ont les mêmes features, donc la même
+prédiction.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from inference.engine import normalize_title
+
+
+def file_hash(path):
+    """Hash SHA-256 du contenu d'un fichier."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class CachedPredictor:
+    """
+    Enveloppe un prédicteur (InferenceEngine, Pipeline sklearn...) avec un
+    cache LRU borné, un TTL optionnel et une invalidation automatique quand
+    l'artefact du modèle change sur disque.
+    """
+
+    def __init__(self, predictor, artifact_path=None, loader=None,
+                 max_size=10_000, ttl=None, check_interval=1.0):
+        """
+        Args:
+            predictor: Objet avec predict_batch(titres) ou predict(titres)
+            artifact_path: Fichier du modèle surveillé (None = pas de surveillance)
+            loader: Fonction path -> prédicteur, appelée pour recharger le
+                    modèle quand l'artefact change (sinon seul le cache est vidé)
+            max_size: Nombre maximum de titres en cache
+            ttl: Durée de vie d'une entrée en secondes (None = illimitée)
+            check_interval: Intervalle minimal (s) entre deux vérifications
+                            de l'artefact (stat, puis hash si modifié)
+        """
+        self.predictor = predictor
+        self.artifact_path = artifact_path
+        self.loader = loader
+        self.max_size = max_size
+        self.ttl = ttl
+        self.check_interval = check_interval
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.reload_errors = 0
+
+        self.model_hash = None
+        self._artifact_stat = None
+        self._last_check = 0.0
+        if artifact_path is not None:
+            self._artifact_stat = self._stat()
+            self.model_hash = file_hash(artifact_path)
+            self._last_check = time.monotonic()
+
+    def _stat(self):
+        stat = os.stat(self.artifact_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _check_artifact(self):
+        """
+        Vide le cache (et recharge le modèle) si le hash de l'artefact a changé.
+
+        Appelé hors du verrou du cache : hash et rechargement ne bloquent pas
+        les autres requêtes, qui continuent avec l'ancien modèle. Une seule
+        vérification à la fois ; si le rechargement échoue (export à moitié
+        écrit, artefact absent pendant un remplacement), l'ancien modèle est
+        conservé et la vérification reprend à l'intervalle suivant.
+        """
+        now = time.monotonic()
+        if self.artifact_path is None or now - self._last_check < self.check_interval:
+            return
+        if not self._reload_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_check = now
+            try:
+                stat = self._stat()
+                if stat == self._artifact_stat:
+                    return
+                new_hash = file_hash(self.artifact_path)
+                predictor = None
+                if new_hash != self.model_hash and self.loader is not None:
+                    predictor = self.loader(self.artifact_path)
+            except FileNotFoundError:
+                return
+            except Exception as e:
+                self.reload_errors += 1
+                print(f"⚠ Rechargement de {self.artifact_path} impossible, ancien modèle conservé: {e}")
+                return
+
+            with self._lock:
+                self._artifact_stat = stat
+                if new_hash == self.model_hash:
+                    return
+                if predictor is not None:
+                    self.predictor = predictor
+                self.model_hash = new_hash
+                self.invalidations += 1
+                self._entries.clear()
+        finally:
+            self._reload_lock.release()
+
+    @staticmethod
+    def _predict_uncached(predictor, titles):
+        predict = getattr(predictor, 'predict_batch', None) or predictor.predict
+        return predict(titles)
+
+    def predict_batch(self, titles):
+        """
+        Prédit une liste de titres ; seuls les titres absents du cache (ou
+        expirés) sont envoyés au modèle, en un seul appel.
+        """
+        keys = [normalize_title(title) for title in titles]
+        results = [None] * len(titles)
+        missing = {}
+
+        self._check_artifact()
+        with self._lock:
+            # Modèle utilisé pour les titres manquants : si un rechargement a
+            # lieu pendant le calcul, ses prédictions ne sont pas mises en cache
+            predictor, model_hash = self.predictor, self.model_hash
+            now = time.monotonic()
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is not None and self.ttl is not None and now - entry[1] > self.ttl:
+                    del self._entries[key]
+                    self.expirations += 1
+                    entry = None
+
+                if entry is None:
+                    self.misses += 1
+                    missing.setdefault(key, []).append(i)
+                else:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    results[i] = entry[0]
+
+        if missing:
+            # Un seul calcul par titre normalisé distinct
+            first_titles = [titles[indices[0]] for indices in missing.values()]
+            predictions = self._predict_uncached(predictor, first_titles)
+
+            with self._lock:
+                now = time.monotonic()
+                store = self.model_hash == model_hash
+                for (key, indices), prediction in zip(missing.items(), predictions):
+                    for i in indices:
+                        results[i] = prediction
+                    if store:
+                        self._entries[key] = (prediction, now)
+                        self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+
+        return np.asarray(results)
+
+    def predict(self, title):
+        """Prédit un seul titre."""
+        return self.predict_batch([title])[0]
+
+    def clear(self):
+        """Vide le cache (les compteurs sont conservés)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Compteurs du cache."""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+            'reload_errors': self.reload_errors,
+            'model_hash': self.model_hash,
+        }
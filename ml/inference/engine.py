@@ -0,0 +1,445 @@
+"""
+Moteur d'inférence léger pour les modèles exportés (model.json / model.bin).
+
+N'importe que NumPy et la bibliothèque standard : pas de sklearn, scipy ni
+pandas, contrairement au chargement de data/models/youtube_classifier.pkl.
+La tokenisation reproduit celle de TfidfVectorizer(lowercase=True,
+strip_accents='unicode'), avec le token_pattern par défaut.
+
+Usage :
+    python ml/inference/engine.py --pipeline data/models/youtube_classifier.pkl
+"""
+import argparse
+import json
+import re
+import struct
+import sys
+import time
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from models.binary_model import load_binary_model, parse_binary_model
+
+# token_pattern par défaut de sklearn
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+
+def strip_accents(text):
+    """Équivalent de sklearn strip_accents_unicode."""
+    try:
+        text.encode('ASCII', errors='strict')
+        return text
+    except UnicodeEncodeError:
+        normalized = unicodedata.normalize('NFKD', text)
+        return ''.join(c for c in normalized if not unicodedata.combining(c))
+
+
+def normalize_title(title):
+    """Prétraitement sklearn : minuscules puis suppression des accents."""
+    return strip_accents(str(title).lower())
+
+
+def murmurhash3_32(data, seed=0):
+    """MurmurHash3 x86 32 bits signé (sklearn.utils.murmurhash3_32 sur des octets)."""
+    c1, c2, mask = 0xcc9e2d51, 0x1b873593, 0xffffffff
+    h = seed & mask
+    n_blocks = len(data) // 4
+    for (k,) in struct.iter_unpack('<I', data[:n_blocks * 4]):
+        k = (k * c1) & mask
+        k = ((k << 15) | (k >> 17)) & mask
+        h ^= (k * c2) & mask
+        h = ((h << 13) | (h >> 19)) & mask
+        h = (h * 5 + 0xe6546b64) & mask
+
+    tail = data[n_blocks * 4:]
+    if tail:
+        k = int.from_bytes(tail, 'little')
+        k = (k * c1) & mask
+        k = ((k << 15) | (k >> 17)) & mask
+        h ^= (k * c2) & mask
+
+    h ^= len(data)
+    h ^= h >> 16
+    h = (h * 0x85ebca6b) & mask
+    h ^= h >> 13
+    h = (h * 0xc2b2ae35) & mask
+    h ^= h >> 16
+    return h - (1 << 32) if h & 0x80000000 else h
+
+
+def hash_bucket(term, n_features):
+    """Colonne d'un terme dans HashingVectorizer(alternate_sign=False)."""
+    return abs(murmurhash3_32(term.encode('utf-8'))) % n_features
+
+
+def dense_from_csr(csr):
+    """Matrice dense à partir d'un export CSR JSON (data, indices, indptr, shape)."""
+    n_rows, n_cols = csr['shape']
+    dense = np.zeros((n_rows, n_cols))
+    indptr = np.asarray(csr['indptr'], dtype=np.int64)
+    rows = np.repeat(np.arange(n_rows), np.diff(indptr))
+    dense[rows, np.asarray(csr['indices'], dtype=np.int64)] = csr['data']
+    return dense
+
+
+def ovr_scores_from_ovo(scores, pairs, n_classes):
+    """
+    Scores par classe d'un modèle one-vs-one, comme SVC.decision_function
+    avec decision_function_shape='ovr' : votes + somme des scores de paire
+    ramenée dans ]-1/3, 1/3[.
+
+    Args:
+        scores: Scores par paire (n_titres, n_paires)
+        pairs: Paires (i, j) des colonnes de scores
+        n_classes: Nombre de classes
+
+    Returns:
+        Array (n_titres, n_classes)
+    """
+    rows = np.arange(scores.shape[0])[:, None]
+    votes = np.zeros((scores.shape[0], n_classes))
+    np.add.at(votes, (rows, np.where(scores >= 0, pairs[:, 0], pairs[:, 1])), 1)
+    confidences = np.zeros((scores.shape[0], n_classes))
+    np.add.at(confidences, (rows, pairs[:, 0]), scores)
+    np.add.at(confidences, (rows, pairs[:, 1]), -scores)
+    return votes + confidences / (3 * (np.abs(confidences) + 1))
+
+
+def apply_calibration(scores, calibration):
+    """
+    Probabilités à partir des scores par classe et des paramètres exportés
+    (models/calibration.py).
+
+    Args:
+        scores: Scores par classe (n_titres, n_classes)
+        calibration: {"method": "temperature", "temperature": T} ou
+            {"method": "sigmoid", "a": [...], "b": [...]}
+
+    Returns:
+        Array (n_titres, n_classes), lignes de somme 1
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    method = calibration['method']
+    if method == 'temperature':
+        z = scores / calibration['temperature']
+        proba = np.exp(z - z.max(axis=1, keepdims=True))
+    elif method == 'sigmoid':
+        z = scores * np.asarray(calibration['a']) + np.asarray(calibration['b'])
+        proba = 1 / (1 + np.exp(-z))
+    else:
+        raise ValueError(f"Méthode de calibration inconnue: {method!r}")
+    return proba / proba.sum(axis=1, keepdims=True)
+
+
+class InferenceEngine:
+    """
+    Scorer TF-IDF + modèle linéaire à partir des paramètres exportés.
+
+    Supporte les exports one-vs-rest (LinearSVC, un poids par classe) et
+    one-vs-one (SVC linéaire replié par export_model_to_json.py, un poids
+    par paire de classes et un vote). Si l'export contient une calibration,
+    predict_proba renvoie des probabilités calibrées.
+
+    Un export haché (train_incremental.py) remplace le vocabulaire par les
+    colonnes de HashingVectorizer : chaque terme est haché (MurmurHash3),
+    et les colonnes absentes de l'export comptent dans la norme L2 avec
+    l'IDF par défaut, comme dans le pipeline haché.
+    """
+
+    def __init__(self, vocabulary, idf, coef, intercept, classes, ngram_range=(1, 2), pairs=None,
+                 calibration=None, hashing=None):
+        """
+        Args:
+            vocabulary: Dict {terme: colonne}, ou {colonne hachée: colonne}
+                        pour un export haché
+            idf: Vecteur IDF (n_features,)
+            coef: Poids (n_classes ou n_paires, n_features)
+            intercept: Biais (n_classes ou n_paires,)
+            classes: Noms des classes
+            ngram_range: Range des n-grams du vectorizer
+            pairs: Paires (i, j) pour un modèle one-vs-one, None sinon
+            calibration: Paramètres de calibration (apply_calibration), ou None
+            hashing: {"n_features": taille de l'espace haché, "default_idf":
+                     IDF des colonnes absentes de l'export}, ou None
+        """
+        self.vocabulary = vocabulary
+        self.idf = np.asarray(idf, dtype=np.float64)
+        # Poids transposés : une ligne contiguë par feature pour le gather
+        self.coef_t = np.ascontiguousarray(np.asarray(coef, dtype=np.float64).T)
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+        self.classes = np.asarray(classes)
+        self.ngram_range = tuple(ngram_range)
+        self.pairs = None if pairs is None else np.asarray(pairs)
+        self.calibration = calibration
+        self.hashing = hashing
+
+    @classmethod
+    def from_json(cls, path):
+        """Charge un export JSON (export_simple_model.py ou export_model_to_json.py)."""
+        with open(path, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    @classmethod
+    def from_dict(cls, data):
+        """Construit le moteur depuis un export JSON déjà décodé."""
+        svm = data['svm']
+        # Modèle élagué (models/pruning.py) : coefficients au format CSR
+        coef = dense_from_csr(svm['coef_csr']) if 'coef_csr' in svm else svm['coef']
+        hashing = data['tfidf'].get('hashing')
+        vocabulary = data['tfidf']['vocabulary']
+        if hashing is not None:
+            # Clés JSON : colonnes hachées écrites en texte
+            vocabulary = {int(bucket): column for bucket, column in vocabulary.items()}
+        return cls(
+            vocabulary,
+            data['tfidf']['idf'],
+            coef,
+            svm['intercept'],
+            svm['classes'],
+            ngram_range=data['tfidf'].get('ngram_range', (1, 2)),
+            pairs=svm.get('pairs'),
+            calibration=data.get('calibration'),
+            hashing=hashing
+        )
+
+    @classmethod
+    def from_binary(cls, path):
+        """Charge un export binaire (models/binary_model.py)."""
+        model = load_binary_model(path)
+        return cls(model.vocabulary, model.idf, model.coef, model.intercept,
+                   model.classes, ngram_range=model.ngram_range)
+
+    @classmethod
+    def from_bytes(cls, content, binary=False):
+        """
+        Charge un export depuis son contenu brut, par exemple pour hasher et
+        décoder exactement les mêmes octets.
+
+        Args:
+            content: Contenu du fichier (bytes)
+            binary: True pour le format binaire, False pour le JSON
+        """
+        if binary:
+            model = parse_binary_model(content)
+            return cls(model.vocabulary, model.idf, model.coef, model.intercept,
+                       model.classes, ngram_range=model.ngram_range)
+        return cls.from_dict(json.loads(content))
+
+    @classmethod
+    def load(cls, path):
+        """Charge un export selon son extension (.json ou .bin)."""
+        path = Path(path)
+        if path.suffix == '.bin':
+            return cls.from_binary(path)
+        return cls.from_json(path)
+
+    def tokenize(self, title):
+        """Termes (n-grams) d'un titre, comme l'analyzer de TfidfVectorizer."""
+        tokens = TOKEN_PATTERN.findall(normalize_title(title))
+        min_n, max_n = self.ngram_range
+        if max_n == 1:
+            return tokens
+
+        terms = list(tokens) if min_n == 1 else []
+        n_tokens = len(tokens)
+        for n in range(max(min_n, 2), min(max_n, n_tokens) + 1):
+            terms.extend(' '.join(tokens[i:i + n]) for i in range(n_tokens - n + 1))
+        return terms
+
+    def _vectorize(self, titles):
+        """
+        Vecteurs TF-IDF (normalisés L2) au format CSR.
+
+        Returns:
+            Tuple (indptr, indices, data)
+        """
+        vocabulary = self.vocabulary
+        n_hashed = self.hashing['n_features'] if self.hashing is not None else None
+        indptr = [0]
+        indices = []
+        counts = []
+        # Export haché : carré de la norme des colonnes absentes de l'export
+        missing_norms = []
+        for title in titles:
+            row = {}
+            missing = {}
+            for term in self.tokenize(title):
+                key = term if n_hashed is None else hash_bucket(term, n_hashed)
+                column = vocabulary.get(key)
+                if column is not None:
+                    row[column] = row.get(column, 0) + 1
+                elif n_hashed is not None:
+                    missing[key] = missing.get(key, 0) + 1
+            indices.extend(row.keys())
+            counts.extend(row.values())
+            indptr.append(len(indices))
+            missing_norms.append(sum(count * count for count in missing.values()))
+
+        indptr = np.asarray(indptr, dtype=np.int64)
+        indices = np.asarray(indices, dtype=np.int64)
+        data = np.asarray(counts, dtype=np.float64) * self.idf[indices]
+
+        # Normalisation L2 par ligne
+        row_ids = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        norms = np.bincount(row_ids, weights=data ** 2, minlength=len(indptr) - 1)
+        if n_hashed is not None:
+            norms += np.asarray(missing_norms, dtype=np.float64) * self.hashing['default_idf'] ** 2
+        norms = np.sqrt(norms)
+        norms[norms == 0] = 1.0
+        data /= norms[row_ids]
+        return indptr, indices, data
+
+    def decision_function(self, titles):
+        """
+        Scores de décision (produit scalaire creux + biais).
+
+        Returns:
+            Array (n_titres, n_classes), (n_titres, 1) pour un modèle binaire
+            one-vs-rest, ou (n_titres, n_paires) en one-vs-one
+        """
+        if isinstance(titles, str):
+            titles = [titles]
+        indptr, indices, data = self._vectorize(titles)
+
+        # Somme par ligne de data[k] * coef[:, indices[k]] : O(nnz x n_classes)
+        contributions = self.coef_t[indices] * data[:, None]
+        row_ids = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        scores = np.zeros((len(indptr) - 1, self.coef_t.shape[1]))
+        np.add.at(scores, row_ids, contributions)
+        return scores + self.intercept
+
+    def _binary_scores(self, scores):
+        """
+        Modèle binaire one-vs-rest (LinearSVC, SGD...) : une seule ligne de
+        poids, positive pour classes[1]. Scores par classe [-s, s], comme
+        calibration.decision_scores.
+        """
+        if scores.shape[1] == 1 and len(self.classes) == 2:
+            return np.column_stack([-scores[:, 0], scores[:, 0]])
+        return scores
+
+    def class_scores(self, titles):
+        """
+        Un score par classe : décision one-vs-rest, ou nombre de votes en
+        one-vs-one.
+
+        Returns:
+            Array (n_titres, n_classes)
+        """
+        scores = self.decision_function(titles)
+        if self.pairs is None:
+            return self._binary_scores(scores)
+
+        # Vote one-vs-one, comme libsvm
+        winners = np.where(scores > 0, self.pairs[:, 0], self.pairs[:, 1])
+        votes = np.zeros((scores.shape[0], len(self.classes)), dtype=np.int64)
+        np.add.at(votes, (np.arange(scores.shape[0])[:, None], winners), 1)
+        return votes
+
+    def calibration_scores(self, titles):
+        """
+        Scores par classe utilisés par la calibration : décision one-vs-rest,
+        ou votes + confiance en one-vs-one (ovr_scores_from_ovo).
+
+        Returns:
+            Array (n_titres, n_classes)
+        """
+        scores = self.decision_function(titles)
+        if self.pairs is None:
+            return self._binary_scores(scores)
+        if len(self.classes) == 2:
+            # SVC binaire : sklearn renvoie le score de la paire (positif =
+            # classes[1]), l'opposé du score exporté
+            return np.column_stack([scores[:, 0], -scores[:, 0]])
+        return ovr_scores_from_ovo(scores, self.pairs, len(self.classes))
+
+    def predict_proba(self, titles):
+        """
+        Probabilités calibrées par classe (nécessite un export avec calibration).
+
+        Returns:
+            Array (n_titres, n_classes)
+        """
+        if self.calibration is None:
+            raise ValueError("Export sans calibration : relancer l'export avec --calibration")
+        return apply_calibration(self.calibration_scores(titles), self.calibration)
+
+    def predict_batch(self, titles):
+        """Catégories prédites pour une liste de titres (égalité -> plus petit indice)."""
+        return self.classes[np.argmax(self.class_scores(titles), axis=1)]
+
+    def predict(self, title):
+        """Catégorie prédite pour un seul titre."""
+        return self.predict_batch([title])[0]
+
+
+def check_parity(engine, pipeline, titles):
+    """
+    Compare les prédictions du moteur à celles d'un Pipeline sklearn.
+
+    Returns:
+        Liste des titres dont la prédiction diffère (vide si parité)
+    """
+    expected = pipeline.predict(titles)
+    predicted = engine.predict_batch(titles)
+    return [title for title, a, b in zip(titles, predicted, expected) if a != b]
+
+
+def main():
+    """Compare le moteur léger au pipeline picklé (parité, chargement, latence)."""
+    root = Path(__file__).parent.parent.parent
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--model', type=Path, default=root / "extension" / "model.json",
+                        help="Export à charger (.json ou .bin)")
+    parser.add_argument('--pipeline', type=Path, default=None,
+                        help="Pipeline picklé de référence pour la vérification de parité")
+    parser.add_argument('--data', type=Path, default=root / "data" / "raw" / "youtube_titles.csv",
+                        help="CSV des titres utilisés pour la vérification")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    engine = InferenceEngine.load(args.model)
+    load_time = time.perf_counter() - start
+    print(f"✓ Moteur chargé depuis {args.model} en {load_time * 1000:.1f}ms")
+
+    import csv
+    with open(args.data, encoding='utf-8', newline='') as f:
+        titles = [row['title'] for row in csv.DictReader(f)]
+
+    start = time.perf_counter()
+    for title in titles:
+        engine.predict(title)
+    latency = (time.perf_counter() - start) / len(titles)
+    print(f"✓ Latence moyenne (1 titre): {latency * 1e6:.1f}µs")
+
+    if args.pipeline is None:
+        return
+
+    # Import de sklearn uniquement pour la référence
+    start = time.perf_counter()
+    import joblib
+    pipeline = joblib.load(args.pipeline)
+    pickle_time = time.perf_counter() - start
+    print(f"✓ Pipeline picklé chargé en {pickle_time * 1000:.1f}ms "
+          f"({pickle_time / load_time:.0f}x plus lent)")
+
+    start = time.perf_counter()
+    for title in titles[:200]:
+        pipeline.predict([title])
+    pipeline_latency = (time.perf_counter() - start) / min(200, len(titles))
+    print(f"✓ Latence Pipeline.predict (1 titre): {pipeline_latency * 1e6:.1f}µs "
+          f"({pipeline_latency / latency:.0f}x plus lent)")
+
+    mismatches = check_parity(engine, pipeline, titles)
+    if mismatches:
+        print(f"✗ {len(mismatches)} prédictions différentes, ex: {mismatches[:3]}")
+        sys.exit(1)
+    print(f"✓ Parité avec Pipeline.predict sur {len(titles)} titres")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+Service local de classification (HTTP sur TCP ou socket Unix), stdlib asyncio uniquement.
+
+Le modèle exporté (model.json / model.bin) est chargé une fois par le
+moteur léger et partagé par tous les clients du nœud. Les requêtes
+concurrentes sont regroupées en micro-batches : un seul appel vectorisé
+à predict_batch, au plus max_wait_ms après la première requête. Quand
+l'artefact change sur disque, le nouveau modèle est chargé en arrière-plan
+puis remplace l'ancien d'un seul coup (un batch en cours termine avec
+l'ancien modèle ; un fichier illisible est ignoré).
+
+Endpoints :
+    POST /predict        {"title": "..."}        -> {"category": "..."}
+    POST /predict_batch  {"titles": ["...", ...]} -> {"categories": [...]}
+    GET  /health                                   -> état et compteurs
+
+Usage :
+    python ml/inference/server.py --model extension/model.json --port 8765
+    python ml/inference/server.py --unix /tmp/brainfilter.sock
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from inference.cache import CachedPredictor
+from inference.engine import InferenceEngine
+
+MAX_BODY_SIZE = 16 * 1024 * 1024
+
+
+class ClassificationService:
+    """Modèle partagé, micro-batching des requêtes et rechargement à chaud."""
+
+    def __init__(self, model_path, max_batch_size=256, max_wait_ms=2.0,
+                 reload_interval=1.0, cache_size=10_000):
+        """
+        Args:
+            model_path: Export à servir (.json ou .bin)
+            max_batch_size: Nombre maximum de titres par appel au modèle
+            max_wait_ms: Attente maximale (ms) pour compléter un batch
+            reload_interval: Intervalle (s) de vérification de l'artefact
+            cache_size: Taille du cache LRU des prédictions (0 = pas de cache)
+        """
+        self.model_path = Path(model_path)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.reload_interval = reload_interval
+        self.cache_size = cache_size
+
+        self.predictor, self.model_hash = self._load()
+        self._artifact_stat = self._stat()
+        self.loaded_at = time.time()
+        self.reloads = 0
+        self._reload_error = None
+        self.requests = 0
+        self.batches = 0
+        self.batched_titles = 0
+
+        self._queue = None
+        # Un seul thread de scoring : les batches sont traités dans l'ordre
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def _stat(self):
+        stat = os.stat(self.model_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self):
+        """
+        Charge l'export et le hash de son contenu. Le fichier est lu une seule
+        fois : le hash correspond toujours au modèle décodé, même si l'artefact
+        est remplacé pendant le chargement.
+        """
+        content = self.model_path.read_bytes()
+        model_hash = hashlib.sha256(content).hexdigest()
+        engine = InferenceEngine.from_bytes(content, binary=self.model_path.suffix == '.bin')
+        if self.cache_size:
+            return CachedPredictor(engine, max_size=self.cache_size), model_hash
+        return engine, model_hash
+
+    async def start(self):
+        """Démarre la boucle de batching et la surveillance de l'artefact."""
+        self._queue = asyncio.Queue()
+        self._tasks = [
+            asyncio.create_task(self._batch_loop()),
+            asyncio.create_task(self._watch_loop()),
+        ]
+
+    async def classify(self, titles):
+        """Ajoute des titres au prochain batch et attend leurs catégories."""
+        future = asyncio.get_running_loop().create_future()
+        self.requests += 1
+        await self._queue.put((titles, future))
+        return await future
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self._queue.get()]
+            n_titles = len(pending[0][0])
+            deadline = loop.time() + self.max_wait
+
+            # Complète le batch jusqu'à max_batch_size titres ou max_wait
+            while n_titles < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                n_titles += len(item[0])
+
+            titles = [title for item_titles, _ in pending for title in item_titles]
+            # Référence capturée : un rechargement pendant le calcul n'affecte pas ce batch
+            predictor = self.predictor
+            try:
+                categories = await loop.run_in_executor(self._executor, predictor.predict_batch, titles)
+            except Exception as e:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.batched_titles += len(titles)
+            offset = 0
+            for item_titles, future in pending:
+                if not future.done():
+                    future.set_result([str(c) for c in categories[offset:offset + len(item_titles)]])
+                offset += len(item_titles)
+
+    async def _watch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                stat = self._stat()
+                if stat == self._artifact_stat:
+                    continue
+                predictor, model_hash = await loop.run_in_executor(None, self._load)
+            except Exception as e:
+                # Fichier absent ou invalide : on garde le modèle actuel (message
+                # affiché une fois par erreur, nouvel essai à chaque vérification)
+                if str(e) != self._reload_error:
+                    self._reload_error = str(e)
+                    print(f"✗ Rechargement impossible ({e}), modèle actuel conservé")
+                continue
+
+            self._reload_error = None
+            self._artifact_stat = stat
+            if model_hash != self.model_hash:
+                self.predictor, self.model_hash = predictor, model_hash
+                self.loaded_at = time.time()
+                self.reloads += 1
+                print(f"✓ Modèle rechargé: {self.model_path} ({model_hash[:12]})")
+
+    def health(self):
+        """État du service."""
+        status = {
+            'model': str(self.model_path),
+            'model_hash': self.model_hash,
+            'loaded_at': self.loaded_at,
+            'reloads': self.reloads,
+            'requests': self.requests,
+            'batches': self.batches,
+            'avg_batch_size': self.batched_titles / self.batches if self.batches else 0.0,
+        }
+        if isinstance(self.predictor, CachedPredictor):
+            status['cache'] = self.predictor.stats()
+        return status
+
+    async def handle(self, method, path, body):
+        """
+        Traite une requête HTTP décodée.
+
+        Returns:
+            Tuple (HTTPStatus, objet JSON)
+        """
+        if method == 'GET' and path == '/health':
+            return HTTPStatus.OK, self.health()
+        if method != 'POST' or path not in ('/predict', '/predict_batch'):
+            return HTTPStatus.NOT_FOUND, {'error': f"{method} {path} inconnu"}
+
+        try:
+            payload = json.loads(body or b'{}')
+            if path == '/predict':
+                titles = [str(payload['title'])]
+            else:
+                if not isinstance(payload['titles'], list):
+                    raise TypeError("'titles' doit être une liste")
+                titles = [str(title) for title in payload['titles']]
+        except (ValueError, KeyError, TypeError) as e:
+            return HTTPStatus.BAD_REQUEST, {'error': f"Requête invalide: {e}"}
+
+        if not titles:
+            return HTTPStatus.OK, {'categories': []}
+        try:
+            categories = await self.classify(titles)
+        except Exception as e:
+            # Échec du modèle sur ce batch : réponse d'erreur, connexion conservée
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f"Erreur de classification: {e}"}
+        if path == '/predict':
+            return HTTPStatus.OK, {'category': categories[0]}
+        return HTTPStatus.OK, {'categories': categories}
+
+    async def handle_connection(self, reader, writer):
+        """Connexion HTTP/1.1 (keep-alive) : une requête après l'autre."""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    break
+
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ', 2)
+                except ValueError:
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ':' in line:
+                        name, value = line.split(':', 1)
+                        headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get('content-length', 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    status, result = HTTPStatus.BAD_REQUEST, {'error': "Content-Length invalide"}
+                    keep_alive = False
+                elif length > MAX_BODY_SIZE:
+                    status, result = HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {'error': "Corps trop volumineux"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    status, result = await self.handle(method, target.split('?', 1)[0], body)
+                    keep_alive = (headers.get('connection', '').lower() != 'close'
+                                  and version == 'HTTP/1.1')
+
+                data = json.dumps(result, ensure_ascii=False).encode('utf-8')
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1')
+                    + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(service, host='127.0.0.1', port=8765, unix_path=None):
+    """Démarre le service et attend indéfiniment."""
+    await service.start()
+    if unix_path is not None:
+        if os.path.exists(unix_path):
+            os.unlink(unix_path)
+        server = await asyncio.start_unix_server(service.handle_connection, path=unix_path)
+        print(f"✓ Service à l'écoute sur {unix_path}")
+    else:
+        server = await asyncio.start_server(service.handle_connection, host, port)
+        print(f"✓ Service à l'écoute sur http://{host}:{port}")
+
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    """Lance le service de classification."""
+    root = Path(__file__).parent.parent.parent
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', type=Path, default=root / "extension" / "model.json",
+                        help="Export à servir (.json ou .bin)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', default=None, help="Socket Unix (au lieu de TCP)")
+    parser.add_argument('--max-batch-size', type=int, default=256)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0,
+                        help="Attente maximale pour regrouper les requêtes")
+    parser.add_argument('--reload-interval', type=float, default=1.0,
+                        help="Intervalle de vérification de l'artefact (s)")
+    parser.add_argument('--cache-size', type=int, default=10_000,
+                        help="Taille du cache LRU des prédictions (0 = désactivé)")
+    args = parser.parse_args()
+
+    service = ClassificationService(
+        args.model,
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+        reload_interval=args.reload_interval,
+        cache_size=args.cache_size
+    )
+    print(f"✓ Modèle chargé: {args.model} ({service.model_hash[:12]})")
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
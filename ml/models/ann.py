@@ -0,0 +1,192 @@
+"""
+KNN approché (ANN) par index IVF en similarité cosinus.
+
+KNeighborsClassifier en force brute compare chaque requête à tous les
+titres d'entraînement : le coût de prédiction croît linéairement avec le
+train. L'index IVF (inverted file) partitionne le train en n_lists
+cellules avec un k-means sphérique ; une requête n'est comparée qu'aux
+titres des n_probe cellules dont le centroïde est le plus proche.
+n_probe règle le compromis rappel / latence (n_probe = n_lists : recherche
+exacte).
+"""
+import numpy as np
+import scipy.sparse as sp
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.preprocessing import normalize
+
+
+def _top_k(scores, k):
+    """Indices des k plus grands scores de chaque ligne, triés par score décroissant."""
+    k = min(k, scores.shape[1])
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(top, order, axis=1)
+
+
+def _dense(X):
+    return X.toarray() if sp.issparse(X) else np.asarray(X)
+
+
+class IVFIndex:
+    """
+    Index IVF pour la recherche des plus proches voisins en cosinus.
+
+    Les vecteurs sont normalisés L2 puis rangés par cellule (lignes
+    contiguës), de sorte qu'une cellule se compare aux requêtes en un seul
+    produit matriciel.
+    """
+
+    def __init__(self, n_lists=None, n_probe=4, random_state=42):
+        """
+        Args:
+            n_lists: Nombre de cellules (None = environ sqrt(n_vecteurs))
+            n_probe: Nombre de cellules visitées par requête
+            random_state: Graine du k-means
+        """
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.random_state = random_state
+
+    def build(self, X):
+        """Construit l'index (k-means sphérique + rangement par cellule)."""
+        X = normalize(sp.csr_matrix(X) if sp.issparse(X) else np.asarray(X, dtype=np.float64))
+        n_samples = X.shape[0]
+        n_lists = self.n_lists or max(1, int(round(np.sqrt(n_samples))))
+        n_lists = min(n_lists, n_samples)
+
+        if n_lists == 1:
+            assignments = np.zeros(n_samples, dtype=np.int64)
+            centroids = normalize(np.asarray(X.mean(axis=0)).reshape(1, -1))
+        else:
+            kmeans = MiniBatchKMeans(n_clusters=n_lists, random_state=self.random_state,
+                                     n_init=3, batch_size=max(1024, 4 * n_lists))
+            assignments = kmeans.fit_predict(X)
+            centroids = normalize(kmeans.cluster_centers_)
+
+        order = np.argsort(assignments, kind='stable')
+        self.vectors = X[order]
+        self.ids = order
+        self.offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        self.offsets[1:] = np.cumsum(np.bincount(assignments, minlength=n_lists))
+        self.centroids = centroids
+        self.n_lists_ = n_lists
+        return self
+
+    def search(self, Q, k, n_probe=None):
+        """
+        Cherche les k plus proches voisins (cosinus) de chaque requête.
+
+        Args:
+            Q: Requêtes (n_requêtes, n_features), dense ou creuse
+            k: Nombre de voisins
+            n_probe: Remplace self.n_probe pour cet appel
+
+        Returns:
+            Tuple (similarités, indices) de forme (n_requêtes, k), indices
+            dans l'ordre du train (-1 si moins de k candidats)
+        """
+        Q = normalize(sp.csr_matrix(Q) if sp.issparse(Q) else np.asarray(Q, dtype=np.float64))
+        n_queries = Q.shape[0]
+        n_probe = min(n_probe or self.n_probe, self.n_lists_)
+
+        probes = _top_k(_dense(Q @ self.centroids.T), n_probe)
+
+        # Candidats : k meilleurs de chaque cellule visitée, un bloc par rang de sonde
+        similarities = np.full((n_queries, n_probe * k), -np.inf)
+        candidates = np.full((n_queries, n_probe * k), -1, dtype=np.int64)
+        for cell in np.unique(probes):
+            start, end = self.offsets[cell], self.offsets[cell + 1]
+            if start == end:
+                continue
+            queries, ranks = np.nonzero(probes == cell)
+            scores = _dense(Q[queries] @ self.vectors[start:end].T)
+            top = _top_k(scores, k)
+            columns = ranks[:, None] * k + np.arange(top.shape[1])
+            similarities[queries[:, None], columns] = np.take_along_axis(scores, top, axis=1)
+            candidates[queries[:, None], columns] = self.ids[start + top]
+
+        best = _top_k(similarities, k)
+        return (np.take_along_axis(similarities, best, axis=1),
+                np.take_along_axis(candidates, best, axis=1))
+
+
+class ANNKNeighborsClassifier(ClassifierMixin, BaseEstimator):
+    """
+    KNN en similarité cosinus sur un index IVF, utilisable à la place de
+    KNeighborsClassifier dans un Pipeline.
+
+    Sur des vecteurs normalisés L2 (TF-IDF), les voisins cosinus sont les
+    mêmes que les voisins euclidiens de KNeighborsClassifier.
+    """
+
+    def __init__(self, n_neighbors=5, weights='uniform', n_lists=None, n_probe=4, random_state=42):
+        """
+        Args:
+            n_neighbors: Nombre de voisins
+            weights: 'uniform' ou 'distance' (distance euclidienne entre
+                     vecteurs normalisés, comme KNeighborsClassifier)
+            n_lists: Nombre de cellules de l'index (None = sqrt(n_train))
+            n_probe: Cellules visitées par requête (plus = rappel plus haut,
+                     latence plus haute)
+            random_state: Graine du k-means de l'index
+        """
+        self.n_neighbors = n_neighbors
+        self.weights = weights
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.random_state = random_state
+
+    def fit(self, X, y):
+        """Construit l'index IVF sur les vecteurs d'entraînement."""
+        self.classes_, self._y = np.unique(np.asarray(y), return_inverse=True)
+        self.index_ = IVFIndex(self.n_lists, self.n_probe, self.random_state).build(X)
+        return self
+
+    def kneighbors(self, X, n_neighbors=None, exact=False):
+        """
+        Plus proches voisins approchés (ou exacts si exact=True).
+
+        Returns:
+            Tuple (distances euclidiennes entre vecteurs normalisés, indices)
+        """
+        n_neighbors = n_neighbors or self.n_neighbors
+        n_probe = self.index_.n_lists_ if exact else self.n_probe
+        similarities, indices = self.index_.search(X, n_neighbors, n_probe)
+        distances = np.sqrt(np.maximum(2 - 2 * similarities, 0))
+        return distances, indices
+
+    def predict_proba(self, X):
+        """Vote (pondéré ou non) des voisins, normalisé par ligne."""
+        distances, indices = self.kneighbors(X)
+        valid = indices >= 0
+        if self.weights == 'distance':
+            with np.errstate(divide='ignore'):
+                weights = 1.0 / distances
+            # Voisins à distance nulle : eux seuls votent (comme sklearn)
+            exact_match = np.isinf(weights).any(axis=1)
+            weights[exact_match] = np.isinf(weights[exact_match]).astype(float)
+        else:
+            weights = np.ones_like(distances)
+        weights[~valid] = 0
+
+        votes = np.zeros((len(indices), len(self.classes_)))
+        rows = np.repeat(np.arange(len(indices)), indices.shape[1])
+        np.add.at(votes, (rows, self._y[indices.ravel()]), weights.ravel())
+        totals = votes.sum(axis=1, keepdims=True)
+        totals[totals == 0] = 1
+        return votes / totals
+
+    def predict(self, X):
+        """Classe majoritaire parmi les voisins (égalité -> plus petit indice)."""
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def recall(self, X):
+        """
+        Rappel de la recherche approchée : part des k voisins exacts
+        retrouvés par l'index, en moyenne sur X.
+        """
+        _, approx = self.kneighbors(X)
+        _, exact = self.kneighbors(X, exact=True)
+        found = [len(set(a[a >= 0]) & set(e[e >= 0])) for a, e in zip(approx, exact)]
+        return float(np.mean(found) / self.n_neighbors)
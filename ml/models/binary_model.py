@@ -0,0 +1,202 @@
+"""
+Format binaire compact pour le modèle TF-IDF + linéaire (alternative à model.json).
+
+Disposition du fichier (little-endian) :
+
+    En-tête        : magic b'BFM1', version, flags, n_features, n_classes,
+                     ngram_min, ngram_max, tailles des tables de chaînes
+    Vocabulaire    : offsets uint32 (n_features + 1) + blob UTF-8, trié
+                     (l'indice d'un terme est sa colonne dans idf/coef)
+    Classes        : offsets uint32 (n_classes + 1) + blob UTF-8
+    Tableaux       : alignés sur 4 octets
+                     idf float32 (n_features), intercept float32 (n_classes),
+                     puis coef float32 (n_classes x n_features), ou, si
+                     quantifié : échelles float32 (n_classes) + coef int8
+
+Les tableaux sont lus sans copie (numpy.frombuffer sur un memmap).
+"""
+import struct
+from pathlib import Path
+
+import numpy as np
+
+MAGIC = b'BFM1'
+VERSION = 1
+FLAG_INT8 = 1
+
+_HEADER = struct.Struct('<4sHHIIBBxxII')
+
+
+def _string_table(strings):
+    """Encode une liste de chaînes en (offsets uint32, blob UTF-8)."""
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype='<u4')
+    offsets[1:] = np.cumsum([len(e) for e in encoded])
+    return offsets, b''.join(encoded)
+
+
+def _read_string_table(buffer, offset, count, blob_size):
+    """Décode une table de chaînes, renvoie (chaînes, offset suivant)."""
+    offsets = np.frombuffer(buffer, dtype='<u4', count=count + 1, offset=offset)
+    offset += offsets.nbytes
+    blob = bytes(buffer[offset:offset + blob_size])
+    strings = [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(count)]
+    return strings, offset + blob_size
+
+
+def _align(offset, alignment=4):
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def quantize_int8(coef):
+    """
+    Quantifie chaque ligne de coef en int8 (échelle symétrique par classe).
+
+    Returns:
+        Tuple (coef_int8, scales) avec coef ≈ coef_int8 * scales[:, None]
+    """
+    max_abs = np.abs(coef).max(axis=1)
+    scales = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype('<f4')
+    coef_int8 = np.clip(np.round(coef / scales[:, None]), -127, 127).astype(np.int8)
+    return coef_int8, scales
+
+
+def write_binary_model(path, vocabulary, idf, coef, intercept, classes,
+                       ngram_range=(1, 2), quantize=False):
+    """
+    Écrit un modèle linéaire TF-IDF au format binaire.
+
+    Args:
+        path: Fichier de sortie
+        vocabulary: Dict {terme: colonne} (vocabulary_ de TfidfVectorizer)
+        idf: Vecteur IDF (n_features,)
+        coef: Matrice de coefficients (n_classes, n_features), dense ou creuse
+        intercept: Biais (n_classes,)
+        classes: Noms des classes, dans l'ordre des lignes de coef
+        ngram_range: Range des n-grams du vectorizer
+        quantize: Si True, coef est stocké en int8 avec une échelle par classe
+
+    Returns:
+        Taille du fichier en octets
+    """
+    if hasattr(coef, 'toarray'):  # matrice scipy creuse
+        coef = coef.toarray()
+    if len(coef) != len(classes):
+        raise ValueError("Le format binaire attend une ligne de coef par classe "
+                         f"({len(coef)} lignes pour {len(classes)} classes)")
+
+    # Colonnes réordonnées selon l'ordre alphabétique des termes
+    terms = sorted(vocabulary)
+    order = np.array([vocabulary[t] for t in terms], dtype=np.int64)
+    idf = np.asarray(idf, dtype='<f4')[order]
+    coef = np.asarray(coef, dtype=np.float64)[:, order]
+    intercept = np.asarray(intercept, dtype='<f4')
+    classes = [str(c) for c in classes]
+
+    vocab_offsets, vocab_blob = _string_table(terms)
+    class_offsets, class_blob = _string_table(classes)
+
+    flags = FLAG_INT8 if quantize else 0
+    header = _HEADER.pack(
+        MAGIC, VERSION, flags, len(terms), len(classes),
+        ngram_range[0], ngram_range[1], len(vocab_blob), len(class_blob)
+    )
+
+    parts = [header, vocab_offsets.tobytes(), vocab_blob, class_offsets.tobytes(), class_blob]
+    size = sum(len(p) for p in parts)
+    parts.append(b'\0' * (_align(size) - size))
+
+    parts += [idf.tobytes(), intercept.tobytes()]
+    if quantize:
+        coef_int8, scales = quantize_int8(coef)
+        parts += [scales.tobytes(), coef_int8.tobytes()]
+    else:
+        parts.append(coef.astype('<f4').tobytes())
+
+    data = b''.join(parts)
+    Path(path).write_bytes(data)
+    return len(data)
+
+
+class BinaryModel:
+    """
+    Modèle chargé depuis le format binaire.
+
+    Attributs : vocabulary (dict terme -> colonne), terms, classes, idf,
+    intercept, coef (float32, déquantifié si besoin), ngram_range, quantized.
+    """
+
+    def __init__(self, terms, classes, idf, intercept, coef, ngram_range, quantized):
+        self.terms = terms
+        self.vocabulary = {term: i for i, term in enumerate(terms)}
+        self.classes = np.array(classes)
+        self.idf = idf
+        self.intercept = intercept
+        self.coef = coef
+        self.ngram_range = ngram_range
+        self.quantized = quantized
+
+    @property
+    def n_features(self):
+        return len(self.terms)
+
+
+def load_binary_model(path, mmap=True):
+    """
+    Charge un modèle binaire. Les tableaux float32 pointent directement dans
+    le fichier (memmap) ou dans le buffer lu, sans copie.
+
+    Args:
+        path: Fichier .bin
+        mmap: Si True, le fichier est mappé en mémoire au lieu d'être lu
+
+    Returns:
+        BinaryModel
+    """
+    if mmap:
+        buffer = np.memmap(path, dtype=np.uint8, mode='r')
+    else:
+        buffer = Path(path).read_bytes()
+    return parse_binary_model(buffer, name=path)
+
+
+def parse_binary_model(buffer, name='<buffer>'):
+    """
+    Décode un modèle binaire déjà en mémoire (bytes ou memmap), sans copie
+    des tableaux float32.
+
+    Args:
+        buffer: Contenu du fichier .bin
+        name: Nom affiché dans les messages d'erreur
+
+    Returns:
+        BinaryModel
+    """
+    (magic, version, flags, n_features, n_classes,
+     ngram_min, ngram_max, vocab_size, class_size) = _HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError(f"Fichier de modèle binaire invalide: {name}")
+    if version != VERSION:
+        raise ValueError(f"Version de modèle binaire non supportée: {version}")
+
+    offset = _HEADER.size
+    terms, offset = _read_string_table(buffer, offset, n_features, vocab_size)
+    classes, offset = _read_string_table(buffer, offset, n_classes, class_size)
+    offset = _align(offset)
+
+    idf = np.frombuffer(buffer, dtype='<f4', count=n_features, offset=offset)
+    offset += idf.nbytes
+    intercept = np.frombuffer(buffer, dtype='<f4', count=n_classes, offset=offset)
+    offset += intercept.nbytes
+
+    quantized = bool(flags & FLAG_INT8)
+    if quantized:
+        scales = np.frombuffer(buffer, dtype='<f4', count=n_classes, offset=offset)
+        offset += scales.nbytes
+        coef_int8 = np.frombuffer(buffer, dtype=np.int8, count=n_classes * n_features, offset=offset)
+        coef = coef_int8.reshape(n_classes, n_features) * scales[:, None]
+    else:
+        coef = np.frombuffer(buffer, dtype='<f4', count=n_classes * n_features, offset=offset)
+        coef = coef.reshape(n_classes, n_features)
+
+    return BinaryModel(terms, classes, idf, intercept, coef, (ngram_min, ngram_max), quantized)
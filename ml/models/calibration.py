@@ -0,0 +1,163 @@
+"""
+Calibration des scores de décision en probabilités.
+
+Remplace SVC(probability=True), qui entraîne en interne 5 modèles
+supplémentaires (Platt scaling par validation croisée) et rend
+predict_proba plus lent que decision_function. Ici la calibration est
+apprise une seule fois sur un split de validation, à partir des scores par
+classe du classificateur :
+
+    - temperature : proba = softmax(scores / T), un seul paramètre
+    - sigmoid     : p_k = sigmoid(a_k * score_k + b_k) par classe, puis
+                    normalisation (Platt one-vs-rest)
+
+Les paramètres sont un petit dict sérialisable en JSON, appliqué par
+inference.engine.apply_calibration (NumPy seulement) dans le moteur
+léger, et par classifier.js dans l'extension.
+"""
+import numpy as np
+from scipy.optimize import minimize, minimize_scalar
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
+from sklearn.model_selection import train_test_split
+
+from inference.engine import apply_calibration
+
+
+def decision_scores(classifier, X):
+    """
+    Scores par classe (n_samples, n_classes) d'un classificateur linéaire.
+
+    Pour un SVC one-vs-one, c'est decision_function avec
+    decision_function_shape='ovr' (votes + confiance bornée), que le
+    moteur léger recalcule à partir des scores par paire.
+    """
+    scores = classifier.decision_function(X)
+    if scores.ndim == 1:  # cas binaire
+        scores = np.column_stack([-scores, scores])
+    return scores
+
+
+def _log_softmax(z):
+    z = z - z.max(axis=1, keepdims=True)
+    return z - np.log(np.exp(z).sum(axis=1, keepdims=True))
+
+
+def fit_temperature(scores, y_idx):
+    """
+    Température minimisant l'entropie croisée de softmax(scores / T).
+
+    Comme pour Platt, la cible de la vraie classe k est lissée à
+    (n_k + 1) / (n_k + 2) : sans erreur sur le split de calibration, la
+    log-loss décroît sinon jusqu'à T -> 0 (probabilités toutes à 100%).
+    """
+    n_classes = scores.shape[1]
+    counts = np.bincount(y_idx, minlength=n_classes)
+    positive = (counts[y_idx] + 1) / (counts[y_idx] + 2)
+    targets = np.repeat(((1 - positive) / (n_classes - 1))[:, None], n_classes, axis=1)
+    targets[np.arange(len(y_idx)), y_idx] = positive
+
+    def nll(log_t):
+        return -(targets * _log_softmax(scores / np.exp(log_t))).sum(axis=1).mean()
+
+    result = minimize_scalar(nll, bounds=(-6.0, 6.0), method='bounded')
+    return {'method': 'temperature', 'temperature': float(np.exp(result.x))}
+
+
+def fit_sigmoid(scores, y_idx):
+    """Paramètres (a_k, b_k) de Platt, un couple par classe (log-loss binaire)."""
+    a, b = [], []
+    for k in range(scores.shape[1]):
+        s = scores[:, k]
+        t = (y_idx == k).astype(float)
+        # Cibles lissées de Platt, évitent des paramètres infinis si séparable
+        n_pos, n_neg = t.sum(), len(t) - t.sum()
+        t = np.where(t == 1, (n_pos + 1) / (n_pos + 2), 1 / (n_neg + 2))
+
+        def loss(params):
+            z = params[0] * s + params[1]
+            # log(1 + exp(z)) - t * z, stable numériquement
+            value = np.logaddexp(0, z) - t * z
+            p = 1 / (1 + np.exp(-z))
+            grad = np.array([np.dot(p - t, s), np.sum(p - t)]) / len(s)
+            return value.mean(), grad
+
+        result = minimize(loss, x0=np.array([1.0, 0.0]), jac=True, method='L-BFGS-B')
+        a.append(float(result.x[0]))
+        b.append(float(result.x[1]))
+    return {'method': 'sigmoid', 'a': a, 'b': b}
+
+
+def fit_calibration(scores, y_idx, method='temperature'):
+    """
+    Apprend une calibration sur des scores de validation.
+
+    Args:
+        scores: Scores par classe (n_samples, n_classes)
+        y_idx: Indices des vraies classes (dans l'ordre des colonnes)
+        method: 'temperature' ou 'sigmoid'
+
+    Returns:
+        Dict des paramètres (sérialisable en JSON)
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    y_idx = np.asarray(y_idx)
+    if method == 'temperature':
+        return fit_temperature(scores, y_idx)
+    if method == 'sigmoid':
+        return fit_sigmoid(scores, y_idx)
+    raise ValueError(f"Méthode de calibration inconnue: {method!r}")
+
+
+class CalibratedClassifier(ClassifierMixin, BaseEstimator):
+    """
+    Classificateur linéaire + calibration apprise sur un split de validation.
+
+    fit entraîne une copie du classificateur sur (1 - calibration_size) du
+    train, apprend la calibration sur ses scores du reste, puis (refit=True)
+    réentraîne le classificateur sur tout le train en gardant la calibration.
+    predict est celui du classificateur : les prédictions ne changent pas.
+    """
+
+    def __init__(self, estimator, method='temperature', calibration_size=0.2,
+                 refit=True, random_state=42):
+        """
+        Args:
+            estimator: Classificateur avec decision_function (SVC, LinearSVC...)
+            method: 'temperature' ou 'sigmoid'
+            calibration_size: Part du train réservée à la calibration
+            refit: Si True, le classificateur final est réentraîné sur tout le train
+            random_state: Graine du split de calibration
+        """
+        self.estimator = estimator
+        self.method = method
+        self.calibration_size = calibration_size
+        self.refit = refit
+        self.random_state = random_state
+
+    def fit(self, X, y):
+        """Entraîne le classificateur et sa calibration."""
+        y = np.asarray(y)
+        X_fit, X_cal, y_fit, y_cal = train_test_split(
+            X, y, test_size=self.calibration_size,
+            random_state=self.random_state, stratify=y
+        )
+        estimator = clone(self.estimator).fit(X_fit, y_fit)
+        self.classes_ = estimator.classes_
+        self.calibration_ = fit_calibration(
+            decision_scores(estimator, X_cal),
+            np.searchsorted(self.classes_, y_cal),
+            self.method
+        )
+        self.estimator_ = clone(self.estimator).fit(X, y) if self.refit else estimator
+        return self
+
+    def decision_function(self, X):
+        return self.estimator_.decision_function(X)
+
+    def predict(self, X):
+        return self.estimator_.predict(X)
+
+    def predict_proba(self, X):
+        """Probabilités calibrées (vectorisé, sans modèle supplémentaire)."""
+        return apply_calibration(decision_scores(self.estimator_, X), self.calibration_)
+
@@ -0,0 +1,238 @@
+"""
+Classificateur en cascade : étages du moins cher au plus cher, sortie anticipée.
+
+Beaucoup de titres portent un signal fort (#shorts, gameplay, official
+video...) : inutile de les vectoriser et de les scorer en entier. Chaque
+étage ne traite que les titres que les précédents n'ont pas résolus :
+
+    1. rules    : table de règles apprise sur le train (titres exacts et
+                  mots-clés de KeywordEmbedding dont la précision lissée
+                  dépasse min_precision)
+    2. linear   : TF-IDF + modèle linéaire calibré ; résout les titres dont
+                  la probabilité maximale atteint linear_threshold
+    3. fallback : modèle optionnel plus coûteux (Sentence Transformer), qui
+                  résout tout le reste
+
+Sans fallback, l'étage linéaire résout tous les titres restants.
+"""
+import time
+
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
+from sklearn.pipeline import Pipeline
+from sklearn.svm import LinearSVC
+
+from models.calibration import CalibratedClassifier
+from models.embeddings import KeywordEmbedding, TfidfEmbedding, _compile_keyword_patterns
+
+
+def _normalize(title):
+    return ' '.join(str(title).lower().split())
+
+
+def default_linear_stage():
+    """Étage linéaire par défaut : TF-IDF-500 + LinearSVC calibré (température)."""
+    return Pipeline([
+        ('embedding', TfidfEmbedding(max_features=500, ngram_range=(1, 2), sparse=True)),
+        ('classifier', CalibratedClassifier(LinearSVC(C=1.0, random_state=42, max_iter=10000)))
+    ])
+
+
+class KeywordRuleTable(ClassifierMixin, BaseEstimator):
+    """
+    Règles « signal fort -> catégorie » apprises sur le train.
+
+    - Titre exact (minuscules, espaces normalisés) vu au moins min_support
+      fois au train
+    - Mot-clé de KeywordEmbedding présent dans au moins min_support titres
+      du train
+
+    Dans les deux cas, la précision lissée (hits + 1) / (support + 2) de la
+    catégorie majoritaire doit atteindre min_precision : un titre vu une
+    seule fois (2/3) ne fait pas une règle plus sûre qu'un mot-clé fréquent.
+
+    Un titre sans règle applicable n'est pas résolu (classe -1).
+    """
+
+    def __init__(self, min_precision=0.95, min_support=5, exact_match=True):
+        """
+        Args:
+            min_precision: Précision minimale (sur le train) d'une règle
+            min_support: Nombre minimal de titres du train contenant un mot-clé
+                         (ou d'occurrences d'un titre exact)
+            exact_match: Utilise aussi la table des titres exacts
+        """
+        self.min_precision = min_precision
+        self.min_support = min_support
+        self.exact_match = exact_match
+
+    def fit(self, X, y):
+        """Mesure la précision de chaque règle candidate sur le train."""
+        y = np.asarray(y)
+        self.classes_, y_idx = np.unique(y, return_inverse=True)
+        onehot = np.eye(len(self.classes_))[y_idx]
+
+        # Une colonne par mot-clé distinct (certains sont partagés entre catégories)
+        embedding = KeywordEmbedding().fit(X)
+        keywords = list(embedding.keyword_columns_)
+        columns = [embedding.keyword_columns_[keyword][0] for keyword in keywords]
+        presence = embedding.transform(X)[:, columns] > 0
+
+        hits = presence.T.astype(np.float64) @ onehot
+        support = hits.sum(axis=1)
+        precision = (hits.max(axis=1) + 1) / (support + 2)
+        keep = (support >= self.min_support) & (precision >= self.min_precision)
+
+        self.rule_keywords_ = [keyword for keyword, k in zip(keywords, keep) if k]
+        self.rule_classes_ = hits.argmax(axis=1)[keep]
+        self.rule_precision_ = precision[keep]
+        self.rule_support_ = support[keep].astype(np.int64)
+        self.patterns_ = _compile_keyword_patterns(self.rule_keywords_)
+        self._rule_index = {keyword: i for i, keyword in enumerate(self.rule_keywords_)}
+
+        self.exact_table_ = {}
+        if self.exact_match:
+            counts = {}
+            for title, label in zip(X, y_idx):
+                counts.setdefault(_normalize(title), np.zeros(len(self.classes_)))[label] += 1
+            for title, title_counts in counts.items():
+                best = int(title_counts.argmax())
+                title_support = title_counts.sum()
+                title_precision = (title_counts[best] + 1) / (title_support + 2)
+                if title_support >= self.min_support and title_precision >= self.min_precision:
+                    self.exact_table_[title] = (best, title_precision)
+        return self
+
+    def predict_confidence(self, X):
+        """
+        Règle la plus précise applicable à chaque titre.
+
+        Returns:
+            Tuple (indices de classe, -1 si non résolu ; précision de la règle ;
+            True si la règle est un titre exact)
+        """
+        texts = [str(text).lower() for text in X]
+        labels = np.full(len(texts), -1, dtype=np.int64)
+        confidence = np.zeros(len(texts))
+        exact = np.zeros(len(texts), dtype=bool)
+        if not texts:
+            return labels, confidence, exact
+
+        if self.rule_keywords_:
+            lengths = np.fromiter((len(t) + 1 for t in texts), dtype=np.int64, count=len(texts))
+            starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            corpus = '\0'.join(texts)
+
+            rows, rules = [], []
+            for pattern in self.patterns_:
+                for match in pattern.finditer(corpus):
+                    rows.append(match.start())
+                    rules.append(self._rule_index[match.group()])
+            if rows:
+                rows = np.searchsorted(starts, rows, side='right') - 1
+                rules = np.asarray(rules)
+                # Par titre, la règle de précision maximale l'emporte
+                scores = np.zeros((len(texts), len(self.rule_keywords_)))
+                scores[rows, rules] = self.rule_precision_[rules]
+                best = scores.argmax(axis=1)
+                confidence = scores[np.arange(len(texts)), best]
+                matched = confidence > 0
+                labels[matched] = self.rule_classes_[best[matched]]
+
+        if self.exact_table_:
+            for i, text in enumerate(texts):
+                entry = self.exact_table_.get(' '.join(text.split()))
+                if entry is not None and entry[1] >= confidence[i]:
+                    labels[i], confidence[i] = entry
+                    exact[i] = True
+        return labels, confidence, exact
+
+    def predict(self, X):
+        """Catégories des titres résolus, None pour les autres."""
+        labels, _, _ = self.predict_confidence(X)
+        predictions = np.empty(len(labels), dtype=object)
+        predictions[labels >= 0] = self.classes_[labels[labels >= 0]]
+        return predictions
+
+
+class CascadeClassifier(ClassifierMixin, BaseEstimator):
+    """
+    Cascade règles -> TF-IDF + linéaire -> modèle de secours optionnel.
+
+    Prend des titres bruts en entrée (pas de Pipeline autour). Chaque étage
+    est entraîné sur tout le train ; predict_stages indique en plus l'étage
+    qui a résolu chaque titre et le temps passé dans chaque étage.
+    """
+
+    def __init__(self, rules=None, linear=None, fallback=None, linear_threshold=0.9):
+        """
+        Args:
+            rules: KeywordRuleTable (None = KeywordRuleTable())
+            linear: Modèle avec predict_proba sur les titres (None =
+                    default_linear_stage())
+            fallback: Modèle de secours sur les titres (ex : Sentence
+                      Transformer + classificateur), ou None
+            linear_threshold: Probabilité minimale pour que l'étage linéaire
+                              résolve un titre (ignorée sans fallback)
+        """
+        self.rules = rules
+        self.linear = linear
+        self.fallback = fallback
+        self.linear_threshold = linear_threshold
+
+    def fit(self, X, y):
+        """Entraîne les étages."""
+        X = np.asarray(X, dtype=object)
+        rules = self.rules if self.rules is not None else KeywordRuleTable()
+        linear = self.linear if self.linear is not None else default_linear_stage()
+        self.rules_ = clone(rules).fit(X, y)
+        self.linear_ = clone(linear).fit(X, y)
+        self.fallback_ = clone(self.fallback).fit(X, y) if self.fallback is not None else None
+        self.classes_ = self.rules_.classes_
+        self.stage_names_ = ['rules', 'linear'] + (['fallback'] if self.fallback_ is not None else [])
+        return self
+
+    def predict_stages(self, X):
+        """
+        Prédit en n'escaladant que les titres non résolus.
+
+        Returns:
+            Tuple (catégories, indice de l'étage ayant résolu chaque titre,
+            secondes passées dans chaque étage)
+        """
+        X = np.asarray(X, dtype=object)
+        labels = np.full(len(X), -1, dtype=np.int64)
+        stages = np.full(len(X), -1, dtype=np.int64)
+        stage_times = np.zeros(len(self.stage_names_))
+
+        start = time.perf_counter()
+        rule_labels, _, _ = self.rules_.predict_confidence(X)
+        resolved = rule_labels >= 0
+        labels[resolved] = rule_labels[resolved]
+        stages[resolved] = 0
+        stage_times[0] = time.perf_counter() - start
+
+        pending = np.flatnonzero(~resolved)
+        if len(pending):
+            start = time.perf_counter()
+            proba = self.linear_.predict_proba(X[pending])
+            confident = np.ones(len(pending), dtype=bool)
+            if self.fallback_ is not None:
+                confident = proba.max(axis=1) >= self.linear_threshold
+            labels[pending[confident]] = np.argmax(proba[confident], axis=1)
+            stages[pending[confident]] = 1
+            stage_times[1] = time.perf_counter() - start
+            pending = pending[~confident]
+
+        if len(pending):
+            start = time.perf_counter()
+            predictions = self.fallback_.predict(X[pending])
+            labels[pending] = np.searchsorted(self.classes_, predictions)
+            stages[pending] = 2
+            stage_times[2] = time.perf_counter() - start
+
+        return self.classes_[labels], stages, stage_times
+
+    def predict(self, X):
+        """Catégories prédites."""
+        return self.predict_stages(X)[0]
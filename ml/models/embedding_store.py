@@ -0,0 +1,174 @@
+"""
+Stockage persistant des embeddings de phrases, adressé par contenu.
+
+Un store par modèle, dans un dossier :
+
+    meta.json    : model_name, dim, dtype
+    vectors.bin  : matrice (n_titres, dim) float16 ou float32, lue en memmap
+    keys.bin     : une empreinte de 16 octets (blake2b du titre) par ligne,
+                   dans l'ordre des lignes de vectors.bin
+
+Les deux fichiers ne font que grandir (ajout en fin de fichier). Les
+vecteurs sont écrits avant les clés : après une interruption, des lignes
+sans clé peuvent rester en fin de vectors.bin, elles sont ignorées puis
+écrasées au prochain ajout.
+"""
+import hashlib
+import json
+import os
+import re
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou entre processus
+    fcntl = None
+
+KEY_SIZE = 16
+
+
+def title_key(title):
+    """Empreinte d'un titre (16 octets)."""
+    return hashlib.blake2b(str(title).encode('utf-8'), digest_size=KEY_SIZE).digest()
+
+
+class EmbeddingStore:
+    """
+    Matrice d'embeddings sur disque, indexée par empreinte de titre.
+
+    Plusieurs processus peuvent partager un store : les ajouts sont
+    sérialisés par un verrou fichier (fcntl), et chaque processus relit
+    les clés ajoutées par les autres avant de chercher les titres manquants.
+    """
+
+    def __init__(self, store_dir, model_name, dtype='float32'):
+        """
+        Args:
+            store_dir: Dossier racine des stores (un sous-dossier par modèle)
+            model_name: Nom du modèle d'embedding (fait partie de la clé)
+            dtype: 'float16' (moitié moins de disque) ou 'float32'
+        """
+        self.model_name = model_name
+        self.path = Path(store_dir) / re.sub(r'[^\w.-]+', '_', model_name)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.dtype = np.dtype(dtype)
+        self.dim = None
+
+        meta_path = self.path / 'meta.json'
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text())
+            if meta['model_name'] != model_name:
+                raise ValueError(f"Le store {self.path} appartient au modèle {meta['model_name']}")
+            self.dim = meta['dim']
+            self.dtype = np.dtype(meta['dtype'])
+
+        self._rows = {}
+        self._n_keys = 0
+        self._vectors = None
+        self.hits = 0
+        self.misses = 0
+        self._refresh()
+
+    @property
+    def _keys_path(self):
+        return self.path / 'keys.bin'
+
+    @property
+    def _vectors_path(self):
+        return self.path / 'vectors.bin'
+
+    def __len__(self):
+        return self._n_keys
+
+    def _refresh(self):
+        """Lit les clés ajoutées depuis la dernière lecture (par ce processus ou un autre)."""
+        if not self._keys_path.exists():
+            return
+        with open(self._keys_path, 'rb') as f:
+            f.seek(self._n_keys * KEY_SIZE)
+            new_keys = f.read()
+        n_new = len(new_keys) // KEY_SIZE
+        for i in range(n_new):
+            self._rows[new_keys[i * KEY_SIZE:(i + 1) * KEY_SIZE]] = self._n_keys + i
+        if n_new:
+            self._n_keys += n_new
+            self._vectors = None
+
+    def _matrix(self):
+        """Vue memmap des lignes indexées."""
+        if self._vectors is None and self._n_keys:
+            self._vectors = np.memmap(self._vectors_path, dtype=self.dtype, mode='r',
+                                      shape=(self._n_keys, self.dim))
+        return self._vectors
+
+    @contextmanager
+    def _lock(self):
+        with open(self.path / '.lock', 'w') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _append(self, keys, vectors):
+        """Ajoute des lignes (appelé sous verrou, après _refresh)."""
+        vectors = np.asarray(vectors)
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+            meta = {'model_name': self.model_name, 'dim': self.dim, 'dtype': self.dtype.name}
+            (self.path / 'meta.json').write_text(json.dumps(meta))
+
+        with open(self._vectors_path, 'ab') as f:
+            # Tronque d'éventuelles lignes orphelines d'un ajout interrompu
+            f.truncate(self._n_keys * self.dim * self.dtype.itemsize)
+            f.write(np.ascontiguousarray(vectors, dtype=self.dtype).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self._keys_path, 'ab') as f:
+            f.write(b''.join(keys))
+
+        for i, key in enumerate(keys):
+            self._rows[key] = self._n_keys + i
+        self._n_keys += len(keys)
+        self._vectors = None
+
+    def get_or_compute(self, titles, encode, batch_size=256):
+        """
+        Embeddings des titres ; seuls les titres absents du store sont encodés.
+
+        Args:
+            titles: Séquence de titres
+            encode: Fonction liste de titres -> array (n, dim)
+            batch_size: Nombre de titres encodés et écrits par lot
+
+        Returns:
+            Array float32 (n_titres, dim)
+        """
+        titles = [str(title) for title in titles]
+        keys = [title_key(title) for title in titles]
+
+        self._refresh()
+        missing = {key: title for key, title in zip(keys, titles) if key not in self._rows}
+        self.hits += len(titles) - sum(key in missing for key in keys)
+
+        if missing:
+            with self._lock():
+                # Un autre processus a pu encoder une partie des titres entre-temps
+                self._refresh()
+                missing = {key: title for key, title in missing.items() if key not in self._rows}
+                missing_keys = list(missing)
+                self.misses += len(missing_keys)
+                for start in range(0, len(missing_keys), batch_size):
+                    batch_keys = missing_keys[start:start + batch_size]
+                    vectors = encode([missing[key] for key in batch_keys])
+                    self._append(batch_keys, vectors)
+
+        if not titles:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        rows = np.fromiter((self._rows[key] for key in keys), dtype=np.int64, count=len(keys))
+        return np.asarray(self._matrix()[rows], dtype=np.float32)
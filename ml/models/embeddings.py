@@ -1,22 +1,40 @@
 """
 Différentes méthodes d'embedding pour les titres de vidéos.
 """
+import re
+
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer, CountVectorizer
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer, CountVectorizer, HashingVectorizer
 from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.decomposition import PCA
+from sklearn.preprocessing import normalize
+from sklearn.random_projection import GaussianRandomProjection
+
+
+def _format_output(X, sparse):
+    """Renvoie X en CSR si sparse est demandé, sinon en array dense."""
+    if sparse:
+        return sp.csr_matrix(X)
+    return X.toarray() if sp.issparse(X) else X
 
 
 class TfidfEmbedding(BaseEstimator, TransformerMixin):
     """Embedding TF-IDF simple et rapide."""
 
-    def __init__(self, max_features=1000, ngram_range=(1, 2)):
+    # Valeur par défaut pour les modèles picklés avant l'ajout de l'option
+    sparse = False
+
+    def __init__(self, max_features=1000, ngram_range=(1, 2), sparse=False):
         """
         Args:
             max_features: Nombre maximum de features
             ngram_range: Range des n-grams (ex: (1,2) pour unigrams et bigrams)
+            sparse: Si True, renvoie une matrice CSR au lieu d'un array dense
         """
         self.max_features = max_features
         self.ngram_range = ngram_range
+        self.sparse = sparse
         self.vectorizer = None
 
     def fit(self, X, y=None):
@@ -32,20 +50,89 @@ class TfidfEmbedding(BaseEstimator, TransformerMixin):
 
     def transform(self, X):
         """Transforme les textes en vecteurs TF-IDF."""
-        return self.vectorizer.transform(X).toarray()
+        return _format_output(self.vectorizer.transform(X), self.sparse)
+
+
+class HashingEmbedding(BaseEstimator, TransformerMixin):
+    """
+    Embedding TF-IDF sur un espace de features haché (sans vocabulaire).
+
+    L'espace de features est fixe (HashingVectorizer) : on peut entraîner
+    par morceaux sans jamais refaire de vocabulaire. Les statistiques IDF
+    (fréquence documentaire par feature) sont accumulées au fil des appels
+    à partial_fit.
+    """
+
+    def __init__(self, n_features=2**18, ngram_range=(1, 2), use_idf=True, sparse=True):
+        """
+        Args:
+            n_features: Taille de l'espace haché
+            ngram_range: Range des n-grams
+            use_idf: Si True, pondère par l'IDF calculé en streaming
+            sparse: Si True, renvoie une matrice CSR au lieu d'un array dense
+        """
+        self.n_features = n_features
+        self.ngram_range = ngram_range
+        self.use_idf = use_idf
+        self.sparse = sparse
+
+    def _hashing_vectorizer(self):
+        return HashingVectorizer(
+            n_features=self.n_features,
+            ngram_range=self.ngram_range,
+            lowercase=True,
+            strip_accents='unicode',
+            alternate_sign=False,
+            norm=None
+        )
+
+    def fit(self, X, y=None):
+        """Réinitialise les statistiques IDF puis les calcule sur X."""
+        self.vectorizer = self._hashing_vectorizer()
+        self.n_docs_ = 0
+        self.document_frequency_ = np.zeros(self.n_features, dtype=np.int64)
+        return self.partial_fit(X, y)
+
+    def partial_fit(self, X, y=None):
+        """Met à jour les statistiques IDF avec un nouveau morceau de textes."""
+        if not hasattr(self, 'document_frequency_'):
+            return self.fit(X, y)
+        if len(X) == 0:
+            return self
+        counts = self.vectorizer.transform(X)
+        self.document_frequency_ += np.bincount(counts.indices, minlength=self.n_features)
+        self.n_docs_ += counts.shape[0]
+        return self
+
+    @property
+    def idf_(self):
+        """IDF lissé, même formule que TfidfVectorizer (smooth_idf=True)."""
+        return np.log((1 + self.n_docs_) / (1 + self.document_frequency_)) + 1
+
+    def transform(self, X):
+        """Transforme les textes en vecteurs TF-IDF hachés (normalisés L2)."""
+        counts = self.vectorizer.transform(X)
+        if self.use_idf:
+            counts = counts @ sp.diags(self.idf_)
+        return _format_output(normalize(counts), self.sparse)
 
 
 class BOWEmbedding(BaseEstimator, TransformerMixin):
     """Embedding Bag of Words simple."""
 
-    def __init__(self, max_features=1000, ngram_range=(1, 2)):
+    # Valeur par défaut pour les modèles picklés avant l'ajout de l'option
+    sparse = False
+
+    def __init__(self, max_features=1000, ngram_range=(1, 2), sparse=False):
         """
         Args:
             max_features: Nombre maximum de features
             ngram_range: Range des n-grams
+            sparse: Si True, renvoie une matrice CSR au lieu d'un array dense
         """
         self.max_features = max_features
         self.ngram_range = ngram_range
+        self.sparse = sparse
         self.vectorizer = None
 
     def fit(self, X, y=None):
@@ -61,7 +148,45 @@ class BOWEmbedding(BaseEstimator, TransformerMixin):
 
     def transform(self, X):
         """Transforme les textes en vecteurs BOW."""
-        return self.vectorizer.transform(X).toarray()
+        return _format_output(self.vectorizer.transform(X), self.sparse)
+
+
+def _keywords_overlap(a, b):
+    """Indique si deux mots-clés peuvent se chevaucher dans un texte."""
+    if a in b or b in a:
+        return True
+    for k in range(1, min(len(a), len(b))):
+        if a.endswith(b[:k]) or b.endswith(a[:k]):
+            return True
+    return False
+
+
+def _compile_keyword_patterns(keywords):
+    """
+    Regroupe les mots-clés en regex alternées sans chevauchement possible.
+
+    Deux mots-clés d'une même regex ne peuvent jamais se recouvrir : une
+    passe `finditer` compte donc chacun exactement comme `str.count`
+    (occurrences non chevauchantes). Les mots-clés en conflit sont répartis
+    sur plusieurs regex par coloration gloutonne.
+
+    Args:
+        keywords: Liste de mots-clés (déjà en minuscules, sans doublon)
+
+    Returns:
+        Liste de regex compilées
+    """
+    groups = []
+    # Les plus longs d'abord : ce sont eux qui ont le plus de conflits
+    for keyword in sorted(keywords, key=lambda k: (-len(k), k)):
+        for group in groups:
+            if not any(_keywords_overlap(keyword, other) for other in group):
+                group.append(keyword)
+                break
+        else:
+            groups.append([keyword])
+
+    return [re.compile('|'.join(re.escape(k) for k in group)) for group in groups]
 
 
 class KeywordEmbedding(BaseEstimator, TransformerMixin):
@@ -123,11 +248,17 @@ class KeywordEmbedding(BaseEstimator, TransformerMixin):
         self.feature_names = []
 
     def fit(self, X, y=None):
-        """Construit la liste de features."""
+        """Construit la liste de features et compile les mots-clés."""
         # Créer une feature par mot-clé
+        self.feature_names = []
+        columns = {}
         for category in self.categories:
             for keyword in self.keywords[category]:
+                columns.setdefault(keyword.lower(), []).append(len(self.feature_names))
                 self.feature_names.append(f"{category}_{keyword}")
+
+        self.keyword_columns_ = columns
+        self.patterns_ = _compile_keyword_patterns(list(columns))
         return self
 
     def transform(self, X):
@@ -136,27 +267,41 @@ class KeywordEmbedding(BaseEstimator, TransformerMixin):
 
         Pour chaque titre, crée un vecteur où chaque dimension représente
         la présence (ou le nombre d'occurrences) d'un mot-clé.
+
+        Les titres sont concaténés (séparés par un caractère nul) et chaque
+        regex compilée au fit est appliquée en une seule passe sur le tout.
+        Les comptes sont identiques à `titre.lower().count(mot_cle)`.
         """
-        vectors = []
+        texts = [str(text).lower() for text in X]
+        vectors = np.zeros((len(texts), len(self.feature_names)), dtype=np.int64)
+        if not texts:
+            return vectors
 
-        for text in X:
-            text_lower = text.lower()
-            vector = []
+        # Position de début de chaque titre dans le corpus concaténé
+        lengths = np.fromiter((len(t) + 1 for t in texts), dtype=np.int64, count=len(texts))
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        corpus = '\0'.join(texts)
 
-            for category in self.categories:
-                for keyword in self.keywords[category]:
-                    # Compter les occurrences du mot-clé
-                    count = text_lower.count(keyword.lower())
-                    vector.append(count)
+        for pattern in self.patterns_:
+            positions = {}
+            for match in pattern.finditer(corpus):
+                positions.setdefault(match.group(), []).append(match.start())
 
-            vectors.append(vector)
+            for keyword, pos in positions.items():
+                rows = np.searchsorted(starts, pos, side='right') - 1
+                counts = np.bincount(rows, minlength=len(texts))
+                for column in self.keyword_columns_[keyword]:
+                    vectors[:, column] = counts
 
-        return np.array(vectors)
+        return vectors
 
 
 class HybridEmbedding(BaseEstimator, TransformerMixin):
     """
     Combine plusieurs embeddings (ex: TF-IDF + Keywords).
+
+    Si au moins un des embeddings renvoie une matrice creuse, le résultat
+    est une matrice CSR (les blocs denses sont convertis), sinon un array dense.
     """
 
     def __init__(self, embeddings):
@@ -175,37 +320,154 @@ class HybridEmbedding(BaseEstimator, TransformerMixin):
     def transform(self, X):
         """Concatène les vecteurs de tous les embeddings."""
         vectors = [emb.transform(X) for emb in self.embeddings]
+        if any(sp.issparse(v) for v in vectors):
+            return sp.hstack(vectors, format='csr')
         return np.hstack(vectors)
 
 
+class ReducedEmbedding(BaseEstimator, TransformerMixin):
+    """
+    Réduit et/ou quantifie un embedding dense (ex: Sentence Transformers).
+
+    - Projection sur n_components dimensions : PCA ou projection
+      aléatoire gaussienne, apprise sur les vecteurs d'entraînement
+    - Quantification int8 avec une échelle par dimension (max absolu du
+      train / 127)
+
+    transform renvoie les valeurs déquantifiées en float32 pour que les
+    classificateurs (SVM, KNN, GMM) les consomment tels quels ;
+    quantize_int8 renvoie les codes int8 à stocker (bytes_per_vector_
+    octets par titre).
+    """
+
+    def __init__(self, embedding, n_components=None, method='pca', quantize=False, random_state=42):
+        """
+        Args:
+            embedding: Embedding dense à réduire
+            n_components: Dimension de sortie (None = pas de projection)
+            method: 'pca' ou 'random' (projection aléatoire gaussienne)
+            quantize: Si True, quantifie en int8 par dimension
+            random_state: Graine de la PCA / projection
+        """
+        self.embedding = embedding
+        self.n_components = n_components
+        self.method = method
+        self.quantize = quantize
+        self.random_state = random_state
+
+    def _project(self, X):
+        X = np.asarray(self.embedding.transform(X), dtype=np.float32)
+        if self.projection_ is not None:
+            X = self.projection_.transform(X).astype(np.float32)
+        return X
+
+    def fit(self, X, y=None):
+        """Entraîne l'embedding, la projection et les échelles de quantification."""
+        self.embedding.fit(X, y)
+        Z = np.asarray(self.embedding.transform(X), dtype=np.float32)
+
+        self.projection_ = None
+        if self.n_components is not None and self.n_components < Z.shape[1]:
+            if self.method == 'pca':
+                self.projection_ = PCA(n_components=self.n_components, random_state=self.random_state)
+            elif self.method == 'random':
+                self.projection_ = GaussianRandomProjection(n_components=self.n_components,
+                                                            random_state=self.random_state)
+            else:
+                raise ValueError(f"Méthode de projection inconnue: {self.method!r}")
+            Z = self.projection_.fit_transform(Z).astype(np.float32)
+
+        self.scales_ = None
+        if self.quantize:
+            max_abs = np.abs(Z).max(axis=0)
+            self.scales_ = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+
+        self.n_features_out_ = Z.shape[1]
+        self.bytes_per_vector_ = self.n_features_out_ * (1 if self.quantize else 4)
+        return self
+
+    def quantize_int8(self, X):
+        """Codes int8 des titres (nécessite quantize=True)."""
+        if self.scales_ is None:
+            raise ValueError("ReducedEmbedding entraîné sans quantize=True")
+        codes = np.round(self._project(X) / self.scales_)
+        return np.clip(codes, -127, 127).astype(np.int8)
+
+    def transform(self, X):
+        """Vecteurs projetés (et déquantifiés si quantize=True), en float32."""
+        if self.scales_ is None:
+            return self._project(X)
+        return self.quantize_int8(X).astype(np.float32) * self.scales_
+
+
 # Tentative d'import de sentence-transformers (optionnel)
 try:
     from sentence_transformers import SentenceTransformer
 
+    # Modèles chargés, partagés par toutes les instances du processus
+    _SENTENCE_TRANSFORMERS = {}
+
+    def load_sentence_transformer(model_name):
+        """Charge un modèle Sentence Transformers une seule fois par processus."""
+        if model_name not in _SENTENCE_TRANSFORMERS:
+            print(f"Chargement du modèle {model_name}...")
+            _SENTENCE_TRANSFORMERS[model_name] = SentenceTransformer(model_name)
+        return _SENTENCE_TRANSFORMERS[model_name]
+
     class SentenceTransformerEmbedding(BaseEstimator, TransformerMixin):
         """
         Embedding avec Sentence Transformers (BERT-like).
         Plus lent mais potentiellement plus performant.
+
+        Avec store_dir, les embeddings sont conservés sur disque
+        (EmbeddingStore) : seuls les titres jamais vus sont encodés.
         """
 
-        def __init__(self, model_name='paraphrase-multilingual-MiniLM-L12-v2'):
+        # Valeurs par défaut pour les modèles picklés avant l'ajout des options
+        store_dir = None
+        batch_size = 32
+        store_dtype = 'float32'
+
+        def __init__(self, model_name='paraphrase-multilingual-MiniLM-L12-v2',
+                     store_dir=None, batch_size=32, store_dtype='float32'):
             """
             Args:
                 model_name: Nom du modèle à utiliser
                            (multilingual pour supporter le français)
+                store_dir: Dossier du store d'embeddings persistant (None = pas de store)
+                batch_size: Titres encodés par lot
+                store_dtype: 'float16' ou 'float32' pour le store
             """
             self.model_name = model_name
-            self.model = None
+            self.store_dir = store_dir
+            self.batch_size = batch_size
+            self.store_dtype = store_dtype
+
+        @property
+        def model(self):
+            return load_sentence_transformer(self.model_name)
 
         def fit(self, X, y=None):
-            """Charge le modèle pré-entraîné."""
-            print(f"Chargement du modèle {self.model_name}...")
-            self.model = SentenceTransformer(self.model_name)
+            """Pas d'entraînement : le modèle pré-entraîné est chargé à la demande."""
             return self
 
+        def _encode(self, X):
+            return self.model.encode(list(X), batch_size=self.batch_size, show_progress_bar=False)
+
         def transform(self, X):
-            """Encode les textes avec Sentence Transformers."""
-            return self.model.encode(X, show_progress_bar=False)
+            """Encode les textes avec Sentence Transformers (via le store si configuré)."""
+            if self.store_dir is None:
+                return self._encode(X)
+            if getattr(self, '_store', None) is None:
+                from models.embedding_store import EmbeddingStore
+                self._store = EmbeddingStore(self.store_dir, self.model_name, self.store_dtype)
+            return self._store.get_or_compute(X, self._encode, batch_size=self.batch_size)
+
+        def __getstate__(self):
+            # Le store (memmap, index en mémoire) est rouvert après dépickling
+            state = super().__getstate__()
+            state.pop('_store', None)
+            return state
 
     SENTENCE_TRANSFORMERS_AVAILABLE = True
 
@@ -1,10 +1,117 @@
 """
 Exporte le modèle TF-IDF + SVM en format JSON pour JavaScript.
+
+Le SVC(kernel='linear') est un classificateur one-vs-one : plutôt que
+d'exporter les vecteurs de support (évaluer le noyau contre chacun coûte
+O(n_SV x n_features) par titre), on exporte pour chaque paire de classes
+son vecteur de poids primal. La prédiction se fait par vote entre paires,
+comme libsvm, en O(n_paires x nnz).
 """
 import json
+import sys
 from pathlib import Path
 import joblib
 import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+# Le pipeline picklé référence le module models.embeddings
+sys.path.append(str(Path(__file__).parent.parent))
+
+from inference.engine import InferenceEngine, check_parity
+
+
+def collapse_ovo(svm):
+    """
+    Replie la représentation duale OvO d'un SVC linéaire en poids primaux.
+
+    Pour la paire (i, j), w = somme des dual_coef x support_vectors des
+    classes i et j : c'est ce que calcule `svm.coef_` pour un noyau linéaire.
+
+    Un score de paire positif vote pour i, comme dans libsvm. En binaire,
+    sklearn inverse le signe (positif = classes_[1]) : on le rétablit.
+
+    Returns:
+        Tuple (coef (n_paires, n_features), intercept (n_paires,), paires)
+        avec les paires dans l'ordre de libsvm : (0,1), (0,2), ..., (1,2), ...
+    """
+    if svm.kernel != 'linear':
+        raise ValueError("Seul un SVC à noyau linéaire peut être replié en poids primaux")
+
+    coef = svm.coef_
+    if sp.issparse(coef):
+        coef = coef.toarray()
+    coef = np.asarray(coef)
+    intercept = np.asarray(svm.intercept_)
+    n_classes = len(svm.classes_)
+    if n_classes == 2:
+        coef, intercept = -coef, -intercept
+    pairs = [(i, j) for i in range(n_classes) for j in range(i + 1, n_classes)]
+    return coef, intercept, pairs
+
+
+def ovo_predict(X, coef, intercept, pairs, classes):
+    """
+    Prédit par vote one-vs-one à partir des poids primaux.
+
+    Args:
+        X: Vecteurs TF-IDF (creux ou denses), shape (n_samples, n_features)
+        coef, intercept, pairs: Sortie de collapse_ovo
+        classes: Noms des classes
+
+    Returns:
+        Array des classes prédites
+    """
+    # Creux x dense : O(nnz x n_paires)
+    scores = np.asarray(X @ coef.T) + intercept
+    pairs = np.asarray(pairs)
+
+    # Comme libsvm : score > 0 vote pour i, sinon pour j ; égalité -> plus petit indice
+    winners = np.where(scores > 0, pairs[:, 0], pairs[:, 1])
+    votes = np.zeros((scores.shape[0], len(classes)), dtype=np.int64)
+    np.add.at(votes, (np.arange(scores.shape[0])[:, None], winners), 1)
+    return np.asarray(classes)[np.argmax(votes, axis=1)]
+
+
+def build_ovo_model_data(tfidf, svm, categories, calibration=None):
+    """
+    Construit le dictionnaire exporté en JSON pour un SVC linéaire one-vs-one.
+
+    Args:
+        tfidf: TfidfVectorizer entraîné
+        svm: SVC(kernel='linear') entraîné
+        categories: Liste triée des catégories
+        calibration: Paramètres de calibration (models/calibration.py), ou None
+
+    Returns:
+        Dictionnaire sérialisable en JSON
+    """
+    coef, intercept, pairs = collapse_ovo(svm)
+    model_data = {
+        "tfidf": {
+            "vocabulary": {word: int(idx) for word, idx in tfidf.vocabulary_.items()},
+            "idf": tfidf.idf_.tolist(),
+            "max_features": tfidf.max_features,
+            "ngram_range": list(tfidf.ngram_range)
+        },
+        "svm": {
+            "decision": "ovo",
+            "coef": coef.tolist(),
+            "intercept": intercept.tolist(),
+            "pairs": [list(pair) for pair in pairs],
+            "classes": svm.classes_.tolist()
+        },
+        "categories": categories,
+        "metadata": {
+            "model_type": "TF-IDF + SVM-Linear (OvO)",
+            "n_features": len(tfidf.vocabulary_),
+            "n_classes": len(categories),
+            "n_pairs": len(pairs)
+        }
+    }
+    if calibration is not None:
+        model_data["calibration"] = calibration
+    return model_data
 
 
 def export_model_to_json():
@@ -24,47 +131,30 @@ def export_model_to_json():
     # Extraire les composants
     tfidf = model.named_steps['embedding'].vectorizer
     svm = model.named_steps['classifier']
+    # Pipeline calibré (train_final_model.py) : SVC + paramètres de calibration
+    calibration = getattr(svm, 'calibration_', None)
+    if calibration is not None:
+        svm = svm.estimator_
 
     print("  ✓ Modèle chargé")
 
-    # Extraire les paramètres TF-IDF
-    vocabulary = tfidf.vocabulary_
-    idf_values = tfidf.idf_.tolist()
-
-    # Extraire les paramètres SVM
-    # Pour un SVM linéaire, on a besoin de:
-    # - support_vectors: les vecteurs de support
-    # - dual_coef: les coefficients duaux
-    # - intercept: le biais
-    # - classes: les classes
-
-    support_vectors = svm.support_vectors_.tolist()
-    dual_coef = svm.dual_coef_.tolist()
-    intercept = svm.intercept_.tolist()
+    # Extraire les paramètres SVM : poids primaux par paire de classes
+    coef, intercept, pairs = collapse_ovo(svm)
     classes = svm.classes_.tolist()
+    print(f"  ✓ {svm.support_vectors_.shape[0]} vecteurs de support repliés en {len(pairs)} paires")
+
+    # Vérifier que le vote OvO reproduit model.predict sur tout le dataset
+    data_path = Path(__file__).parent.parent.parent / "data" / "raw" / "youtube_titles.csv"
+    print(f"\nVérification sur le dataset: {data_path}")
+    X = pd.read_csv(data_path)['title'].values
+    predictions = ovo_predict(tfidf.transform(X), coef, intercept, pairs, classes)
+    n_diff = int(np.sum(predictions != model.predict(X)))
+    if n_diff:
+        raise RuntimeError(f"Le scorer OvO diffère de model.predict sur {n_diff} titres")
+    print(f"  ✓ Prédictions identiques sur {len(X)} titres")
 
     # Créer le dictionnaire d'export
-    model_data = {
-        "tfidf": {
-            "vocabulary": vocabulary,
-            "idf": idf_values,
-            "max_features": 500,
-            "ngram_range": [1, 2]
-        },
-        "svm": {
-            "support_vectors": support_vectors,
-            "dual_coef": dual_coef,
-            "intercept": intercept,
-            "classes": classes
-        },
-        "categories": categories,
-        "metadata": {
-            "model_type": "TF-IDF + SVM-Linear",
-            "n_features": len(vocabulary),
-            "n_classes": len(categories),
-            "n_support_vectors": len(support_vectors)
-        }
-    }
+    model_data = build_ovo_model_data(tfidf, svm, categories, calibration=calibration)
 
     # Sauvegarder en JSON
     output_path = Path(__file__).parent.parent.parent / "extension" / "model.json"
@@ -75,12 +165,25 @@ def export_model_to_json():
 
     print("  ✓ Export terminé")
 
+    # Vérifier le fichier écrit avec le moteur d'inférence léger
+    mismatches = check_parity(InferenceEngine.from_json(output_path), model, X)
+    if mismatches:
+        raise RuntimeError(f"Le modèle exporté diffère de Pipeline.predict sur {len(mismatches)} titres")
+    print("  ✓ Fichier relu par le moteur d'inférence : parité avec Pipeline.predict")
+
+    if calibration is not None:
+        engine = InferenceEngine.from_json(output_path)
+        max_diff = np.abs(engine.predict_proba(X) - model.predict_proba(X)).max()
+        if max_diff > 1e-6:
+            raise RuntimeError(f"Probabilités du moteur différentes de Pipeline.predict_proba ({max_diff:.2e})")
+        print(f"  ✓ Probabilités calibrées identiques ({calibration['method']}, écart max {max_diff:.1e})")
+
     # Afficher les statistiques
     print("\n" + "="*70)
     print("STATISTIQUES")
     print("="*70)
-    print(f"  - Vocabulaire: {len(vocabulary)} mots")
-    print(f"  - Vecteurs de support: {len(support_vectors)}")
+    print(f"  - Vocabulaire: {len(tfidf.vocabulary_)} mots")
+    print(f"  - Paires de classes: {len(pairs)}")
     print(f"  - Classes: {len(categories)}")
     print(f"  - Taille du fichier: {output_path.stat().st_size / 1024:.1f} KB")
 
@@ -1,77 +1,318 @@
 """
 Entraîne un modèle simple et l'exporte directement en JSON.
 """
+import argparse
 import json
+import sys
+import time
 from pathlib import Path
+import numpy as np
 import pandas as pd
+import scipy.sparse as sp
 from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import train_test_split
 from sklearn.svm import LinearSVC
 
+sys.path.append(str(Path(__file__).parent.parent))
 
-def train_and_export():
-    """Entraîne le modèle et l'exporte directement en JSON."""
-    print("="*70)
-    print("ENTRAÎNEMENT ET EXPORT DU MODÈLE")
-    print("="*70)
+from inference.engine import InferenceEngine
+from models.binary_model import load_binary_model, write_binary_model
+from models.calibration import CalibratedClassifier
+from models.pruning import csr_to_dict, prune_linear_model
 
-    # Charger les données
-    data_path = Path(__file__).parent.parent.parent / "data" / "raw" / "youtube_titles.csv"
-    print(f"\nChargement des données: {data_path}")
 
-    df = pd.read_csv(data_path)
-    X = df['title'].values
-    y = df['category'].values
+def build_model_data(tfidf, classifier, categories, model_type="TF-IDF + LinearSVC",
+                     calibration=None):
+    """
+    Construit le dictionnaire exporté en JSON pour l'extension.
 
-    print(f"  ✓ {len(X)} échantillons")
+    Args:
+        tfidf: TfidfVectorizer entraîné
+        classifier: Classificateur linéaire entraîné (coef_, intercept_, classes_)
+        categories: Liste triée des catégories
+        model_type: Description du modèle (métadonnées)
+        calibration: Paramètres de calibration (models/calibration.py), ou None
 
-    # Créer et entraîner TF-IDF
-    print("\nEntraînement TF-IDF...")
-    tfidf = TfidfVectorizer(
-        max_features=500,
-        ngram_range=(1, 2),
-        lowercase=True,
-        strip_accents='unicode'
+    Returns:
+        Dictionnaire sérialisable en JSON
+    """
+    # Pour LinearSVC, on a directement coef_ et intercept_
+    # (SVC entraîné sur des features creuses renvoie un coef_ creux)
+    coef = classifier.coef_
+    if sp.issparse(coef):
+        coef = coef.toarray()
+
+    return model_data_from_arrays(
+        tfidf.vocabulary_,
+        tfidf.idf_,
+        coef,
+        classifier.intercept_,
+        classifier.classes_,
+        categories,
+        ngram_range=tfidf.ngram_range,
+        max_features=tfidf.max_features,
+        model_type=model_type,
+        calibration=calibration
     )
-    X_tfidf = tfidf.fit_transform(X)
-    print("  ✓ TF-IDF entraîné")
 
-    # Créer et entraîner SVM
-    print("\nEntraînement SVM...")
-    svm = LinearSVC(C=1.0, random_state=42, max_iter=10000)
-    svm.fit(X_tfidf, y)
-    print("  ✓ SVM entraîné")
 
-    # Extraire les paramètres
+def model_data_from_arrays(vocabulary, idf, coef, intercept, classes, categories,
+                           ngram_range=(1, 2), max_features=None, model_type="TF-IDF + LinearSVC",
+                           sparse_coef=False, calibration=None):
+    """
+    Construit le dictionnaire d'export à partir des tableaux bruts.
+
+    Args:
+        vocabulary: Dict {terme: colonne}
+        idf: Vecteur IDF (n_features,)
+        coef: Matrice (n_classes, n_features), dense ou CSR si sparse_coef
+        intercept: Biais (n_classes,)
+        classes: Classes dans l'ordre des lignes de coef
+        categories: Liste triée des catégories
+        ngram_range: Range des n-grams
+        max_features: Taille maximale du vocabulaire (métadonnée)
+        model_type: Description du modèle (métadonnées)
+        sparse_coef: Si True, coef est exporté au format CSR (clé coef_csr)
+        calibration: Paramètres de calibration (clé calibration), ou None
+
+    Returns:
+        Dictionnaire sérialisable en JSON
+    """
     # Convertir le vocabulaire en dict Python natif (pas numpy)
-    vocabulary = {word: int(idx) for word, idx in tfidf.vocabulary_.items()}
-    idf_values = tfidf.idf_.tolist()
+    vocabulary = {word: int(idx) for word, idx in vocabulary.items()}
 
-    # Pour LinearSVC, on a directement coef_ et intercept_
-    coef = svm.coef_.tolist()  # shape: (n_classes, n_features)
-    intercept = svm.intercept_.tolist()  # shape: (n_classes,)
-    classes = svm.classes_.tolist()
-    categories = sorted(df['category'].unique())
+    if sparse_coef:
+        svm = {"coef_csr": csr_to_dict(coef)}
+    else:
+        svm = {"coef": np.asarray(coef).tolist()}  # shape: (n_classes, n_features)
+    svm["intercept"] = np.asarray(intercept).tolist()  # shape: (n_classes,)
+    svm["classes"] = np.asarray(classes).tolist()
 
-    # Créer le dictionnaire d'export
     model_data = {
         "tfidf": {
             "vocabulary": vocabulary,
-            "idf": idf_values,
-            "max_features": 500,
-            "ngram_range": [1, 2]
+            "idf": np.asarray(idf).tolist(),
+            "max_features": max_features,
+            "ngram_range": list(ngram_range)
         },
-        "svm": {
-            "coef": coef,
-            "intercept": intercept,
-            "classes": classes
-        },
-        "categories": categories,
+        "svm": svm,
+        "categories": list(categories),
         "metadata": {
-            "model_type": "TF-IDF + LinearSVC",
+            "model_type": model_type,
             "n_features": len(vocabulary),
             "n_classes": len(categories)
         }
     }
+    if calibration is not None:
+        model_data["calibration"] = calibration
+    return model_data
+
+
+def export_binary(output_path, tfidf, classifier, quantize=False):
+    """
+    Exporte le modèle au format binaire compact (voir models/binary_model.py).
+
+    Returns:
+        Taille du fichier en octets
+    """
+    return write_binary_model(
+        output_path,
+        tfidf.vocabulary_,
+        tfidf.idf_,
+        classifier.coef_,
+        classifier.intercept_,
+        classifier.classes_,
+        ngram_range=tfidf.ngram_range,
+        quantize=quantize
+    )
+
+
+def verify_binary_model(bin_path, tfidf, classifier, X):
+    """
+    Vérifie que le modèle binaire rechargé prédit comme le modèle sklearn.
+
+    Le fichier est relu par le moteur d'inférence léger (inference/engine.py),
+    qui recalcule les vecteurs TF-IDF à partir du vocabulaire et des IDF
+    exportés uniquement.
+
+    Returns:
+        Taux d'accord des prédictions (1.0 = identiques)
+    """
+    engine = InferenceEngine.from_binary(bin_path)
+    return np.mean(engine.predict_batch(X) == classifier.predict(tfidf.transform(X)))
+
+
+def _best_load_time(load, repeat=5):
+    """Meilleur temps (secondes) de `load()` sur plusieurs essais."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def compare_exports(json_path, bin_path):
+    """Affiche la taille et le temps de chargement JSON vs binaire."""
+    def load_json():
+        with open(json_path, encoding='utf-8') as f:
+            json.load(f)
+
+    json_size = json_path.stat().st_size
+    bin_size = bin_path.stat().st_size
+    json_time = _best_load_time(load_json)
+    bin_time = _best_load_time(lambda: load_binary_model(bin_path))
+
+    print(f"  - JSON    : {json_size / 1024:.1f} KB, chargement {json_time * 1000:.2f}ms")
+    print(f"  - Binaire : {bin_size / 1024:.1f} KB, chargement {bin_time * 1000:.2f}ms")
+    print(f"  - Gain    : {json_size / bin_size:.1f}x plus petit, {json_time / bin_time:.1f}x plus rapide à charger")
+
+
+def _fit_tfidf_svm(X, y):
+    """Entraîne le TF-IDF et le LinearSVC exportés."""
+    tfidf = TfidfVectorizer(
+        max_features=500,
+        ngram_range=(1, 2),
+        lowercase=True,
+        strip_accents='unicode'
+    )
+    X_tfidf = tfidf.fit_transform(X)
+    svm = LinearSVC(C=1.0, random_state=42, max_iter=10000)
+    svm.fit(X_tfidf, y)
+    return tfidf, svm, X_tfidf
+
+
+def _scoring_time(engine, titles):
+    """Temps moyen (µs) pour scorer un titre seul avec le moteur léger."""
+    start = time.perf_counter()
+    for title in titles:
+        engine.predict(title)
+    return (time.perf_counter() - start) / len(titles) * 1e6
+
+
+def pruning_report(X, y, method, sparsity, l1_c):
+    """
+    Compare le modèle élagué au modèle complet sur un split 80/20.
+
+    Les deux modèles sont entraînés sur le train puis scorés par le moteur
+    léger sur la validation : accuracy, F1, nombre de termes, taille de
+    l'export JSON et temps de scoring d'un titre.
+    """
+    X_train, X_val, y_train, y_val = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=y
+    )
+    tfidf, svm, X_tfidf = _fit_tfidf_svm(X_train, y_train)
+    categories = sorted(set(y))
+
+    full = (tfidf.vocabulary_, tfidf.idf_, svm.coef_, svm.intercept_, svm.classes_)
+    pruned = prune_linear_model(tfidf.vocabulary_, tfidf.idf_, svm, X_tfidf, y_train,
+                                method=method, sparsity=sparsity, C=l1_c)
+
+    rows = []
+    for label, (vocabulary, idf, coef, intercept, classes), sparse_coef in [
+        ("Complet", full, False), ("Élagué", pruned, True)
+    ]:
+        dense_coef = coef.toarray() if sp.issparse(coef) else coef
+        engine = InferenceEngine(vocabulary, idf, dense_coef, intercept, classes,
+                                 ngram_range=tfidf.ngram_range)
+        y_pred = engine.predict_batch(X_val)
+        model_data = model_data_from_arrays(vocabulary, idf, coef, intercept, classes, categories,
+                                            ngram_range=tfidf.ngram_range, sparse_coef=sparse_coef)
+        rows.append({
+            'label': label,
+            'n_features': len(vocabulary),
+            'nnz': int(np.count_nonzero(dense_coef)),
+            'accuracy': accuracy_score(y_val, y_pred),
+            'f1': f1_score(y_val, y_pred, average='macro'),
+            'json_kb': len(json.dumps(model_data, ensure_ascii=False).encode('utf-8')) / 1024,
+            'time_us': _scoring_time(engine, X_val),
+        })
+
+    print(f"\nÉlagage ({method}) - évaluation sur {len(X_val)} titres de validation:")
+    for row in rows:
+        print(f"  - {row['label']:8s}: {row['n_features']:4d} termes, {row['nnz']:5d} coefficients, "
+              f"accuracy {row['accuracy']:.4f}, F1 {row['f1']:.4f}, "
+              f"JSON {row['json_kb']:.1f} KB, {row['time_us']:.1f}µs/titre")
+    full_row, pruned_row = rows
+    print(f"  ✓ Écart d'accuracy: {pruned_row['accuracy'] - full_row['accuracy']:+.4f}, "
+          f"F1: {pruned_row['f1'] - full_row['f1']:+.4f}, "
+          f"taille: {full_row['json_kb'] / pruned_row['json_kb']:.1f}x plus petit")
+    return rows
+
+
+def fit_export_calibration(svm, X_tfidf, y, method):
+    """
+    Calibration des scores du LinearSVC exporté.
+
+    Une copie du LinearSVC est entraînée sur 80% des données et la
+    calibration apprise sur ses scores des 20% restants ; elle est ensuite
+    appliquée au modèle final, entraîné sur tout le dataset.
+    """
+    calibrated = CalibratedClassifier(svm, method=method, refit=False).fit(X_tfidf, y)
+    calibration = calibrated.calibration_
+    if method == 'temperature':
+        print(f"  ✓ Calibration (température): T = {calibration['temperature']:.4f}")
+    else:
+        print(f"  ✓ Calibration (sigmoïde par classe): {len(calibration['a'])} couples (a, b)")
+    return calibration
+
+
+def train_and_export(quantize=False, prune=None, sparsity=0.9, l1_c=1.0, calibration='temperature'):
+    """
+    Entraîne le modèle et l'exporte directement en JSON (et en binaire).
+
+    Args:
+        quantize: Si True, les coefficients du modèle binaire sont quantifiés en int8
+        prune: None, 'magnitude' ou 'l1' (voir models/pruning.py) : le modèle
+               exporté est élagué et ses coefficients sont écrits en CSR
+        sparsity: Fraction de coefficients annulés par classe (prune='magnitude')
+        l1_c: Régularisation du LinearSVC L1 (prune='l1')
+        calibration: 'temperature', 'sigmoid' ou None : paramètres écrits dans
+               model.json pour les probabilités (moteur léger et extension)
+    """
+    print("="*70)
+    print("ENTRAÎNEMENT ET EXPORT DU MODÈLE")
+    print("="*70)
+
+    # Charger les données
+    data_path = Path(__file__).parent.parent.parent / "data" / "raw" / "youtube_titles.csv"
+    print(f"\nChargement des données: {data_path}")
+
+    df = pd.read_csv(data_path)
+    X = df['title'].values
+    y = df['category'].values
+
+    print(f"  ✓ {len(X)} échantillons")
+
+    if prune is not None:
+        pruning_report(X, y, prune, sparsity, l1_c)
+
+    # Créer et entraîner TF-IDF et SVM
+    print("\nEntraînement TF-IDF + SVM...")
+    tfidf, svm, X_tfidf = _fit_tfidf_svm(X, y)
+    print("  ✓ TF-IDF et SVM entraînés")
+    calibration_params = None
+    if calibration is not None:
+        calibration_params = fit_export_calibration(svm, X_tfidf, y, calibration)
+
+    # Extraire les paramètres
+    categories = sorted(df['category'].unique())
+    if prune is None:
+        model_data = build_model_data(tfidf, svm, categories, calibration=calibration_params)
+    else:
+        vocabulary, idf, coef, intercept, classes = prune_linear_model(
+            tfidf.vocabulary_, tfidf.idf_, svm, X_tfidf, y,
+            method=prune, sparsity=sparsity, C=l1_c
+        )
+        print(f"  ✓ Modèle élagué ({prune}): {len(vocabulary)}/{len(tfidf.vocabulary_)} termes, "
+              f"{coef.nnz} coefficients non nuls")
+        model_data = model_data_from_arrays(
+            vocabulary, idf, coef, intercept, classes, categories,
+            ngram_range=tfidf.ngram_range, max_features=tfidf.max_features,
+            model_type=f"TF-IDF + LinearSVC (élagué, {prune})", sparse_coef=True,
+            calibration=calibration_params
+        )
 
     # Sauvegarder en JSON
     output_path = Path(__file__).parent.parent.parent / "extension" / "model.json"
@@ -83,6 +324,25 @@ def train_and_export():
     file_size = output_path.stat().st_size
     print(f"  ✓ Export terminé ({file_size / 1024:.1f} KB)")
 
+    # Export binaire compact
+    bin_path = output_path.with_suffix('.bin')
+    print(f"\nSauvegarde en binaire{' (int8)' if quantize else ''}: {bin_path}")
+    if prune is None:
+        export_binary(bin_path, tfidf, svm, quantize=quantize)
+        agreement = verify_binary_model(bin_path, tfidf, svm, X)
+    else:
+        write_binary_model(bin_path, vocabulary, idf, coef, intercept, classes,
+                           ngram_range=tfidf.ngram_range, quantize=quantize)
+        # Référence : le modèle élagué relu depuis le JSON
+        reference = InferenceEngine.from_json(output_path)
+        agreement = np.mean(InferenceEngine.from_binary(bin_path).predict_batch(X)
+                            == reference.predict_batch(X))
+    print(f"  ✓ Accord avec le modèle {'élagué' if prune else 'sklearn'}: {agreement * 100:.2f}%")
+    if not quantize and agreement < 1.0:
+        raise RuntimeError("Le modèle binaire ne reproduit pas les prédictions de référence")
+
+    compare_exports(output_path, bin_path)
+
     # Test rapide
     print("\n" + "="*70)
     print("TEST DU MODÈLE")
@@ -95,15 +355,32 @@ def train_and_export():
         "Incroyable astuce #shorts"
     ]
 
-    X_test = tfidf.transform(test_titles)
-    predictions = svm.predict(X_test)
+    engine = InferenceEngine.from_json(output_path)
+    predictions = engine.predict_batch(test_titles)
+    confidences = engine.predict_proba(test_titles).max(axis=1) if engine.calibration else None
 
-    for title, pred in zip(test_titles, predictions):
+    for i, (title, pred) in enumerate(zip(test_titles, predictions)):
         print(f"  • {title}")
-        print(f"    → {pred}")
+        if confidences is None:
+            print(f"    → {pred}")
+        else:
+            print(f"    → {pred} (confiance: {confidences[i] * 100:.1f}%)")
 
     print("\n✓ Le modèle est prêt à être utilisé dans l'extension !")
 
 
 if __name__ == "__main__":
-    train_and_export()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--quantize', action='store_true',
+                        help="Quantifie les coefficients du modèle binaire en int8")
+    parser.add_argument('--prune', choices=['magnitude', 'l1'], default=None,
+                        help="Élague le modèle avant export (coefficients CSR, termes inutiles retirés)")
+    parser.add_argument('--sparsity', type=float, default=0.9,
+                        help="Fraction de coefficients annulés par classe (--prune magnitude)")
+    parser.add_argument('--l1-c', type=float, default=1.0,
+                        help="Régularisation du LinearSVC L1 (--prune l1, plus petit = plus creux)")
+    parser.add_argument('--calibration', choices=['temperature', 'sigmoid', 'none'], default='temperature',
+                        help="Calibration des probabilités écrite dans model.json")
+    args = parser.parse_args()
+    train_and_export(quantize=args.quantize, prune=args.prune, sparsity=args.sparsity, l1_c=args.l1_c,
+                     calibration=None if args.calibration == 'none' else args.calibration)
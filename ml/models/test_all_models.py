@@ -1,6 +1,7 @@
 """
 Script principal pour tester toutes les combinaisons embedding + classificateur.
 """
+import argparse
 import sys
 from pathlib import Path
 import warnings
@@ -9,97 +10,160 @@ warnings.filterwarnings('ignore')
 # Ajouter le dossier parent au path
 sys.path.append(str(Path(__file__).parent.parent))
 
+from joblib import Parallel, delayed
+from sklearn.base import BaseEstimator, ClassifierMixin
 from sklearn.pipeline import Pipeline
 from sklearn.neighbors import KNeighborsClassifier
 from sklearn.svm import SVC
 from sklearn.mixture import GaussianMixture
 from sklearn.preprocessing import LabelEncoder
 import numpy as np
+import scipy.sparse as sp
 
 from models.embeddings import (
     TfidfEmbedding,
     BOWEmbedding,
     KeywordEmbedding,
     HybridEmbedding,
+    ReducedEmbedding,
     SENTENCE_TRANSFORMERS_AVAILABLE
 )
 
 if SENTENCE_TRANSFORMERS_AVAILABLE:
     from models.embeddings import SentenceTransformerEmbedding
 
+from models.ann import ANNKNeighborsClassifier
+from models.cascade import CascadeClassifier, KeywordRuleTable
+
 from evaluation.benchmark import BenchmarkRunner, load_data
+from evaluation.embedding_cache import CachedEmbedding, EmbeddingCache
+from evaluation.history import DEFAULT_HISTORY_PATH, BenchmarkHistory
+from evaluation.search import SuccessiveHalvingSearch
+from inference.cache import file_hash
+
+
+# Store persistant des embeddings Sentence Transformers (réutilisé entre exécutions)
+EMBEDDING_STORE_DIR = Path(__file__).parent.parent.parent / "data" / "embedding_store"
 
 
-class GMMClassifier:
+class GMMClassifier(ClassifierMixin, BaseEstimator):
     """
     Wrapper pour GMM qui le rend compatible avec l'API sklearn.
     GMM n'est pas un classificateur au sens strict, on utilise un GMM par classe.
+    GaussianMixture n'accepte pas les matrices creuses : elles sont densifiées ici.
     """
 
-    def __init__(self, n_components=2, random_state=42):
+    def __init__(self, n_components=2, random_state=42, n_jobs=None):
+        """
+        Args:
+            n_components: Nombre de composantes par GMM
+            random_state: Seed pour la reproductibilité
+            n_jobs: Nombre de GMM entraînés en parallèle (un par classe)
+        """
         self.n_components = n_components
         self.random_state = random_state
-        self.gmms = {}
-        self.classes_ = None
+        self.n_jobs = n_jobs
+
+    def _fit_class(self, X_class):
+        gmm = GaussianMixture(
+            n_components=self.n_components,
+            random_state=self.random_state,
+            covariance_type='diag'  # Plus simple et plus rapide
+        )
+        return gmm.fit(X_class)
 
     def fit(self, X, y):
         """Entraîne un GMM pour chaque classe."""
+        if sp.issparse(X):
+            X = X.toarray()
+        y = np.asarray(y)
         self.classes_ = np.unique(y)
-        for label in self.classes_:
-            X_class = X[y == label]
-            gmm = GaussianMixture(
-                n_components=self.n_components,
-                random_state=self.random_state,
-                covariance_type='diag'  # Plus simple et plus rapide
-            )
-            gmm.fit(X_class)
-            self.gmms[label] = gmm
+        gmms = Parallel(n_jobs=self.n_jobs)(
+            delayed(self._fit_class)(X[y == label]) for label in self.classes_
+        )
+        self.gmms = dict(zip(self.classes_, gmms))
         return self
 
+    def decision_function(self, X):
+        """
+        Log-vraisemblance de chaque échantillon sous le GMM de chaque classe.
+
+        Returns:
+            Array (n_samples, n_classes), colonnes dans l'ordre de classes_
+        """
+        if sp.issparse(X):
+            X = X.toarray()
+        return np.column_stack([self.gmms[label].score_samples(X) for label in self.classes_])
+
+    def predict_proba(self, X):
+        """Probabilités a posteriori (priors uniformes) via softmax des log-vraisemblances."""
+        scores = self.decision_function(X)
+        scores -= scores.max(axis=1, keepdims=True)
+        proba = np.exp(scores)
+        return proba / proba.sum(axis=1, keepdims=True)
+
     def predict(self, X):
         """Prédit la classe en choisissant le GMM avec la plus haute likelihood."""
-        predictions = []
-        for x in X:
-            x = x.reshape(1, -1)
-            scores = {label: gmm.score(x) for label, gmm in self.gmms.items()}
-            predictions.append(max(scores, key=scores.get))
-        return np.array(predictions)
+        return self.classes_[np.argmax(self.decision_function(X), axis=1)]
 
 
-def create_models():
+def create_models(cache=None):
     """
     Crée toutes les combinaisons embedding + classificateur à tester.
 
+    Args:
+        cache: EmbeddingCache optionnel. Chaque embedding est alors entraîné
+               et calculé une seule fois puis partagé entre classificateurs.
+
     Returns:
         Liste de tuples (pipeline, nom)
     """
     models = []
 
     # === Embeddings à tester ===
+    # TF-IDF / BOW restent creux (CSR) : KNN et SVM les consomment tels quels
     embeddings = [
-        (TfidfEmbedding(max_features=500, ngram_range=(1, 2)), "TF-IDF-500"),
-        (TfidfEmbedding(max_features=1000, ngram_range=(1, 2)), "TF-IDF-1000"),
-        (TfidfEmbedding(max_features=2000, ngram_range=(1, 3)), "TF-IDF-2000-trigram"),
-        (BOWEmbedding(max_features=500, ngram_range=(1, 2)), "BOW-500"),
+        (TfidfEmbedding(max_features=500, ngram_range=(1, 2), sparse=True), "TF-IDF-500"),
+        (TfidfEmbedding(max_features=1000, ngram_range=(1, 2), sparse=True), "TF-IDF-1000"),
+        (TfidfEmbedding(max_features=2000, ngram_range=(1, 3), sparse=True), "TF-IDF-2000-trigram"),
+        (BOWEmbedding(max_features=500, ngram_range=(1, 2), sparse=True), "BOW-500"),
         (KeywordEmbedding(), "Keywords"),
         (HybridEmbedding([
-            TfidfEmbedding(max_features=500, ngram_range=(1, 2)),
+            TfidfEmbedding(max_features=500, ngram_range=(1, 2), sparse=True),
             KeywordEmbedding()
         ]), "Hybrid-TFIDF+Keywords"),
     ]
 
-    # Ajouter Sentence Transformers si disponible
+    # Ajouter Sentence Transformers si disponible, avec ses variantes
+    # réduites (PCA) et quantifiées (int8) pour le compromis précision/coût
     if SENTENCE_TRANSFORMERS_AVAILABLE:
         embeddings.append((
-            SentenceTransformerEmbedding('paraphrase-multilingual-MiniLM-L12-v2'),
+            SentenceTransformerEmbedding('paraphrase-multilingual-MiniLM-L12-v2',
+                                         store_dir=EMBEDDING_STORE_DIR),
             "SentenceTransformer"
         ))
+        for n_components, quantize in [(None, True), (128, False), (128, True), (64, True)]:
+            name = "SentenceTransformer"
+            if n_components is not None:
+                name += f"-PCA{n_components}"
+            if quantize:
+                name += "-int8"
+            embeddings.append((
+                ReducedEmbedding(
+                    SentenceTransformerEmbedding('paraphrase-multilingual-MiniLM-L12-v2',
+                                                 store_dir=EMBEDDING_STORE_DIR),
+                    n_components=n_components,
+                    quantize=quantize
+                ),
+                name
+            ))
 
     # === Classificateurs à tester ===
     classifiers = [
         (KNeighborsClassifier(n_neighbors=5), "KNN-5"),
         (KNeighborsClassifier(n_neighbors=10), "KNN-10"),
         (KNeighborsClassifier(n_neighbors=15, weights='distance'), "KNN-15-weighted"),
+        (ANNKNeighborsClassifier(n_neighbors=10, n_probe=4), "ANN-KNN-10"),
         (SVC(kernel='linear', C=1.0, random_state=42), "SVM-Linear"),
         (SVC(kernel='rbf', C=1.0, random_state=42), "SVM-RBF"),
         (GMMClassifier(n_components=2, random_state=42), "GMM-2"),
@@ -107,6 +171,9 @@ def create_models():
     ]
 
     # === Créer toutes les combinaisons ===
+    if cache is not None:
+        embeddings = [(CachedEmbedding(emb, cache), name) for emb, name in embeddings]
+
     for embedding, emb_name in embeddings:
         for classifier, clf_name in classifiers:
             # Créer un pipeline
@@ -121,8 +188,149 @@ def create_models():
     return models
 
 
+def create_cascade_models(min_precision=0.95, linear_threshold=0.9):
+    """
+    Cascades règles -> TF-IDF-500 + LinearSVC calibré (-> Sentence
+    Transformer si disponible). Elles prennent les titres bruts : pas de
+    cache d'embeddings.
+
+    Args:
+        min_precision: Précision minimale (lissée) des règles de titres exacts et de mots-clés
+        linear_threshold: Probabilité minimale pour s'arrêter à l'étage linéaire
+
+    Returns:
+        Liste de tuples (modèle, nom)
+    """
+    rules = KeywordRuleTable(min_precision=min_precision)
+    models = [(CascadeClassifier(rules=rules), "Cascade Règles + TF-IDF-500")]
+
+    if SENTENCE_TRANSFORMERS_AVAILABLE:
+        fallback = Pipeline([
+            ('embedding', SentenceTransformerEmbedding('paraphrase-multilingual-MiniLM-L12-v2',
+                                                       store_dir=EMBEDDING_STORE_DIR)),
+            ('classifier', SVC(kernel='linear', C=1.0, random_state=42))
+        ])
+        models.append((
+            CascadeClassifier(rules=rules, fallback=fallback, linear_threshold=linear_threshold),
+            "Cascade Règles + TF-IDF-500 + SentenceTransformer"
+        ))
+    return models
+
+
+def create_search_space(cache=None):
+    """
+    Grille élargie pour la recherche par successive halving (--search).
+
+    Couvre max_features, ngram_range, C, n_neighbors et le nombre de
+    composantes des GMM. Trop grande pour la recherche exhaustive.
+
+    Returns:
+        Liste de tuples (pipeline, nom)
+    """
+    embeddings = []
+    for max_features in (500, 1000, 2000, 5000):
+        for ngram_range in ((1, 1), (1, 2), (1, 3)):
+            suffix = f"{max_features}-{ngram_range[0]}{ngram_range[1]}"
+            embeddings.append((
+                TfidfEmbedding(max_features=max_features, ngram_range=ngram_range, sparse=True),
+                f"TF-IDF-{suffix}"
+            ))
+            embeddings.append((
+                BOWEmbedding(max_features=max_features, ngram_range=ngram_range, sparse=True),
+                f"BOW-{suffix}"
+            ))
+    embeddings.append((KeywordEmbedding(), "Keywords"))
+    for max_features in (500, 2000):
+        embeddings.append((HybridEmbedding([
+            TfidfEmbedding(max_features=max_features, ngram_range=(1, 2), sparse=True),
+            KeywordEmbedding()
+        ]), f"Hybrid-TFIDF-{max_features}+Keywords"))
+
+    if SENTENCE_TRANSFORMERS_AVAILABLE:
+        embeddings.append((
+            SentenceTransformerEmbedding('paraphrase-multilingual-MiniLM-L12-v2',
+                                         store_dir=EMBEDDING_STORE_DIR),
+            "SentenceTransformer"
+        ))
+
+    classifiers = []
+    for n_neighbors in (3, 5, 10, 15, 25):
+        for weights in ('uniform', 'distance'):
+            classifiers.append((
+                KNeighborsClassifier(n_neighbors=n_neighbors, weights=weights),
+                f"KNN-{n_neighbors}-{weights}"
+            ))
+    for n_probe in (1, 4):
+        classifiers.append((
+            ANNKNeighborsClassifier(n_neighbors=10, weights='distance', n_probe=n_probe),
+            f"ANN-KNN-10-probe{n_probe}"
+        ))
+    for C in (0.1, 1.0, 10.0):
+        classifiers.append((SVC(kernel='linear', C=C, random_state=42), f"SVM-Linear-C{C:g}"))
+        classifiers.append((SVC(kernel='rbf', C=C, random_state=42), f"SVM-RBF-C{C:g}"))
+    for n_components in (1, 2, 3, 4):
+        classifiers.append((GMMClassifier(n_components=n_components, random_state=42),
+                            f"GMM-{n_components}"))
+
+    if cache is not None:
+        embeddings = [(CachedEmbedding(emb, cache), name) for emb, name in embeddings]
+
+    return [
+        (Pipeline([('embedding', embedding), ('classifier', classifier)]), f"{emb_name} + {clf_name}")
+        for embedding, emb_name in embeddings
+        for classifier, clf_name in classifiers
+    ]
+
+
+def parse_args():
+    """Options de ligne de commande du benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--n-jobs', type=int, default=1,
+                        help="Processus pour exécuter les modèles en parallèle (-1 = tous les cœurs)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Désactive le cache partagé des embeddings")
+    parser.add_argument('--cache-size', type=int, default=32,
+                        help="Nombre d'entrées du cache d'embeddings en mémoire")
+    parser.add_argument('--cache-dir', type=Path, default=None,
+                        help="Dossier de cache d'embeddings sur disque (memory-map)")
+    parser.add_argument('--include-embedding-time', action='store_true',
+                        help="Compte le calcul des features (en cache) dans les temps mesurés")
+    parser.add_argument('--latency', action='store_true',
+                        help="Mesure la latence (p50/p95/p99, débit) par taille de batch")
+    parser.add_argument('--latency-trials', type=int, default=50,
+                        help="Nombre de mesures par taille de batch")
+    parser.add_argument('--profile-memory', action='store_true',
+                        help="Mesure pic mémoire (fit/predict), taille picklée et taille de l'export JSON")
+    parser.add_argument('--memory-budget-mb', type=float, default=None,
+                        help="Budget mémoire (MB) pris en compte par la recommandation")
+    parser.add_argument('--search', action='store_true',
+                        help="Recherche par successive halving sur la grille élargie, "
+                             "puis benchmark des seuls survivants")
+    parser.add_argument('--search-eta', type=int, default=3,
+                        help="Facteur de réduction entre paliers de la recherche")
+    parser.add_argument('--search-min-samples', type=int, default=100,
+                        help="Titres d'entraînement du premier palier")
+    parser.add_argument('--search-survivors', type=int, default=None,
+                        help="Nombre de modèles benchmarkés après la recherche (défaut: eta)")
+    parser.add_argument('--latency-weight', type=float, default=0.05,
+                        help="Points de F1 retirés par facteur 10 de latence p95 au-delà de 1ms")
+    parser.add_argument('--cascade-precision', type=float, default=0.95,
+                        help="Précision minimale (train, lissée) des règles de la cascade")
+    parser.add_argument('--cascade-threshold', type=float, default=0.9,
+                        help="Probabilité minimale pour que la cascade s'arrête à l'étage TF-IDF")
+    parser.add_argument('--history', type=Path, default=DEFAULT_HISTORY_PATH,
+                        help="Base SQLite où chaque exécution est ajoutée (voir evaluation/history.py)")
+    parser.add_argument('--no-history', action='store_true',
+                        help="N'ajoute pas l'exécution à l'historique")
+    parser.add_argument('--hash-split', action='store_true',
+                        help="Split train/val par hash du titre (celui de train_out_of_core.py)")
+    return parser.parse_args()
+
+
 def main():
     """Exécute le benchmark complet."""
+    args = parse_args()
+
     print("="*70)
     print("BENCHMARK COMPLET - CLASSIFICATION DE TITRES YOUTUBE")
     print("="*70)
@@ -131,12 +339,39 @@ def main():
     data_path = Path(__file__).parent.parent.parent / "data" / "raw" / "youtube_titles.csv"
     print(f"\nChargement des données depuis: {data_path}")
 
-    X_train, X_val, y_train, y_val, label_names = load_data(data_path)
+    split = 'hash' if args.hash_split else 'stratified'
+    X_train, X_val, y_train, y_val, label_names = load_data(data_path, split=split)
 
     # Créer tous les modèles à tester
     print("\nCréation des modèles à tester...")
-    models = create_models()
-    print(f"  ✓ {len(models)} combinaisons à tester")
+    cache = None
+    if not args.no_cache:
+        cache = EmbeddingCache(max_entries=args.cache_size, cache_dir=args.cache_dir)
+    output_dir = Path(__file__).parent.parent.parent / "data" / "evaluation_results"
+    if args.search:
+        candidates = create_search_space(cache)
+        print(f"  ✓ {len(candidates)} combinaisons candidates")
+
+        print("\n" + "="*70)
+        print("RECHERCHE PAR SUCCESSIVE HALVING")
+        print("="*70)
+        search = SuccessiveHalvingSearch(
+            candidates,
+            eta=args.search_eta,
+            min_samples=args.search_min_samples,
+            n_survivors=args.search_survivors,
+            latency_weight=args.latency_weight
+        )
+        models = search.run(X_train, y_train, X_val, y_val)
+
+        output_dir.mkdir(parents=True, exist_ok=True)
+        search_path = output_dir / 'search_results.csv'
+        search.history_frame().to_csv(search_path, index=False)
+        print(f"✓ Historique de la recherche: {search_path}")
+    else:
+        models = create_models(cache) + create_cascade_models(args.cascade_precision,
+                                                              args.cascade_threshold)
+        print(f"  ✓ {len(models)} combinaisons à tester")
 
     # Afficher la liste des modèles
     print("\nModèles à benchmarker:")
@@ -144,8 +379,21 @@ def main():
         print(f"  {i:2d}. {name}")
 
     # Lancer le benchmark
-    output_dir = Path(__file__).parent.parent.parent / "data" / "evaluation_results"
-    runner = BenchmarkRunner(output_dir)
+    history = None
+    if not args.no_history:
+        history = BenchmarkHistory(args.history)
+    runner = BenchmarkRunner(
+        output_dir,
+        n_jobs=args.n_jobs,
+        memory_budget_mb=args.memory_budget_mb,
+        history=history,
+        run_info={'dataset_hash': file_hash(data_path), 'split': split, 'options': vars(args)},
+        include_embedding_time=args.include_embedding_time,
+        # L'objectif de la recherche utilise la latence : on la rapporte aussi
+        latency=args.latency or args.search,
+        latency_trials=args.latency_trials,
+        profile_memory=args.profile_memory
+    )
 
     print("\n" + "="*70)
     print("DÉBUT DU BENCHMARK")
@@ -1,7 +1,12 @@
 """
 Entraîne et sauvegarde le modèle final pour l'extension.
+
+Les probabilités viennent d'une calibration (température) apprise une
+fois sur 20% du dataset (models/calibration.py), au lieu de
+SVC(probability=True) et de sa validation croisée interne à 5 plis.
 """
 import sys
+import time
 from pathlib import Path
 import joblib
 import pandas as pd
@@ -10,6 +15,7 @@ from sklearn.svm import SVC
 
 sys.path.append(str(Path(__file__).parent.parent))
 
+from models.calibration import CalibratedClassifier
 from models.embeddings import TfidfEmbedding
 
 
@@ -34,13 +40,17 @@ def train_and_save_model():
     print("\nCréation du pipeline: TF-IDF-500 + SVM-Linear")
     model = Pipeline([
         ('embedding', TfidfEmbedding(max_features=500, ngram_range=(1, 2))),
-        ('classifier', SVC(kernel='linear', C=1.0, random_state=42, probability=True))
+        ('classifier', CalibratedClassifier(SVC(kernel='linear', C=1.0, random_state=42),
+                                            method='temperature'))
     ])
 
-    # Entraîner
+    # Entraîner (SVC final sur tout le dataset, calibration sur un split de 20%)
     print("\nEntraînement sur l'ensemble du dataset...")
+    start = time.perf_counter()
     model.fit(X, y)
-    print("  ✓ Entraînement terminé")
+    calibration = model.named_steps['classifier'].calibration_
+    print(f"  ✓ Entraînement terminé en {time.perf_counter() - start:.1f}s")
+    print(f"  ✓ Calibration (température): T = {calibration['temperature']:.4f}")
 
     # Sauvegarder
     output_dir = Path(__file__).parent.parent.parent / "data" / "models"
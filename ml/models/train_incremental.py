@@ -0,0 +1,280 @@
+"""
+Entraînement incrémental (online) : features hachées + SGD mis à jour par partial_fit.
+
+Contrairement à train_final_model.py, rien n'est réentraîné depuis zéro :
+les nouveaux titres étiquetés sont lus par morceaux, les statistiques IDF
+et le classificateur linéaire sont mis à jour, puis un checkpoint est
+écrit après chaque morceau. Relancer la commande reprend là où elle s'est
+arrêtée ; ajouter un nouveau fichier ne traite que ce fichier.
+
+Usage :
+    python ml/models/train_incremental.py nouveaux_titres.csv --export extension/model.json
+"""
+import argparse
+import csv
+import itertools
+import json
+import sys
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction import FeatureHasher
+from sklearn.linear_model import SGDClassifier
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from inference.engine import InferenceEngine
+from models.embeddings import HashingEmbedding
+from models.export_simple_model import model_data_from_arrays
+
+CHECKPOINT_VERSION = 1
+
+# Catégories du dataset (partial_fit doit les connaître dès le premier morceau)
+DEFAULT_CATEGORIES = [
+    'divertissement', 'documentaires', 'jeux', 'math',
+    'musique', 'philosophie', 'sciences', 'shorts'
+]
+
+
+def new_checkpoint(categories, n_features=2**18, ngram_range=(1, 2), alpha=1e-5):
+    """
+    Crée un état d'entraînement vide.
+
+    Le checkpoint est un dict sauvegardé avec joblib :
+        version, categories, embedding (HashingEmbedding), classifier
+        (SGDClassifier), n_samples (titres vus), progress ({fichier: lignes
+        traitées}) pour la reprise.
+    """
+    embedding = HashingEmbedding(n_features=n_features, ngram_range=ngram_range)
+    embedding.fit([])
+    return {
+        'version': CHECKPOINT_VERSION,
+        'categories': sorted(categories),
+        'embedding': embedding,
+        'classifier': SGDClassifier(loss='hinge', alpha=alpha, random_state=42),
+        'n_samples': 0,
+        'progress': {},
+    }
+
+
+def load_checkpoint(path):
+    """Charge un checkpoint et vérifie sa version."""
+    checkpoint = joblib.load(path)
+    if checkpoint.get('version') != CHECKPOINT_VERSION:
+        raise ValueError(f"Version de checkpoint non supportée: {checkpoint.get('version')}")
+    return checkpoint
+
+
+def save_checkpoint(checkpoint, path):
+    """Écrit le checkpoint de façon atomique (fichier temporaire puis renommage)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    joblib.dump(checkpoint, tmp_path)
+    tmp_path.replace(path)
+
+
+def partial_fit_chunk(checkpoint, titles, labels):
+    """
+    Met à jour l'IDF puis le classificateur avec un morceau de titres.
+
+    Returns:
+        Accuracy du modèle sur ce morceau avant la mise à jour (évaluation
+        progressive), ou None pour le tout premier morceau
+    """
+    embedding = checkpoint['embedding']
+    classifier = checkpoint['classifier']
+
+    unknown = set(labels) - set(checkpoint['categories'])
+    if unknown:
+        raise ValueError(f"Catégories inconnues du checkpoint: {sorted(unknown)}")
+
+    accuracy = None
+    if checkpoint['n_samples'] > 0:
+        accuracy = float(np.mean(classifier.predict(embedding.transform(titles)) == labels))
+
+    embedding.partial_fit(titles)
+    classifier.partial_fit(embedding.transform(titles), labels, classes=checkpoint['categories'])
+    checkpoint['n_samples'] += len(titles)
+    return accuracy
+
+
+def train_on_file(checkpoint, data_path, checkpoint_path, chunk_size=10_000):
+    """
+    Entraîne sur un CSV (colonnes title, category) par morceaux, en sautant
+    les lignes déjà traitées d'après le checkpoint.
+    """
+    key = str(Path(data_path).resolve())
+    done = checkpoint['progress'].get(key, 0)
+    if done:
+        print(f"  Reprise après {done} lignes déjà traitées")
+
+    with open(data_path, newline='', encoding='utf-8') as f:
+        # Saute les lignes déjà traitées en lisant le fichier (mémoire constante,
+        # contrairement à skiprows qui construit l'ensemble des lignes à ignorer)
+        rows = csv.reader(f)
+        columns = next(rows)
+        for _ in itertools.islice(rows, done):
+            pass
+        reader = pd.read_csv(f, chunksize=chunk_size, header=None, names=columns,
+                             dtype=str, keep_default_na=False)
+        for chunk in reader:
+            if chunk.empty:
+                continue
+            accuracy = partial_fit_chunk(checkpoint, chunk['title'].values, chunk['category'].values)
+            done += len(chunk)
+            checkpoint['progress'][key] = done
+            save_checkpoint(checkpoint, checkpoint_path)
+
+            message = f"  ✓ {done} lignes ({checkpoint['n_samples']} titres au total)"
+            if accuracy is not None:
+                message += f" - accuracy avant mise à jour: {accuracy:.4f}"
+            print(message)
+
+
+def export_model(checkpoint, output_path, max_terms=50_000):
+    """
+    Exporte le modèle au format JSON de l'extension, en mode haché.
+
+    Le vocabulaire de l'export est l'ensemble des colonnes hachées vues au
+    train (fréquence documentaire non nulle), avec leur IDF ; le moteur
+    d'inférence et classifier.js hachent les termes des titres comme
+    HashingVectorizer (MurmurHash3). Les collisions sont donc reproduites
+    et la norme L2 compte tous les n-grams du titre : les colonnes absentes
+    de l'export y entrent avec l'IDF par défaut (fréquence nulle). La
+    mémoire est bornée par n_features, sans relire les titres.
+
+    Args:
+        checkpoint: Dict avec embedding, classifier et categories
+        output_path: Fichier JSON de sortie
+        max_terms: Nombre maximal de colonnes gardant leurs poids (celles de
+                   plus grand poids absolu, les autres ne comptent plus que
+                   dans la norme), None = pas de limite
+
+    Returns:
+        Nombre de colonnes avec des poids non nuls
+    """
+    embedding = checkpoint['embedding']
+    classifier = checkpoint['classifier']
+
+    coef = classifier.coef_
+    buckets = np.flatnonzero((embedding.document_frequency_ > 0) | np.any(coef != 0, axis=0))
+    coef = coef[:, buckets]
+    weight = np.abs(coef).max(axis=0)
+    if max_terms is not None and np.count_nonzero(weight) > max_terms:
+        dropped = np.argsort(-weight, kind='stable')[max_terms:]
+        coef = coef.copy()
+        coef[:, dropped] = 0.0
+
+    if embedding.use_idf:
+        idf = embedding.idf_[buckets]
+        default_idf = float(np.log(1 + embedding.n_docs_) + 1)
+    else:
+        idf = np.ones(len(buckets))
+        default_idf = 1.0
+
+    model_data = model_data_from_arrays(
+        {str(bucket): i for i, bucket in enumerate(buckets)},
+        idf,
+        sp.csr_matrix(coef),
+        classifier.intercept_,
+        classifier.classes_,
+        checkpoint['categories'],
+        ngram_range=embedding.ngram_range,
+        max_features=len(buckets),
+        model_type="Hashing TF-IDF + SGD (incrémental)",
+        sparse_coef=True
+    )
+    model_data['tfidf']['hashing'] = {'n_features': embedding.n_features, 'default_idf': default_idf}
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(model_data, f, ensure_ascii=False)
+    return int(np.count_nonzero(np.any(coef != 0, axis=0)))
+
+
+def verify_export(output_path, checkpoint, titles):
+    """
+    Compare l'export relu par le moteur d'inférence au pipeline haché.
+
+    Returns:
+        Tuple (taux d'accord des prédictions, écart max des scores de décision)
+    """
+    embedding = checkpoint['embedding']
+    classifier = checkpoint['classifier']
+    engine = InferenceEngine.from_json(output_path)
+    X = embedding.transform(titles)
+    expected = classifier.decision_function(X)
+    scores = engine.decision_function(titles)
+    agreement = float(np.mean(engine.predict_batch(titles) == classifier.predict(X)))
+    max_diff = float(np.abs(scores - expected.reshape(scores.shape)).max()) if len(titles) else 0.0
+    return agreement, max_diff
+
+
+def export_and_verify(checkpoint, output_path, titles, max_terms=50_000, min_agreement=0.99):
+    """
+    Exporte le modèle, affiche l'accord avec le pipeline haché sur `titles`
+    et échoue (RuntimeError) s'il est inférieur à min_agreement.
+    """
+    n_terms = export_model(checkpoint, output_path, max_terms=max_terms)
+    print(f"  ✓ {n_terms} colonnes hachées exportées ({Path(output_path).stat().st_size / 1024:.1f} KB)")
+    agreement, max_diff = verify_export(output_path, checkpoint, titles)
+    print(f"  ✓ Accord avec le pipeline haché: {agreement * 100:.2f}% sur {len(titles)} titres "
+          f"(écart max des scores {max_diff:.1e})")
+    if agreement < min_agreement:
+        raise RuntimeError(f"L'export ne reproduit que {agreement * 100:.2f}% des prédictions "
+                           f"(minimum {min_agreement * 100:.0f}%) : augmenter --max-export-terms")
+
+
+def main():
+    """Met à jour le modèle incrémental avec de nouveaux titres."""
+    root = Path(__file__).parent.parent.parent
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('data', type=Path, nargs='*',
+                        default=[root / "data" / "raw" / "youtube_titles.csv"],
+                        help="CSV de titres étiquetés (colonnes title, category)")
+    parser.add_argument('--checkpoint', type=Path,
+                        default=root / "data" / "models" / "incremental_checkpoint.joblib")
+    parser.add_argument('--chunk-size', type=int, default=10_000)
+    parser.add_argument('--n-features', type=int, default=2**18,
+                        help="Taille de l'espace haché (nouveau checkpoint seulement)")
+    parser.add_argument('--export', type=Path, default=None,
+                        help="Exporte le modèle en JSON (features hachées)")
+    parser.add_argument('--max-export-terms', type=int, default=50_000,
+                        help="Nombre maximal de colonnes exportées avec leurs poids (0 = pas de limite)")
+    parser.add_argument('--verify-size', type=int, default=2000,
+                        help="Titres utilisés pour vérifier l'export")
+    parser.add_argument('--min-export-agreement', type=float, default=0.99,
+                        help="Accord minimal export / pipeline haché")
+    args = parser.parse_args()
+
+    print("="*70)
+    print("ENTRAÎNEMENT INCRÉMENTAL")
+    print("="*70)
+
+    if args.checkpoint.exists():
+        checkpoint = load_checkpoint(args.checkpoint)
+        print(f"\nCheckpoint chargé: {args.checkpoint} ({checkpoint['n_samples']} titres vus)")
+    else:
+        checkpoint = new_checkpoint(DEFAULT_CATEGORIES, n_features=args.n_features)
+        print(f"\nNouveau checkpoint: {args.checkpoint}")
+
+    for data_path in args.data:
+        print(f"\nEntraînement sur {data_path}")
+        train_on_file(checkpoint, data_path, args.checkpoint, chunk_size=args.chunk_size)
+
+    if args.export is not None:
+        print(f"\nExport JSON: {args.export}")
+        # Vérification sur les premiers titres des fichiers
+        titles = pd.concat(
+            pd.read_csv(data_path, nrows=args.verify_size, usecols=['title'],
+                        dtype=str, keep_default_na=False)
+            for data_path in args.data
+        )['title'].values[:args.verify_size]
+        export_and_verify(checkpoint, args.export, titles, max_terms=args.max_export_terms or None,
+                          min_agreement=args.min_export_agreement)
+
+if __name__ == "__main__":
+    main()
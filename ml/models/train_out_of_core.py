@@ -0,0 +1,204 @@
+"""
+Entraînement et évaluation hors mémoire sur un corpus de titres arbitrairement grand.
+
+Contrairement à train_final_model.py et au benchmark, le dataset n'est
+jamais chargé en entier : chaque passe relit le fichier par morceaux
+(dataset/chunked.py) et le split train/val est fait ligne à ligne par
+hash du titre.
+
+    Passe 1      : statistiques IDF (HashingEmbedding.partial_fit) et
+                   catégories présentes, sur le train
+    Passes 2..n  : SGDClassifier.partial_fit, une passe par époque
+    Dernière     : évaluation sur la validation (matrice de confusion
+                   accumulée)
+
+La mémoire dépend de n_features et de chunk_size, pas de la taille du corpus.
+
+Usage :
+    python ml/models/train_out_of_core.py titres.parquet --epochs 3 --chunk-size 200000
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import joblib
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from dataset.chunked import iter_split
+from models.embeddings import HashingEmbedding
+from models.train_incremental import export_and_verify
+
+
+def fit_idf(embedding, data_path, chunk_size, val_fraction, seed):
+    """
+    Passe 1 : IDF en streaming sur le train.
+
+    Returns:
+        Tuple (catégories triées, nombre de titres de train)
+    """
+    embedding.fit([])
+    categories = set()
+    n_train = 0
+    for titles, labels in iter_split(data_path, 'train', chunk_size, val_fraction, seed):
+        embedding.partial_fit(titles)
+        categories.update(labels)
+        n_train += len(titles)
+    return sorted(categories), n_train
+
+
+def fit_epoch(embedding, classifier, categories, data_path, chunk_size, val_fraction, seed, rng):
+    """Une passe de SGD sur le train (lignes mélangées à l'intérieur de chaque morceau)."""
+    for titles, labels in iter_split(data_path, 'train', chunk_size, val_fraction, seed):
+        order = rng.permutation(len(titles))
+        classifier.partial_fit(embedding.transform(titles[order]), labels[order], classes=categories)
+
+
+def evaluate(model, categories, data_path, chunk_size, val_fraction, seed):
+    """
+    Évalue sur la validation en accumulant la matrice de confusion.
+
+    Les titres dont la catégorie n'apparaît pas dans le train ne peuvent
+    pas être prédits correctement : ils comptent comme erreurs et sont
+    dénombrés à part (n_unknown), hors de la matrice de confusion.
+
+    Returns:
+        Dict avec n_val, n_unknown, accuracy, f1_macro et confusion_matrix
+    """
+    index = {category: i for i, category in enumerate(categories)}
+    confusion = np.zeros((len(categories), len(categories)), dtype=np.int64)
+    n_unknown = 0
+    for titles, labels in iter_split(data_path, 'val', chunk_size, val_fraction, seed):
+        predicted = model.predict(titles)
+        true_idx = np.array([index.get(label, -1) for label in labels], dtype=np.int64)
+        pred_idx = np.array([index[label] for label in predicted], dtype=np.int64)
+        known = true_idx >= 0
+        n_unknown += int((~known).sum())
+        np.add.at(confusion, (true_idx[known], pred_idx[known]), 1)
+
+    n_val = int(confusion.sum()) + n_unknown
+    true_positives = np.diag(confusion).astype(float)
+    support = confusion.sum(axis=1)
+    predicted_count = confusion.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        f1 = np.nan_to_num(2 * true_positives / (support + predicted_count))
+    return {
+        'n_val': n_val,
+        'n_unknown': n_unknown,
+        'accuracy': true_positives.sum() / n_val if n_val else 0.0,
+        'f1_macro': float(f1.mean()),
+        'confusion_matrix': confusion,
+    }
+
+
+def train_out_of_core(data_path, chunk_size=100_000, epochs=3, n_features=2**18,
+                      val_fraction=0.2, seed=42, alpha=1e-5):
+    """
+    Entraîne HashingEmbedding + SGDClassifier par passes sur le fichier.
+
+    Returns:
+        Tuple (Pipeline entraîné, catégories, métriques de validation)
+    """
+    embedding = HashingEmbedding(n_features=n_features, ngram_range=(1, 2))
+    classifier = SGDClassifier(loss='hinge', alpha=alpha, random_state=seed)
+    rng = np.random.default_rng(seed)
+
+    start = time.perf_counter()
+    categories, n_train = fit_idf(embedding, data_path, chunk_size, val_fraction, seed)
+    print(f"  ✓ Passe IDF: {n_train} titres de train, {len(categories)} catégories "
+          f"({time.perf_counter() - start:.1f}s)")
+
+    for epoch in range(1, epochs + 1):
+        start = time.perf_counter()
+        fit_epoch(embedding, classifier, categories, data_path, chunk_size, val_fraction, seed, rng)
+        print(f"  ✓ Époque {epoch}/{epochs} ({time.perf_counter() - start:.1f}s)")
+
+    model = Pipeline([('embedding', embedding), ('classifier', classifier)])
+
+    start = time.perf_counter()
+    metrics = evaluate(model, categories, data_path, chunk_size, val_fraction, seed)
+    print(f"  ✓ Validation: {metrics['n_val']} titres ({time.perf_counter() - start:.1f}s)")
+    return model, categories, metrics
+
+
+def main():
+    """Entraîne et évalue un modèle hors mémoire."""
+    root = Path(__file__).parent.parent.parent
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('data', type=Path, nargs='?',
+                        default=root / "data" / "raw" / "youtube_titles.csv",
+                        help="Fichier .csv ou .parquet (colonnes title, category)")
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    parser.add_argument('--epochs', type=int, default=3)
+    parser.add_argument('--n-features', type=int, default=2**18)
+    parser.add_argument('--val-fraction', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', type=Path,
+                        default=root / "data" / "models" / "out_of_core_classifier.pkl")
+    parser.add_argument('--export', type=Path, default=None,
+                        help="Exporte aussi le modèle en JSON (format model.json)")
+    parser.add_argument('--max-export-terms', type=int, default=50_000,
+                        help="Nombre maximal de colonnes exportées avec leurs poids (0 = pas de limite)")
+    parser.add_argument('--verify-size', type=int, default=2000,
+                        help="Titres de validation utilisés pour vérifier l'export")
+    parser.add_argument('--min-export-agreement', type=float, default=0.99,
+                        help="Accord minimal export / pipeline haché")
+    parser.add_argument('--profile-memory', action='store_true',
+                        help="Mesure le pic mémoire Python (tracemalloc, plus lent)")
+    args = parser.parse_args()
+
+    print("="*70)
+    print("ENTRAÎNEMENT HORS MÉMOIRE")
+    print("="*70)
+    print(f"\nDonnées: {args.data} (morceaux de {args.chunk_size} lignes)")
+
+    if args.profile_memory:
+        tracemalloc.start()
+
+    model, categories, metrics = train_out_of_core(
+        args.data,
+        chunk_size=args.chunk_size,
+        epochs=args.epochs,
+        n_features=args.n_features,
+        val_fraction=args.val_fraction,
+        seed=args.seed
+    )
+
+    print(f"\nAccuracy validation: {metrics['accuracy']:.4f}")
+    print(f"F1-macro validation: {metrics['f1_macro']:.4f}")
+    if metrics['n_unknown']:
+        print(f"⚠ {metrics['n_unknown']} titres de validation ont une catégorie absente du train")
+    if args.profile_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"Pic mémoire Python: {peak / 1024**2:.1f} MB")
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(model, args.output)
+    print(f"\n✓ Modèle sauvegardé: {args.output}")
+
+    if args.export is not None:
+        checkpoint = {
+            'embedding': model.named_steps['embedding'],
+            'classifier': model.named_steps['classifier'],
+            'categories': categories,
+        }
+        # Vérification sur un échantillon de la validation (titres non vus)
+        titles = []
+        for chunk_titles, _ in iter_split(args.data, 'val', args.chunk_size,
+                                          args.val_fraction, args.seed):
+            titles.extend(chunk_titles[:args.verify_size - len(titles)])
+            if len(titles) >= args.verify_size:
+                break
+        print(f"\nExport JSON: {args.export}")
+        export_and_verify(checkpoint, args.export, titles, max_terms=args.max_export_terms or None,
+                          min_agreement=args.min_export_agreement)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Parité du moteur d'inférence léger (inference/engine.py) avec sklearn.
+
+Les modèles sont entraînés sur un petit corpus, exportés avec les mêmes
+fonctions que les scripts d'export, puis relus par InferenceEngine.
+
+Usage :
+    python -m pytest ml/tests
+"""
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.svm import SVC, LinearSVC
+from sklearn.utils import murmurhash3_32 as sklearn_murmurhash3_32
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from inference.engine import InferenceEngine, apply_calibration, murmurhash3_32
+from models.binary_model import quantize_int8, write_binary_model
+from models.calibration import decision_scores, fit_calibration
+from models.export_model_to_json import build_ovo_model_data, collapse_ovo, ovo_predict
+from models.export_simple_model import build_model_data
+from models.train_incremental import export_model, new_checkpoint, partial_fit_chunk
+
+TRAIN = [
+    ("Minecraft gameplay survie épisode 1", "gaming"),
+    ("Fortnite gameplay victoire royale", "gaming"),
+    ("Let's play Zelda français partie 3", "gaming"),
+    ("Speedrun Mario record du monde", "gaming"),
+    ("Clip officiel - nouvelle chanson", "music"),
+    ("Official music video 2024", "music"),
+    ("Concert live à l'Olympia", "music"),
+    ("Chanson française reprise guitare", "music"),
+    ("Recette gâteau au chocolat facile", "cooking"),
+    ("Crêpes bretonnes recette de grand-mère", "cooking"),
+    ("Cuisine japonaise : ramen maison", "cooking"),
+    ("Pâtes carbonara vraie recette italienne", "cooking"),
+    ("Tutoriel Python débutant", "education"),
+    ("Cours de mathématiques : les intégrales", "education"),
+    ("Apprendre l'anglais en 10 minutes", "education"),
+    ("Histoire de France expliquée", "education"),
+]
+
+TITLES = [
+    "Minecraft gameplay",
+    "Recette crêpes",
+    "RECETTE CREPES",            # même vecteur que la ligne précédente
+    "Clip officiel à l'Olympia",
+    "Cours de mathématiques et d'histoire",
+    "Ｍｉｎｅｃｒａｆｔ ｇａｍｅｐｌａｙ",  # pleine chasse (NFKD)
+    "Ünïcödé ñoël ÇA VA ½",
+    "日本語のタイトル ramen",
+    "😀 gameplay 🎮 music 🎵",
+    "",
+    "   ",
+    "!!! ???",
+    "titre sans aucun mot connu",
+]
+
+
+@pytest.fixture(scope='module')
+def corpus():
+    titles = [title for title, _ in TRAIN]
+    labels = [label for _, label in TRAIN]
+    tfidf = TfidfVectorizer(max_features=500, ngram_range=(1, 2), lowercase=True,
+                            strip_accents='unicode')
+    X = tfidf.fit_transform(titles)
+    return tfidf, X, np.array(labels), sorted(set(labels))
+
+
+def _roundtrip(model_data, tmp_path):
+    """Écrit l'export en JSON et le relit, comme l'extension et le serveur."""
+    path = tmp_path / "model.json"
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(model_data, f, ensure_ascii=False)
+    return InferenceEngine.from_json(path)
+
+
+def test_tokenize_matches_sklearn(corpus):
+    tfidf, _, _, _ = corpus
+    engine = InferenceEngine(tfidf.vocabulary_, tfidf.idf_, np.zeros((1, len(tfidf.idf_))), [0],
+                             ['x'], ngram_range=tfidf.ngram_range)
+    analyzer = tfidf.build_analyzer()
+    for title in TITLES:
+        assert engine.tokenize(title) == analyzer(title)
+
+
+def test_linear_svc_parity(corpus, tmp_path):
+    tfidf, X, y, categories = corpus
+    classifier = LinearSVC(C=1.0, random_state=42, max_iter=10000).fit(X, y)
+    scores = decision_scores(classifier, X)
+    calibration = fit_calibration(scores, np.searchsorted(classifier.classes_, y))
+    engine = _roundtrip(build_model_data(tfidf, classifier, categories, calibration=calibration),
+                        tmp_path)
+
+    X_test = tfidf.transform(TITLES)
+    np.testing.assert_allclose(engine.decision_function(TITLES),
+                               classifier.decision_function(X_test), atol=1e-10)
+    assert engine.predict_batch(TITLES).tolist() == classifier.predict(X_test).tolist()
+    assert engine.predict(TITLES[0]) == classifier.predict(X_test[:1])[0]
+
+    proba = engine.predict_proba(TITLES)
+    np.testing.assert_allclose(proba.sum(axis=1), 1.0)
+    assert np.argmax(proba, axis=1).tolist() == np.argmax(decision_scores(classifier, X_test),
+                                                          axis=1).tolist()
+
+
+def test_binary_linear_svc_parity(corpus, tmp_path):
+    tfidf, X, y, categories = corpus
+    # Une seule ligne de poids, positive pour classes_[1]
+    y_binary = np.where(y == 'gaming', 'gaming', 'autre')
+    classifier = LinearSVC(C=1.0, random_state=42, max_iter=10000).fit(X, y_binary)
+    scores = decision_scores(classifier, X)
+    calibration = fit_calibration(scores, np.searchsorted(classifier.classes_, y_binary))
+    engine = _roundtrip(build_model_data(tfidf, classifier, ['autre', 'gaming'],
+                                         calibration=calibration), tmp_path)
+
+    titles = TITLES + [title for title, _ in TRAIN]
+    X_test = tfidf.transform(titles)
+    np.testing.assert_allclose(engine.decision_function(titles)[:, 0],
+                               classifier.decision_function(X_test), atol=1e-10)
+    np.testing.assert_allclose(engine.class_scores(titles), decision_scores(classifier, X_test),
+                               atol=1e-10)
+    predictions = engine.predict_batch(titles)
+    assert predictions.tolist() == classifier.predict(X_test).tolist()
+    assert set(predictions) == {'autre', 'gaming'}
+    np.testing.assert_allclose(engine.predict_proba(titles),
+                               apply_calibration(decision_scores(classifier, X_test), calibration),
+                               atol=1e-10)
+
+
+def test_ovo_svc_parity(corpus, tmp_path):
+    tfidf, X, y, categories = corpus
+    svm = SVC(kernel='linear', C=1.0, decision_function_shape='ovo', random_state=42).fit(X, y)
+    engine = _roundtrip(build_ovo_model_data(tfidf, svm, categories), tmp_path)
+
+    X_test = tfidf.transform(TITLES)
+    np.testing.assert_allclose(engine.decision_function(TITLES),
+                               svm.decision_function(X_test), atol=1e-10)
+    assert engine.predict_batch(TITLES).tolist() == svm.predict(X_test).tolist()
+
+    svm.decision_function_shape = 'ovr'
+    np.testing.assert_allclose(engine.calibration_scores(TITLES),
+                               svm.decision_function(X_test), atol=1e-10)
+
+
+def test_binary_ovo_svc_parity(corpus, tmp_path):
+    tfidf, X, y, categories = corpus
+    # sklearn inverse le signe du score de la paire en binaire
+    y_binary = np.where(y == 'gaming', 'gaming', 'autre')
+    svm = SVC(kernel='linear', C=1.0, random_state=42).fit(X, y_binary)
+    scores = decision_scores(svm, X)
+    calibration = fit_calibration(scores, np.searchsorted(svm.classes_, y_binary))
+    engine = _roundtrip(build_ovo_model_data(tfidf, svm, ['autre', 'gaming'],
+                                             calibration=calibration), tmp_path)
+
+    titles = TITLES + [title for title, _ in TRAIN]
+    X_test = tfidf.transform(titles)
+    coef, intercept, pairs = collapse_ovo(svm)
+    expected = svm.predict(X_test).tolist()
+    assert ovo_predict(X_test, coef, intercept, pairs, svm.classes_).tolist() == expected
+    assert engine.predict_batch(titles).tolist() == expected
+    assert set(expected) == {'autre', 'gaming'}
+    np.testing.assert_allclose(engine.calibration_scores(titles), decision_scores(svm, X_test),
+                               atol=1e-10)
+    np.testing.assert_allclose(engine.predict_proba(titles),
+                               apply_calibration(decision_scores(svm, X_test), calibration),
+                               atol=1e-10)
+
+
+@pytest.mark.parametrize('quantize', [False, True])
+def test_binary_format_roundtrip(corpus, tmp_path, quantize):
+    tfidf, X, y, categories = corpus
+    classifier = LinearSVC(C=1.0, random_state=42, max_iter=10000).fit(X, y)
+    json_engine = _roundtrip(build_model_data(tfidf, classifier, categories), tmp_path)
+    bin_path = tmp_path / "model.bin"
+    write_binary_model(bin_path, tfidf.vocabulary_, tfidf.idf_, classifier.coef_,
+                       classifier.intercept_, classifier.classes_,
+                       ngram_range=tfidf.ngram_range, quantize=quantize)
+    engine = InferenceEngine.from_binary(bin_path)
+
+    titles = TITLES + [title for title, _ in TRAIN]
+    scores = engine.decision_function(titles)
+    expected = json_engine.decision_function(titles)
+    if quantize:
+        # Erreur d'arrondi int8 : au plus une demi-échelle par coefficient,
+        # et la somme des |x| d'un vecteur normalisé L2 est bornée par sqrt(nnz)
+        _, scales = quantize_int8(classifier.coef_)
+        nnz = np.diff(tfidf.transform(titles).indptr).max()
+        atol = 0.5 * scales.max() * np.sqrt(nnz) + 1e-6
+    else:
+        atol = 1e-5  # float32
+    np.testing.assert_allclose(scores, expected, atol=atol)
+    margin = np.sort(expected, axis=1)[:, -1] - np.sort(expected, axis=1)[:, -2]
+    clear = margin > 2 * atol
+    assert (engine.predict_batch(titles)[clear] == json_engine.predict_batch(titles)[clear]).all()
+    assert engine.classes.tolist() == json_engine.classes.tolist()
+
+
+def test_empty_titles(corpus, tmp_path):
+    tfidf, X, y, categories = corpus
+    classifier = LinearSVC(C=1.0, random_state=42, max_iter=10000).fit(X, y)
+    engine = _roundtrip(build_model_data(tfidf, classifier, categories), tmp_path)
+
+    # Titre sans terme connu : vecteur nul, score = biais
+    np.testing.assert_allclose(engine.decision_function(["", "   "]),
+                               np.tile(classifier.intercept_, (2, 1)))
+    assert engine.decision_function([]).shape == (0, len(categories))
+
+
+def test_murmurhash3_matches_sklearn():
+    for title in TITLES + [title for title, _ in TRAIN]:
+        data = title.encode('utf-8')
+        assert murmurhash3_32(data) == sklearn_murmurhash3_32(data, seed=0)
+
+
+def test_hashed_export_parity(tmp_path):
+    categories = sorted({label for _, label in TRAIN})
+    # Espace haché réduit : collisions entre termes, et colonnes jamais vues
+    # au train qui ne comptent que dans la norme
+    checkpoint = new_checkpoint(categories, n_features=256)
+    partial_fit_chunk(checkpoint, np.array([t for t, _ in TRAIN], dtype=object),
+                      np.array([label for _, label in TRAIN]))
+    path = tmp_path / "model.json"
+    export_model(checkpoint, path, max_terms=None)
+    engine = InferenceEngine.from_json(path)
+
+    X_test = checkpoint['embedding'].transform(TITLES)
+    classifier = checkpoint['classifier']
+    np.testing.assert_allclose(engine.decision_function(TITLES),
+                               classifier.decision_function(X_test), atol=1e-10)
+    assert engine.predict_batch(TITLES).tolist() == classifier.predict(X_test).tolist()